@@ -26,7 +26,6 @@ import ida_kernwin
 import ida_bytes
 import ida_ua
 import ida_ida
-import ida_search
 import ida_funcs
 
 import idautils
@@ -73,17 +72,18 @@ def FindInstructions(instr, asm_where=None):
     # convert from binary string to space separated hex string
     bin_str = ' '.join(["%02X" % ord(x) for x in buf])
 
-    # find all binary strings
+    # find all binary strings, in one pass over the database
     print("Searching for: [%s]" % bin_str)
-    ea = ida_ida.cvar.inf.min_ea
+    r = ida_bytes.bin_search_multi(ida_ida.cvar.inf.min_ea, ida_idaapi.BADADDR, [(buf, None)], 16, 0)
     ret = []
-    while True:
-        ea = ida_search.find_binary(ea, ida_idaapi.BADADDR, bin_str, 16, ida_search.SEARCH_DOWN)
-        if ea == ida_idaapi.BADADDR:
-            break
-        ret.append(ea)
-        ida_kernwin.msg(".")
-        ea += tlen
+    if r:
+        ea_size = 8 if ida_idaapi.__EA64__ else 4
+        for ea in ida_idaapi.unpack_array(r[0], ea_size):
+            # skip overlapping matches
+            if ret and ea < ret[-1] + tlen:
+                continue
+            ret.append(ea)
+            ida_kernwin.msg(".")
     if not ret:
         return (False, "Could not match [%s]" % bin_str)
     ida_kernwin.msg("\n")
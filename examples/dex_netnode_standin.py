@@ -0,0 +1,178 @@
+from __future__ import print_function
+# -----------------------------------------------------------------------
+# Synthetic, in-memory stand-in for the '$ dex_*' netnodes of a database
+# holding a dex file, so that idadex can be imported and benchmarked
+# outside of IDA (see ex_dexexporter_bench.py).
+#
+# install() registers minimal 'idaapi', 'ida_idaapi', 'ida_bytes' and
+# 'idc' modules, providing only what idadex.Dex and idadex.DexExporter
+# use, imports idadex and fills the netnodes with generated methods,
+# fields, try lists, types and strings.
+# It must be called before anything else imports idadex.
+# (c) Hex-Rays
+#
+import array
+import bisect
+import ctypes
+import random
+import struct
+import sys
+import types
+
+BADADDR = 0xFFFFFFFFFFFFFFFF
+DEX_BASE = 0x10000
+STRINGS_BASE = 0x1000000
+
+# netnode name => netnode_data_t
+_nodes = {}
+# string ea => contents
+_memory = {}
+
+def _array_typecode(itemsize):
+    for code in ('B', 'H', 'I', 'L', 'Q'):
+        try:
+            if array.array(code).itemsize == itemsize:
+                return code
+        except ValueError:
+            pass
+    return None
+
+def _pack_eas(eas):
+    return array.array(_array_typecode(8), eas).tostring()
+
+def _unpack_array(buffer, itemsize):
+    return array.array(_array_typecode(itemsize), buffer)
+
+#---------------------------------------------------------------------------
+class netnode_data_t(object):
+    def __init__(self):
+        self.blobs = {}     # tag => blob
+        self.sups = {}      # tag => (sorted indexes, {index: value})
+
+    def set_sup(self, tag, idx, value):
+        idxs, values = self.sups.setdefault(tag, ([], {}))
+        if idx not in values:
+            bisect.insort(idxs, idx)
+        values[idx] = value
+
+# the subset of the netnode class used by idadex
+class netnode(object):
+    def __init__(self, name):
+        self.data = _nodes.setdefault(name, netnode_data_t())
+
+    def getblob(self, start, tag):
+        return self.data.blobs.get(tag)
+
+    def supval(self, idx, tag):
+        return self.data.sups.get(tag, ([], {}))[1].get(idx)
+
+    def eaget_idx(self, idx, tag):
+        ea = self.supval(idx, tag)
+        return BADADDR if ea is None else ea
+
+    def altval(self, idx, tag):
+        return 0
+
+    def supvals_table(self, tag, start=0, maxcount=-1):
+        idxs, values = self.data.sups.get(tag, ([], {}))
+        i = bisect.bisect_left(idxs, start)
+        j = len(idxs) if maxcount < 0 else i + maxcount
+        idxs = idxs[i:j]
+        return (_pack_eas(idxs), [values[idx] for idx in idxs])
+
+    def eavals_table(self, tag):
+        idxs, values = self.data.sups.get(tag, ([], {}))
+        return (_pack_eas(idxs), _pack_eas([values[idx] for idx in idxs]))
+
+#---------------------------------------------------------------------------
+def _get_max_strlit_length(ea, strtype, options=0):
+    return len(_memory.get(ea, "")) + 1
+
+def _get_strlit_contents(ea, length, strtype):
+    return _memory.get(ea)
+
+def _make_module(name, **attrs):
+    mod = types.ModuleType(name)
+    mod.__dict__.update(attrs)
+    sys.modules[name] = mod
+    return mod
+
+def _register_modules():
+    _make_module("ida_idaapi",
+                 BADADDR=BADADDR,
+                 array_typecode=_array_typecode,
+                 unpack_array=_unpack_array)
+    _make_module("idaapi", netnode=netnode)
+    _make_module("ida_bytes",
+                 ALOPT_IGNHEADS=1,
+                 ALOPT_IGNPRINT=2,
+                 get_max_strlit_length=_get_max_strlit_length,
+                 get_strlit_contents=_get_strlit_contents)
+    _make_module("idc", STRTYPE_C=0)
+
+#---------------------------------------------------------------------------
+def _to_str(s):
+    return ctypes.string_at(ctypes.addressof(s), ctypes.sizeof(s))
+
+def _fill(idadex, nmethods, nfields, ntrylists, ntypes, seed):
+    Dex = idadex.Dex
+    rnd = random.Random(seed)
+    meta = netnode("$ dex_meta")
+    # eavec of one base address: count, then the 64-bit delta as 2 dwords
+    meta.data.blobs[Dex.META_BASEADDRS] = "\x01" + struct.pack(">BI", 0xFF, DEX_BASE) + "\x00"
+    var = netnode("$ dex_var").data
+
+    for type_idx in range(ntypes):
+        var.set_sup(Dex.DEXVAR_TYPE_STR, type_idx, "Lcom/example/pkg%d/Class%d;\0" % (type_idx % 50, type_idx))
+
+    # strings: the method names, the shorties and the field names
+    nstrings = nmethods + nfields + 16
+    ea = STRINGS_BASE
+    for string_idx in range(nstrings):
+        s = "string_%d" % string_idx
+        _memory[ea] = s
+        var.set_sup(Dex.DEXVAR_STRING_IDS, string_idx, ea)
+        ea += len(s) + 1
+
+    ea = DEX_BASE
+    for method_idx in range(nmethods):
+        var.set_sup(Dex.DEXVAR_METH_STR, method_idx, "method_%d\0" % method_idx)
+        m = idadex.dex_method()
+        m.flags = idadex.dex_method.IS_LOCAL | idadex.dex_method.HAS_CODE
+        m.defaddr = DEX_BASE
+        m.cname = rnd.randrange(ntypes)
+        m.id = method_idx
+        m.proto_ret = rnd.randrange(ntypes)
+        m.proto_shorty = rnd.randrange(nstrings)
+        m.nparams = rnd.randrange(6)
+        for i in range(m.nparams):
+            m.proto_params[i] = rnd.randrange(ntypes)
+        m.access_flags = rnd.choice((0x1, 0x2, 0x9, 0x11, 0x10001))
+        m.startAddr = ea
+        ea += rnd.randrange(8, 400, 2)
+        m.endAddr = ea
+        var.set_sup(Dex.DEXVAR_METHOD, method_idx, _to_str(m))
+
+    for field_idx in range(nfields):
+        f = idadex.dex_field()
+        f.ctype = rnd.randrange(ntypes)
+        f.name = nmethods + field_idx
+        f.type = rnd.randrange(ntypes)
+        f.maddr = DEX_BASE
+        var.set_sup(Dex.DEXVAR_FIELD, field_idx, _to_str(f))
+
+    for method_idx in rnd.sample(range(nmethods), min(ntrylists, nmethods)):
+        data = "".join(chr(rnd.randrange(256)) for i in range(rnd.randrange(8, 64)))
+        var.set_sup(Dex.DEXVAR_TRYLIST, method_idx, data)
+
+def install(nmethods=60000, nfields=30000, ntrylists=6000, ntypes=4000, seed=0):
+    """
+    Register the stand-in modules, fill the netnodes, and return
+    the idadex module
+    """
+    _nodes.clear()
+    _memory.clear()
+    _register_modules()
+    import idadex
+    _fill(idadex, nmethods, nfields, ntrylists, ntypes, seed)
+    return idadex
@@ -0,0 +1,73 @@
+from __future__ import print_function
+# -----------------------------------------------------------------------
+# This is an example measuring the throughput of idadex.DexExporter,
+# outside of IDA: the dex netnodes are replaced by the synthetic,
+# in-memory stand-in of dex_netnode_standin.py.
+# Run it with Python 2, from the 'examples' directory:
+#   python ex_dexexporter_bench.py
+# (c) Hex-Rays
+#
+import os
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, "..", "python"))
+sys.path.insert(0, here)
+
+import dex_netnode_standin
+
+NMETHODS = 60000
+NFIELDS = 30000
+NTRYLISTS = 6000
+CHUNK = 4096
+
+idadex = dex_netnode_standin.install(NMETHODS, NFIELDS, NTRYLISTS)
+DexExporter = idadex.DexExporter
+
+# discards the output, counting the rows
+class null_output_t(object):
+    def __init__(self):
+        self.nrows = 0
+
+    def write(self, s):
+        if s in ("\n", "\r\n"):
+            self.nrows += 1
+
+def bench(label, func):
+    t0 = time.time()
+    nrows = func()
+    t = time.time() - t0
+    print("%-40s %7d rows %7.2fs %8d rows/s" % (label, nrows, t, nrows / t if t > 0 else 0))
+
+def export_jsonl(exporter, table):
+    out = null_output_t()
+    exporter.write_jsonl(out, table)
+    return out.nrows
+
+def export_csv(exporter, table):
+    out = null_output_t()
+    exporter.write_csv(out, table)
+    return out.nrows - 1 # header
+
+def export_columns(exporter, table):
+    nrows = 0
+    for columns in exporter.column_chunks(table):
+        nrows += len(columns[DexExporter.COLUMNS[table][0]])
+    return nrows
+
+# a new Dex for each run, and an empty type name cache, so that no run
+# benefits from the caches filled by the previous ones
+def new_exporter(preload):
+    idadex.Dex.TYPENAME_CACHE.clear()
+    return DexExporter(idadex.Dex(preload=preload), CHUNK)
+
+for preload in (False, True):
+    mode = "preloaded" if preload else "netnodes"
+    for table in ("methods", "fields", "try_lists"):
+        exporter = new_exporter(preload)
+        bench("%s jsonl (%s)" % (table, mode), lambda: export_jsonl(exporter, table))
+        exporter = new_exporter(preload)
+        bench("%s csv (%s)" % (table, mode), lambda: export_csv(exporter, table))
+    exporter = new_exporter(preload)
+    bench("methods column chunks (%s)" % mode, lambda: export_columns(exporter, "methods"))
@@ -0,0 +1,73 @@
+from __future__ import print_function
+# -----------------------------------------------------------------------
+# This is an example illustrating how to use idc.find_binary_multi(),
+# checking that it reports the same matches as a loop of per-pattern
+# ida_search.find_binary() calls, and timing both.
+# The search strings are made of the bytes of random instructions of
+# the database, some of them with wildcards ("E8 ? ? ? ? 85 C0").
+# (c) Hex-Rays
+#
+import random
+import time
+
+import idautils
+import idc
+import ida_bytes
+import ida_ida
+import ida_idaapi
+import ida_search
+
+NPATTERNS = 50
+PATLEN = 6
+
+def make_patterns(count):
+    heads = [ea for ea in idautils.Heads() if ida_bytes.is_code(ida_bytes.get_flags(ea))]
+    rnd = random.Random(0)
+    pats = ["E8 ? ? ? ? 85 C0"]
+    while heads and len(pats) < count:
+        ea = rnd.choice(heads)
+        buf = ida_bytes.get_bytes(ea, PATLEN)
+        if buf is None or len(buf) != PATLEN:
+            continue
+        parts = ["%02X" % ord(c) for c in buf]
+        if len(pats) % 2:
+            # wildcard the middle bytes, e.g. a call/jump displacement
+            for i in range(1, PATLEN - 1):
+                parts[i] = "?"
+        pats.append(" ".join(parts))
+    return pats
+
+def find_all_loop(start_ea, end_ea, pats):
+    matches = []
+    for i, pat in enumerate(pats):
+        ea = start_ea
+        while ea < end_ea:
+            ea = ida_search.find_binary(ea, end_ea, pat, 16, ida_search.SEARCH_DOWN | ida_search.SEARCH_NOSHOW)
+            if ea == ida_idaapi.BADADDR or ea >= end_ea:
+                break
+            matches.append((ea, i))
+            ea += 1
+    return sorted(matches)
+
+start_ea = ida_ida.cvar.inf.min_ea
+end_ea = ida_ida.cvar.inf.max_ea
+pats = make_patterns(NPATTERNS)
+
+t0 = time.time()
+expected = find_all_loop(start_ea, end_ea, pats)
+t1 = time.time()
+actual = idc.find_binary_multi(start_ea, end_ea, pats)
+t2 = time.time()
+
+if actual is None:
+    print("find_binary_multi() failed")
+else:
+    nbad = 0
+    for i, pat in enumerate(pats):
+        e = [ea for ea, idx in expected if idx == i]
+        a = [ea for ea, idx in actual if idx == i]
+        if e != a:
+            print("Mismatch for [%s]: %d match(es) vs %d expected" % (pat, len(a), len(e)))
+            nbad += 1
+    print("%d pattern(s), %d match(es), %d mismatch(es)" % (len(pats), len(actual), nbad))
+    print("find_binary loop: %.3fs, find_binary_multi: %.3fs" % (t1 - t0, t2 - t1))
@@ -0,0 +1,84 @@
+from __future__ import print_function
+# -----------------------------------------------------------------------
+# This is an example checking that idadex.unpack_eavec_array() decodes
+# the same addresses as the plain unpack_ea() loop, on random eavec blobs,
+# for both 32- and 64-bit addresses.
+# The blobs are either valid packed vectors, possibly truncated, or
+# random bytes.
+# (c) Hex-Rays
+#
+import random
+import struct
+
+import idadex
+
+NBLOBS = 2000
+
+def pack_dw(x):
+    if x <= 0x7F:
+        return chr(x)
+    if x <= 0x3FFF:
+        return chr(0x80 | (x >> 8)) + chr(x & 0xFF)
+    return chr(0xFF) + struct.pack(">H", x)
+
+def pack_dd(x):
+    if x <= 0x7F:
+        return chr(x)
+    if x <= 0x3FFF:
+        return chr(0x80 | (x >> 8)) + chr(x & 0xFF)
+    if x <= 0x1FFFFFFF:
+        return chr(0xC0 | (x >> 24)) + struct.pack(">I", x)[1:]
+    return chr(0xFF) + struct.pack(">I", x)
+
+def pack_eavec(eas, base_ea, ea64):
+    mask = 0xFFFFFFFFFFFFFFFF if ea64 else 0xFFFFFFFF
+    out = [pack_dw(len(eas))]
+    old_ea = base_ea
+    for ea in eas:
+        delta = (ea - old_ea) & mask
+        if ea64:
+            out.append(pack_dd(delta & 0xFFFFFFFF) + pack_dd(delta >> 32))
+        else:
+            out.append(pack_dd(delta))
+        old_ea = ea
+    return "".join(out)
+
+# the pure-Python decoder
+def unpack_eavec_ref(buf, base_ea, ea64):
+    mask = 0xFFFFFFFFFFFFFFFF if ea64 else 0xFFFFFFFF
+    unpack = idadex.unpack_dq if ea64 else idadex.unpack_dd
+    (n, off) = idadex.unpack_dw(buf, 0)
+    res = []
+    old_ea = base_ea
+    for i in range(0, n):
+        (ea, off) = unpack(buf, off)
+        old_ea += ea
+        res.append(old_ea & mask)
+    return res
+
+def random_ea(rnd, ea64):
+    bits = rnd.choice((7, 14, 29, 32, 48, 64) if ea64 else (7, 14, 29, 32))
+    return rnd.getrandbits(bits)
+
+def random_blob(rnd, ea64):
+    kind = rnd.randrange(3)
+    if kind == 2:
+        return "".join(chr(rnd.randrange(256)) for i in range(rnd.randrange(64)))
+    eas = [random_ea(rnd, ea64) for i in range(rnd.randrange(0x200))]
+    blob = pack_eavec(eas, 0, ea64)
+    if kind == 1:
+        blob = blob[:rnd.randrange(len(blob) + 1)]
+    return blob
+
+rnd = random.Random(0)
+for ea64 in (False, True):
+    nbad = 0
+    for i in range(NBLOBS):
+        blob = random_blob(rnd, ea64)
+        base_ea = random_ea(rnd, ea64)
+        expected = unpack_eavec_ref(blob, base_ea, ea64)
+        actual = list(idadex.unpack_eavec_array(blob, base_ea, ea64))
+        if actual != expected:
+            print("%d-bit mismatch for blob %r" % (64 if ea64 else 32, blob))
+            nbad += 1
+    print("%d-bit: checked %d blob(s), %d mismatch(es)" % (64 if ea64 else 32, NBLOBS, nbad))
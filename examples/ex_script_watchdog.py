@@ -0,0 +1,42 @@
+from __future__ import print_function
+# -----------------------------------------------------------------------
+# This is an example timing a tight Python loop, to compare the two ways
+# IDAPython checks the script timeout (see SCRIPT_WATCHDOG in python.cfg):
+#  - SCRIPT_WATCHDOG = NO:  a trace function, called for every line
+#  - SCRIPT_WATCHDOG = YES: a watchdog thread
+# Run it (File > Script file...) once with each setting, and compare the
+# reported times. The runs are kept short enough to end before the default
+# SCRIPT_TIMEOUT.
+# With INTERRUPT_CHECK = True, it then loops forever: the "Running Python
+# script" wait box should appear after SCRIPT_TIMEOUT seconds, and
+# cancelling it should interrupt the loop.
+# (c) Hex-Rays
+#
+import time
+
+NITERS = 3000000
+NRUNS = 3
+INTERRUPT_CHECK = False
+
+def tight_loop(n):
+    x = 0
+    for i in xrange(n):
+        x += i
+    return x
+
+best = None
+for run in range(NRUNS):
+    t0 = time.time()
+    tight_loop(NITERS)
+    t = time.time() - t0
+    if best is None or t < best:
+        best = t
+print("%d iterations: best of %d runs: %.3fs" % (NITERS, NRUNS, best))
+
+if INTERRUPT_CHECK:
+    t0 = time.time()
+    try:
+        while True:
+            pass
+    except KeyboardInterrupt:
+        print("Interrupted after %.1fs" % (time.time() - t0))
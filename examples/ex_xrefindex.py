@@ -0,0 +1,38 @@
+from __future__ import print_function
+# -----------------------------------------------------------------------
+# This is an example illustrating how to use idautils.XrefIndex, and
+# checking that it reports the same references as idautils.XrefsFrom()
+# and idautils.XrefsTo() (including the ordinary flows, with XREF_ALL)
+# (c) Hex-Rays
+#
+import idautils
+import ida_xref
+
+def xref_key(x):
+    return (x.frm, x.to, x.iscode, x.type, x.user)
+
+def check(xi, ea, flags):
+    ok = True
+    expected = sorted(map(xref_key, idautils.XrefsTo(ea, flags)))
+    actual = sorted(map(xref_key, xi.XrefsTo(ea)))
+    if expected != actual:
+        print("%08x: XrefsTo mismatch: %s != %s" % (ea, actual, expected))
+        ok = False
+    expected = sorted(map(xref_key, idautils.XrefsFrom(ea, flags)))
+    actual = sorted(map(xref_key, xi.XrefsFrom(ea)))
+    if expected != actual:
+        print("%08x: XrefsFrom mismatch: %s != %s" % (ea, actual, expected))
+        ok = False
+    return ok
+
+flags = ida_xref.XREF_ALL
+xi = idautils.XrefIndex(flags=flags)
+
+nheads = 0
+nbad = 0
+for ea in idautils.Heads():
+    nheads += 1
+    if not check(xi, ea, flags):
+        nbad += 1
+
+print("Checked %d head(s), %d mismatch(es)" % (nheads, nbad))
@@ -11,6 +11,7 @@
 // python.cpp - Main plugin code
 //---------------------------------------------------------------------
 #include <Python.h>
+#include "frameobject.h"
 
 //-------------------------------------------------------------------------
 // This define fixes the redefinition of ssize_t
@@ -24,6 +25,8 @@
 #ifdef __MAC__
 #include <mach-o/dyld.h>
 #endif
+#include <list>
+#include <map>
 #include <ida.hpp>
 #include <idp.hpp>
 #include <expr.hpp>
@@ -50,6 +53,8 @@
 #define S_INIT_PY                                "init.py"
 static const char S_IDC_ARGS_VARNAME[] =         "ARGV";
 static const char S_IDC_RUNPYTHON_STATEMENT[] =  "RunPythonStatement";
+static const char S_IDC_ENABLE_PYTHON_PROFILER[] = "EnablePythonProfiler";
+static const char S_IDC_DUMP_PYTHON_PROFILE[] =  "DumpPythonProfile";
 static const char S_IDAPYTHON_DATA_NODE[] =      "IDAPython_Data";
 
 //-------------------------------------------------------------------------
@@ -92,7 +97,6 @@ static PyObject *get_module_globals_from_path(const char *path);
 //#define ENABLE_PYTHON_PROFILING
 #ifdef ENABLE_PYTHON_PROFILING
 #include "compile.h"
-#include "frameobject.h"
 static int tracefunc(PyObject *obj, _frame *frame, int what, PyObject *arg)
 {
   PyObject *str;
@@ -155,6 +159,16 @@ struct exec_entry_t
 DECLARE_TYPE_AS_MOVABLE(exec_entry_t);
 typedef qvector<exec_entry_t> exec_entries_t;
 
+// The checks can be triggered in two ways:
+//  - by a trace function (PyEval_SetTrace()), called for every line, call
+//    and return event of the Python code, that performs the checks once
+//    every few steps. This slows down the execution of tight loops.
+//  - by a watchdog thread (SCRIPT_WATCHDOG = YES) that, periodically,
+//    schedules the checks with Py_AddPendingCall(). The interpreter runs
+//    the pending calls from the main thread, between two bytecodes, and
+//    an exception raised by a pending call is raised by the script.
+#define WATCHDOG_PERIOD_MS 200
+
 //-------------------------------------------------------------------------
 struct execution_t
 {
@@ -163,12 +177,22 @@ struct execution_t
   uint32 steps_before_action;
   bool waitdialog_shown;
   bool interruptible_state;
+  bool use_watchdog;
+  qthread_t watchdog;
+  volatile bool watchdog_active;  // there are entries to check
+  volatile bool watchdog_queued;  // a check is pending
+  volatile bool watchdog_stop;
 
   execution_t()
     : timeout(2),
       steps_before_action(0),
       waitdialog_shown(false),
-      interruptible_state(true)
+      interruptible_state(true),
+      use_watchdog(false),
+      watchdog(NULL),
+      watchdog_active(false),
+      watchdog_queued(false),
+      watchdog_stop(false)
   {
     reset_steps();
   }
@@ -176,11 +200,16 @@ struct execution_t
   void push();
   void pop();
   bool can_interrupt_current(time_t now) const;
+  void start_tracking();
   void stop_tracking();
+  void stop_watchdog();
   void sync_to_present_time();
   void maybe_hide_waitdialog();
+  bool maybe_interrupt();
   void set_interruptible(bool intr) { interruptible_state = intr; }
   static int on_trace(PyObject *obj, _frame *frame, int what, PyObject *arg);
+  static int on_watchdog(void *);
+  static int idaapi watchdog_thread(void *);
 };
 static execution_t execution;
 
@@ -212,7 +241,7 @@ void execution_t::reset_steps()
 void execution_t::push()
 {
   if ( entries.empty() )
-    PyEval_SetTrace(execution_t::on_trace, NULL);
+    start_tracking();
   entries.push_back();
   LEXEC("push() (now: %d entries)\n", int(entries.size()));
 }
@@ -226,13 +255,49 @@ void execution_t::pop()
   LEXEC("pop() (now: %d entries)\n", int(entries.size()));
 }
 
+//-------------------------------------------------------------------------
+void execution_t::start_tracking()
+{
+#ifndef ENABLE_PYTHON_PROFILING
+  if ( use_watchdog )
+  {
+    if ( watchdog == NULL )
+    {
+      watchdog_stop = false;
+      watchdog = qthread_create(watchdog_thread, NULL);
+    }
+    if ( watchdog != NULL )
+    {
+      watchdog_active = true;
+      return;
+    }
+    // could not create the thread: fall back to the trace function
+  }
+#endif
+  PyEval_SetTrace(execution_t::on_trace, NULL);
+}
+
 //-------------------------------------------------------------------------
 void execution_t::stop_tracking()
 {
+  watchdog_active = false;
   PyEval_SetTrace(NULL, NULL);
   maybe_hide_waitdialog();
 }
 
+//-------------------------------------------------------------------------
+void execution_t::stop_watchdog()
+{
+  watchdog_active = false;
+  if ( watchdog != NULL )
+  {
+    watchdog_stop = true;
+    qthread_join(watchdog);
+    qthread_free(watchdog);
+    watchdog = NULL;
+  }
+}
+
 //-------------------------------------------------------------------------
 void execution_t::sync_to_present_time()
 {
@@ -266,45 +331,85 @@ bool execution_t::can_interrupt_current(time_t now) const
 }
 
 //------------------------------------------------------------------------
-int execution_t::on_trace(PyObject *obj, _frame *frame, int what, PyObject *arg)
+// Show the wait dialog if the current entry timed out, and interrupt
+// it if the user cancelled it.
+// Returns true if a KeyboardInterrupt exception was set.
+bool execution_t::maybe_interrupt()
 {
-  LEXEC("on_trace() (steps=%d, nentries=%d)\n",
-        int(execution.steps_before_action),
-        int(execution.entries.size()));
-  // we don't want to query for time at every trace event
-  if ( execution.steps_before_action-- > 0 )
-    return 0;
-
   if ( get_active_modal_widget() != NULL )
   {
-    LEXEC("on_trace()::a modal widget is active. Not showing the wait dialog.\n");
-    return 0;
+    LEXEC("maybe_interrupt()::a modal widget is active. Not showing the wait dialog.\n");
+    return false;
   }
 
-  execution.reset_steps();
+  reset_steps();
   time_t now = time(NULL);
-  LEXEC("on_trace()::now: %d\n", int(now));
-  bool can_interrupt = execution.can_interrupt_current(now);
+  LEXEC("maybe_interrupt()::now: %d\n", int(now));
+  bool can_interrupt = can_interrupt_current(now);
   if ( can_interrupt )
   {
-    LEXEC("on_trace()::can_interrupt. Waitdialog shown? %d\n",
-          int(execution.waitdialog_shown));
-    if ( execution.waitdialog_shown )
+    LEXEC("maybe_interrupt()::can_interrupt. Waitdialog shown? %d\n",
+          int(waitdialog_shown));
+    if ( waitdialog_shown )
     {
       if ( user_cancelled() )
       {
-        LEXEC("on_trace()::INTERRUPTING\n");
+        LEXEC("maybe_interrupt()::INTERRUPTING\n");
         PyErr_SetString(PyExc_KeyboardInterrupt, "User interrupted");
-        return -1;
+        return true;
       }
     }
     else
     {
-      LEXEC("on_trace()::showing wait dialog\n");
+      LEXEC("maybe_interrupt()::showing wait dialog\n");
       show_wait_box("Running Python script");
-      execution.waitdialog_shown = true;
+      waitdialog_shown = true;
     }
   }
+  return false;
+}
+
+//------------------------------------------------------------------------
+// Called by the interpreter, in the main thread, after the watchdog
+// thread scheduled it
+int execution_t::on_watchdog(void *)
+{
+  execution.watchdog_queued = false;
+  LEXEC("on_watchdog() (nentries=%d)\n", int(execution.entries.size()));
+  if ( execution.entries.empty() )
+    return 0;
+  return execution.maybe_interrupt() ? -1 : 0;
+}
+
+//------------------------------------------------------------------------
+int idaapi execution_t::watchdog_thread(void *)
+{
+  while ( !execution.watchdog_stop )
+  {
+    qsleep(WATCHDOG_PERIOD_MS);
+    if ( execution.watchdog_active && !execution.watchdog_queued )
+    {
+      // Py_AddPendingCall() doesn't require the GIL
+      execution.watchdog_queued = true;
+      if ( Py_AddPendingCall(execution_t::on_watchdog, NULL) != 0 )
+        execution.watchdog_queued = false;
+    }
+  }
+  return 0;
+}
+
+//------------------------------------------------------------------------
+int execution_t::on_trace(PyObject *obj, _frame *frame, int what, PyObject *arg)
+{
+  LEXEC("on_trace() (steps=%d, nentries=%d)\n",
+        int(execution.steps_before_action),
+        int(execution.entries.size()));
+  // we don't want to query for time at every trace event
+  if ( execution.steps_before_action-- > 0 )
+    return 0;
+
+  if ( execution.maybe_interrupt() )
+    return -1;
 
 #ifdef ENABLE_PYTHON_PROFILING
   return tracefunc(obj, frame, what, arg);
@@ -377,6 +482,275 @@ idaman int ida_export set_script_timeout(int timeout)
   return timeout;
 }
 
+//-------------------------------------------------------------------------
+// Sampling profiler
+//
+// A sampler thread ticks every 'interval' milliseconds. At each tick it
+// records the C function (e.g., a SWIG-wrapped ida_* function) that the
+// main thread is currently calling, if any, and schedules the collection
+// of the Python stack with Py_AddPendingCall(). The C functions being
+// called are tracked by a profile function (PyEval_SetProfile()), which,
+// unlike a trace function, is not called for every line.
+// When the main thread is blocked in a C function that doesn't release
+// the GIL, the ticks accumulate until it returns; they are all attributed
+// to the Python stack that made the call, plus that C function.
+// When the main thread doesn't run Python code at all (e.g., IDA is idle),
+// only one tick accumulates, so idle time isn't attributed to the next
+// script.
+#define PROFILER_MAX_DEPTH 64   // max number of nested C calls tracked
+#define PROFILER_MAX_TICKS 4096 // max number of ticks not yet attributed
+
+//-------------------------------------------------------------------------
+struct profiler_t
+{
+  typedef std::map<qstring, uint64> samples_t;
+  samples_t samples;      // collapsed stack -> number of ticks
+  uint64 dropped;         // number of ticks lost because the buffer was full
+  int interval;           // milliseconds
+  qthread_t sampler;
+  volatile bool sampler_stop;
+  volatile bool queued;   // a collection is pending
+  // the C functions being called by the main thread (innermost last)
+  const PyMethodDef *volatile cfuncs[PROFILER_MAX_DEPTH];
+  volatile int ncfuncs;
+  // the ticks not yet attributed to a Python stack. 'ticks_head' is only
+  // written by the sampler thread, 'ticks_tail' by the main thread.
+  const PyMethodDef *volatile ticks[PROFILER_MAX_TICKS];
+  volatile uint32 ticks_head;
+  volatile uint32 ticks_tail;
+
+  profiler_t()
+    : dropped(0),
+      interval(10),
+      sampler(NULL),
+      sampler_stop(false),
+      queued(false),
+      ncfuncs(0),
+      ticks_head(0),
+      ticks_tail(0)
+  {
+    memset((void *) cfuncs, 0, sizeof(cfuncs));
+    memset((void *) ticks, 0, sizeof(ticks));
+  }
+  bool is_running() const { return sampler != NULL; }
+  bool start(int _interval);
+  void stop();
+  void reset();
+  void collect();
+  bool dump(const char *path) const;
+  static int on_profile(PyObject *obj, _frame *frame, int what, PyObject *arg);
+  static int on_sample(void *);
+  static int idaapi sampler_thread(void *);
+};
+static profiler_t profiler;
+
+//-------------------------------------------------------------------------
+bool profiler_t::start(int _interval)
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  if ( is_running() )
+    stop();
+  interval = qmax(_interval, 1);
+  ncfuncs = 0;
+  ticks_tail = ticks_head;
+  queued = false;
+  sampler_stop = false;
+  sampler = qthread_create(sampler_thread, NULL);
+  if ( sampler == NULL )
+    return false;
+  PyEval_SetProfile(profiler_t::on_profile, NULL);
+  return true;
+}
+
+//-------------------------------------------------------------------------
+void profiler_t::stop()
+{
+  if ( !is_running() )
+    return;
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  // the sampler thread doesn't need the GIL: no need to release it
+  sampler_stop = true;
+  qthread_join(sampler);
+  qthread_free(sampler);
+  sampler = NULL;
+  PyEval_SetProfile(NULL, NULL);
+  collect();
+}
+
+//-------------------------------------------------------------------------
+void profiler_t::reset()
+{
+  samples.clear();
+  dropped = 0;
+}
+
+//------------------------------------------------------------------------
+// Attribute the pending ticks to the current Python stack.
+// Called in the main thread, with the GIL held.
+void profiler_t::collect()
+{
+  uint32 head = ticks_head;
+  if ( head == ticks_tail )
+    return;
+
+  // the outermost frame comes first
+  qstrvec_t frames;
+  for ( PyFrameObject *f = PyThreadState_GET()->frame; f != NULL; f = f->f_back )
+  {
+    PyCodeObject *code = f->f_code;
+    const char *file = PyString_Check(code->co_filename)
+                     ? qbasename(PyString_AS_STRING(code->co_filename))
+                     : "?";
+    const char *name = PyString_Check(code->co_name)
+                     ? PyString_AS_STRING(code->co_name)
+                     : "?";
+    frames.push_back().sprnt("%s (%s:%d)", name, file, code->co_firstlineno);
+  }
+  qstring stack;
+  for ( size_t i = frames.size(); i > 0; --i )
+  {
+    if ( !stack.empty() )
+      stack.append(';');
+    stack.append(frames[i-1]);
+  }
+  if ( stack.empty() )
+    stack = "[no python frame]";
+
+  for ( ; ticks_tail != head; ++ticks_tail )
+  {
+    const PyMethodDef *ml = ticks[ticks_tail % PROFILER_MAX_TICKS];
+    if ( ml == NULL )
+    {
+      samples[stack]++;
+    }
+    else
+    {
+      qstring key;
+      key.sprnt("%s;[native] %s", stack.c_str(), ml->ml_name);
+      samples[key]++;
+    }
+  }
+}
+
+//------------------------------------------------------------------------
+// Write the samples in the 'collapsed stack' format ("frame1;frame2 count"),
+// understood by the usual flame graph tools.
+bool profiler_t::dump(const char *path) const
+{
+  FILE *fp = qfopen(path, "w");
+  if ( fp == NULL )
+    return false;
+  for ( samples_t::const_iterator p = samples.begin(); p != samples.end(); ++p )
+    qfprintf(fp, "%s %" FMT_64 "u\n", p->first.c_str(), p->second);
+  if ( dropped != 0 )
+    qfprintf(fp, "[dropped] %" FMT_64 "u\n", dropped);
+  return qfclose(fp) == 0;
+}
+
+//------------------------------------------------------------------------
+int profiler_t::on_profile(PyObject *, _frame *, int what, PyObject *arg)
+{
+  switch ( what )
+  {
+    case PyTrace_C_CALL:
+      {
+        int n = profiler.ncfuncs;
+        if ( n < PROFILER_MAX_DEPTH )
+          profiler.cfuncs[n] = PyCFunction_Check(arg)
+                             ? ((PyCFunctionObject *) arg)->m_ml
+                             : NULL;
+        profiler.ncfuncs = n + 1;
+      }
+      break;
+    case PyTrace_C_RETURN:
+    case PyTrace_C_EXCEPTION:
+      // the call that started the profiler has no matching C_CALL event
+      if ( profiler.ncfuncs > 0 )
+        profiler.ncfuncs = profiler.ncfuncs - 1;
+      break;
+    default:
+      break;
+  }
+  return 0;
+}
+
+//------------------------------------------------------------------------
+// Called by the interpreter, in the main thread, after the sampler
+// thread scheduled it
+int profiler_t::on_sample(void *)
+{
+  profiler.queued = false;
+  if ( profiler.is_running() )
+    profiler.collect();
+  return 0;
+}
+
+//------------------------------------------------------------------------
+int idaapi profiler_t::sampler_thread(void *)
+{
+  while ( !profiler.sampler_stop )
+  {
+    qsleep(profiler.interval);
+    int n = profiler.ncfuncs;
+    const PyMethodDef *ml = n > 0 && n <= PROFILER_MAX_DEPTH
+                          ? profiler.cfuncs[n-1]
+                          : NULL;
+    uint32 head = profiler.ticks_head;
+    uint32 pending = head - profiler.ticks_tail;
+    if ( pending >= PROFILER_MAX_TICKS )
+    {
+      profiler.dropped++;
+    }
+    else if ( ml != NULL || !profiler.queued || pending == 0 )
+    {
+      // while the previous collection is still pending and no C function
+      // is being called, the main thread is not running Python code:
+      // don't accumulate these ticks
+      profiler.ticks[head % PROFILER_MAX_TICKS] = ml;
+      profiler.ticks_head = head + 1;
+    }
+    if ( !profiler.queued )
+    {
+      // Py_AddPendingCall() doesn't require the GIL
+      profiler.queued = true;
+      if ( Py_AddPendingCall(profiler_t::on_sample, NULL) != 0 )
+        profiler.queued = false;
+    }
+  }
+  return 0;
+}
+
+//-------------------------------------------------------------------------
+//lint -esym(714,enable_python_profiler) Symbol not referenced
+idaman bool ida_export enable_python_profiler(bool enable, int interval_ms)
+{
+  if ( !enable )
+  {
+    profiler.stop();
+    return true;
+  }
+  return profiler.start(interval_ms);
+}
+
+//-------------------------------------------------------------------------
+//lint -esym(714,is_python_profiler_enabled) Symbol not referenced
+idaman bool ida_export is_python_profiler_enabled()
+{
+  return profiler.is_running();
+}
+
+//-------------------------------------------------------------------------
+//lint -esym(714,dump_python_profile) Symbol not referenced
+idaman bool ida_export dump_python_profile(const char *path, bool reset)
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  profiler.collect();
+  bool ok = path == NULL || path[0] == '\0' || profiler.dump(path);
+  if ( ok && reset )
+    profiler.reset();
+  return ok;
+}
+
 //------------------------------------------------------------------------
 // Return a formatted error or just print it to the console
 static void handle_python_error(
@@ -403,6 +777,140 @@ static PyObject *get_module_globals(const char *modname=NULL)
   return module == NULL ? NULL : PyModule_GetDict(module);
 }
 
+//-------------------------------------------------------------------------
+// Compiled code cache
+// IDC-driven automation (conditional breakpoints, RunPythonStatement(),
+// ...) evaluates the same snippets over and over. The code objects are
+// kept in a bounded LRU cache, keyed by the compilation mode, the file
+// name and the source text. Compilation errors are cached too, since the
+// callers often try a snippet as an expression first, then as statements.
+#define CODE_CACHE_MAX_SOURCE 0x10000   // longer sources are not cached
+
+//-------------------------------------------------------------------------
+struct code_cache_t
+{
+  struct entry_t
+  {
+    qstring key;
+    PyObject *code;       // NULL if the compilation failed
+    PyObject *exc_type;   // the compilation error
+    PyObject *exc_value;
+    PyObject *exc_tb;
+  };
+  typedef std::list<entry_t> entries_t; // most recently used first
+  typedef std::map<qstring, entries_t::iterator> index_t;
+  entries_t entries;
+  index_t index;
+  int max_entries;
+  uint64 hits;
+  uint64 misses;
+
+  code_cache_t() : max_entries(256), hits(0), misses(0) {}
+  PyObject *compile(const char *src, const char *filename, int mode, const char *tag=NULL);
+  void shrink(size_t size);
+  void clear() { shrink(0); }
+};
+static code_cache_t code_cache;
+
+//-------------------------------------------------------------------------
+// Compile 'src' (same as Py_CompileString()), or get the result from
+// the cache. 'tag' distinguishes the code objects that the caller will
+// modify.
+// Returns a new reference, or NULL with the compilation error set.
+PyObject *code_cache_t::compile(
+        const char *src,
+        const char *filename,
+        int mode,
+        const char *tag)
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  size_t srclen = strlen(src);
+  if ( max_entries <= 0 || srclen > CODE_CACHE_MAX_SOURCE )
+    return Py_CompileString(src, filename, mode);
+
+  qstring key;
+  key.sprnt("%d\n%s\n%s\n", mode, filename, tag != NULL ? tag : "");
+  key.append(src, srclen);
+  index_t::iterator p = index.find(key);
+  if ( p != index.end() )
+  {
+    hits++;
+    entries_t::iterator e = p->second;
+    entries.splice(entries.begin(), entries, e);
+    if ( e->code == NULL )
+    {
+      Py_XINCREF(e->exc_type);
+      Py_XINCREF(e->exc_value);
+      Py_XINCREF(e->exc_tb);
+      PyErr_Restore(e->exc_type, e->exc_value, e->exc_tb);
+      return NULL;
+    }
+    Py_INCREF(e->code);
+    return e->code;
+  }
+
+  misses++;
+  entry_t &e = *entries.insert(entries.begin(), entry_t());
+  e.key.swap(key);
+  e.code = Py_CompileString(src, filename, mode);
+  e.exc_type = NULL;
+  e.exc_value = NULL;
+  e.exc_tb = NULL;
+  if ( e.code == NULL )
+  {
+    PyErr_Fetch(&e.exc_type, &e.exc_value, &e.exc_tb);
+    Py_XINCREF(e.exc_type);
+    Py_XINCREF(e.exc_value);
+    Py_XINCREF(e.exc_tb);
+    PyErr_Restore(e.exc_type, e.exc_value, e.exc_tb);
+  }
+  else
+  {
+    Py_INCREF(e.code);
+  }
+  index[e.key] = entries.begin();
+  PyObject *code = e.code;
+  shrink(max_entries);
+  return code;
+}
+
+//-------------------------------------------------------------------------
+void code_cache_t::shrink(size_t size)
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  while ( entries.size() > size )
+  {
+    entry_t &e = entries.back();
+    index.erase(e.key);
+    Py_XDECREF(e.code);
+    Py_XDECREF(e.exc_type);
+    Py_XDECREF(e.exc_value);
+    Py_XDECREF(e.exc_tb);
+    entries.pop_back();
+  }
+}
+
+//-------------------------------------------------------------------------
+//lint -esym(714,set_compiled_code_cache_size) Symbol not referenced
+idaman int ida_export set_compiled_code_cache_size(int size)
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  qswap(size, code_cache.max_entries);
+  code_cache.shrink(qmax(code_cache.max_entries, 0));
+  return size;
+}
+
+//-------------------------------------------------------------------------
+//lint -esym(714,get_compiled_code_cache_stats) Symbol not referenced
+idaman PyObject *ida_export get_compiled_code_cache_stats()
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  return Py_BuildValue("(KKn)",
+                       (unsigned PY_LONG_LONG) code_cache.hits,
+                       (unsigned PY_LONG_LONG) code_cache.misses,
+                       Py_ssize_t(code_cache.entries.size()));
+}
+
 //------------------------------------------------------------------------
 static void PythonEvalOrExec(
         const char *str,
@@ -410,15 +918,23 @@ static void PythonEvalOrExec(
 {
   // Compile as an expression
   PYW_GIL_CHECK_LOCKED_SCOPE();
-  PyCompilerFlags cf = {0};
-  newref_t py_code(Py_CompileStringFlags(str, filename, Py_eval_input, &cf));
+  newref_t py_code(code_cache.compile(str, filename, Py_eval_input));
   if ( py_code == NULL || PyErr_Occurred() )
   {
     // Not an expression?
     PyErr_Clear();
 
-    // Run as a string
-    PyRun_SimpleString(str);
+    // Run as a string (like PyRun_SimpleString() does)
+    newref_t py_stmts(code_cache.compile(str, "<string>", Py_file_input));
+    PyObject *py_globals = get_module_globals();
+    newref_t py_result(
+            py_stmts == NULL
+          ? NULL
+          : PyEval_EvalCode((PyCodeObject *) py_stmts.o, py_globals, py_globals));
+    if ( py_result == NULL )
+      PyErr_Print();
+    else if ( Py_FlushLine() != 0 )
+      PyErr_Clear();
   }
   else
   {
@@ -479,11 +995,11 @@ static bool idaapi IDAPython_extlang_eval_snippet(
     PyErr_Clear();
     {
       new_execution_t exec;
-      newref_t result(PyRun_String(
-                              str,
-                              Py_file_input,
-                              globals,
-                              globals));
+      newref_t code(code_cache.compile(str, "<string>", Py_file_input));
+      newref_t result(
+              code == NULL
+            ? NULL
+            : PyEval_EvalCode((PyCodeObject *) code.o, globals, globals));
       ok = result != NULL && !PyErr_Occurred();
       if ( !ok )
         handle_python_error(errbuf);
@@ -521,10 +1037,54 @@ static const ext_idcfunc_t idc_runpythonstatement_desc =
   0
 };
 
+//------------------------------------------------------------------------
+// IDC functions controlling the sampling profiler
+static error_t idaapi idc_enablepythonprofiler(
+        idc_value_t *argv,
+        idc_value_t *res)
+{
+  PYW_GIL_GET;
+  res->set_long(enable_python_profiler(argv[0].num != 0, int(argv[1].num)));
+  return eOk;
+}
+static const char idc_enablepythonprofiler_args[] = { VT_LONG, VT_LONG, 0 };
+static const idc_value_t idc_enablepythonprofiler_defvals[] = { idc_value_t(10) };
+static const ext_idcfunc_t idc_enablepythonprofiler_desc =
+{
+  S_IDC_ENABLE_PYTHON_PROFILER,
+  idc_enablepythonprofiler,
+  idc_enablepythonprofiler_args,
+  idc_enablepythonprofiler_defvals,
+  qnumber(idc_enablepythonprofiler_defvals),
+  0
+};
+
+static error_t idaapi idc_dumppythonprofile(
+        idc_value_t *argv,
+        idc_value_t *res)
+{
+  PYW_GIL_GET;
+  res->set_long(dump_python_profile(argv[0].c_str(), argv[1].num != 0));
+  return eOk;
+}
+static const char idc_dumppythonprofile_args[] = { VT_STR, VT_LONG, 0 };
+static const idc_value_t idc_dumppythonprofile_defvals[] = { idc_value_t(1) };
+static const ext_idcfunc_t idc_dumppythonprofile_desc =
+{
+  S_IDC_DUMP_PYTHON_PROFILE,
+  idc_dumppythonprofile,
+  idc_dumppythonprofile_args,
+  idc_dumppythonprofile_defvals,
+  qnumber(idc_dumppythonprofile_defvals),
+  0
+};
+
 //--------------------------------------------------------------------------
 static const cfgopt_t opts[] =
 {
   cfgopt_t("SCRIPT_TIMEOUT", &execution.timeout, 0, INT_MAX),
+  cfgopt_t("SCRIPT_WATCHDOG", &execution.use_watchdog, true),
+  cfgopt_t("COMPILED_CODE_CACHE_SIZE", &code_cache.max_entries, 0, INT_MAX),
   cfgopt_t("ALERT_AUTO_SCRIPTS", &g_alert_auto_scripts, true),
   cfgopt_t("REMOVE_CWD_SYS_PATH", &g_remove_cwd_sys_path, true),
   cfgopt_t("AUTOIMPORT_COMPAT_IDAAPI", &g_autoimport_compat_idaapi, true),
@@ -801,65 +1361,345 @@ static bool parse_py_modname(
 }
 
 //-------------------------------------------------------------------------
-// Run callback for Python external language evaluator
-static bool idaapi IDAPython_extlang_call_func(
-        idc_value_t *result,
+// IDC scripts and breakpoint conditions may call the same Python functions
+// very often. The functions are resolved once, and the result is reused as
+// long as the module is still the one in sys.modules (i.e., it was not
+// removed, as require() does), and the function is still the one in the
+// module dictionary (i.e., the module was not reloaded, nor the function
+// redefined.)
+#define MAX_RESOLVED_FUNCS 1024
+
+struct resolved_func_t
+{
+  PyObject *py_modname;   // all new references
+  PyObject *py_funcname;
+  PyObject *module;
+  PyObject *func;
+};
+typedef std::map<qstring, resolved_func_t> resolved_funcs_t;
+static resolved_funcs_t resolved_funcs;
+
+//-------------------------------------------------------------------------
+static void release_resolved_func(resolved_func_t &rf)
+{
+  Py_XDECREF(rf.py_modname);
+  Py_XDECREF(rf.py_funcname);
+  Py_XDECREF(rf.module);
+  Py_XDECREF(rf.func);
+}
+
+//-------------------------------------------------------------------------
+static void clear_resolved_funcs()
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  resolved_funcs_t funcs;
+  funcs.swap(resolved_funcs);
+  for ( resolved_funcs_t::iterator p = funcs.begin(); p != funcs.end(); ++p )
+    release_resolved_func(p->second);
+}
+
+//-------------------------------------------------------------------------
+// Find the function called 'name' ("funcname" or "modname.funcname")
+// Returns borrowed references to the function and to the dictionary of
+// its module, or NULL.
+static PyObject *resolve_func(
+        PyObject **globals,
         const char *name,
-        const idc_value_t args[],
-        size_t nargs,
         qstring *errbuf)
 {
-  PYW_GIL_GET;
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  qstring key(name);
+  resolved_funcs_t::iterator p = resolved_funcs.find(key);
+  if ( p != resolved_funcs.end() )
+  {
+    resolved_func_t &rf = p->second;
+    PyObject *module = PyDict_GetItem(PyImport_GetModuleDict(), rf.py_modname);
+    if ( module == rf.module )
+    {
+      *globals = PyModule_GetDict(module);
+      if ( PyDict_GetItem(*globals, rf.py_funcname) == rf.func )
+        return rf.func;
+    }
+    // stale entry
+    resolved_func_t stale = rf;
+    resolved_funcs.erase(p);
+    release_resolved_func(stale);
+  }
+
   // Try to extract module name (if any) from the funcname
   char modname[MAXSTR];
   char funcname[MAXSTR];
   bool imported_module = parse_py_modname(name, modname, funcname, MAXSTR);
+  const char *final_modname = imported_module ? modname : S_MAIN;
+  newref_t module(PyImport_ImportModule(final_modname));
+  if ( module == NULL )
+  {
+    errbuf->sprnt("couldn't import module %s", final_modname);
+    return NULL;
+  }
 
-  bool ok = true;
-  PyObject *module = NULL;
-  ref_vec_t pargs;
-  do
+  *globals = PyModule_GetDict(module.o);
+  QASSERT(30157, *globals != NULL);
+
+  PyObject *func = PyDict_GetItemString(*globals, funcname);
+  if ( func == NULL )
   {
-    // Convert arguments to python
-    ok = pyw_convert_idc_args(args, nargs, pargs, 0, errbuf);
-    if ( !ok )
-      break;
+    errbuf->sprnt("undefined function %s", name);
+    return NULL;
+  }
 
-    const char *final_modname = imported_module ? modname : S_MAIN;
-    module = PyImport_ImportModule(final_modname);
-    if ( module == NULL )
-    {
-      errbuf->sprnt("couldn't import module %s", final_modname);
-      ok = false;
-      break;
-    }
+  resolved_func_t rf;
+  rf.py_modname = PyString_FromString(final_modname);
+  rf.py_funcname = PyString_FromString(funcname);
+  rf.module = module.o;
+  rf.func = func;
+  Py_INCREF(rf.module);
+  Py_INCREF(rf.func);
+  if ( rf.py_modname == NULL || rf.py_funcname == NULL )
+  {
+    // the cache is only an optimization
+    PyErr_Clear();
+    release_resolved_func(rf);
+  }
+  else
+  {
+    if ( resolved_funcs.size() >= MAX_RESOLVED_FUNCS )
+      clear_resolved_funcs();
+    resolved_funcs[key] = rf;
+  }
+  return func;
+}
 
-    PyObject *globals = PyModule_GetDict(module);
-    QASSERT(30157, globals != NULL);
+//-------------------------------------------------------------------------
+// Compiled expressions
+// The expressions that the kernel compiles into a function (e.g., the
+// breakpoint conditions) are compiled only once, and, each time the kernel
+// calls them (e.g., each time the breakpoint is hit), the function is
+// called directly, with a preallocated argument tuple.
+// The number of calls and the time spent in them are accounted per
+// expression.
+#define MAX_COMPILED_EXPRS 4096
+
+struct compiled_expr_t
+{
+  qstring expr;
+  ea_t ea;              // the address the expression was compiled for
+  PyObject *py_name;    // all new references
+  PyObject *globals;
+  PyObject *func;
+  PyObject *args;
+  uint64 ncalls;
+  uint64 nsecs;
+};
+typedef std::map<qstring, compiled_expr_t> compiled_exprs_t;
+static compiled_exprs_t compiled_exprs;
 
-    PyObject *func = PyDict_GetItemString(globals, funcname);
-    if ( func == NULL )
+//-------------------------------------------------------------------------
+static void release_compiled_expr(compiled_expr_t &ce)
+{
+  Py_XDECREF(ce.py_name);
+  Py_XDECREF(ce.globals);
+  Py_XDECREF(ce.func);
+  Py_XDECREF(ce.args);
+}
+
+//-------------------------------------------------------------------------
+static void clear_compiled_exprs()
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  compiled_exprs_t exprs;
+  exprs.swap(compiled_exprs);
+  for ( compiled_exprs_t::iterator p = exprs.begin(); p != exprs.end(); ++p )
+    release_compiled_expr(p->second);
+}
+
+//-------------------------------------------------------------------------
+// Find the expression compiled into the function 'name'. It is forgotten
+// if the function was redefined since.
+static compiled_expr_t *find_compiled_expr(const char *name)
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  compiled_exprs_t::iterator p = compiled_exprs.find(qstring(name));
+  if ( p == compiled_exprs.end() )
+    return NULL;
+  compiled_expr_t &ce = p->second;
+  if ( PyDict_GetItem(ce.globals, ce.py_name) == ce.func )
+    return &ce;
+  compiled_expr_t stale = ce;
+  compiled_exprs.erase(p);
+  release_compiled_expr(stale);
+  return NULL;
+}
+
+//-------------------------------------------------------------------------
+// Remember the function 'name' that 'expr' was just compiled into
+static void register_compiled_expr(
+        const char *name,
+        ea_t ea,
+        const char *expr,
+        PyObject *globals)
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  PyObject *func = PyDict_GetItemString(globals, name);
+  if ( func == NULL || !PyFunction_Check(func) )
+    return;
+  compiled_expr_t ce;
+  ce.expr = expr;
+  ce.ea = ea;
+  ce.py_name = PyString_FromString(name);
+  ce.globals = globals;
+  ce.func = func;
+  ce.args = PyTuple_New(0);
+  ce.ncalls = 0;
+  ce.nsecs = 0;
+  Py_INCREF(ce.globals);
+  Py_INCREF(ce.func);
+  if ( ce.py_name == NULL || ce.args == NULL )
+  {
+    // the fast path is only an optimization
+    PyErr_Clear();
+    release_compiled_expr(ce);
+    return;
+  }
+  if ( compiled_exprs.size() >= MAX_COMPILED_EXPRS )
+    clear_compiled_exprs();
+  compiled_exprs_t::iterator p = compiled_exprs.find(qstring(name));
+  if ( p != compiled_exprs.end() )
+  {
+    compiled_expr_t old = p->second;
+    p->second = ce;
+    release_compiled_expr(old);
+  }
+  else
+  {
+    compiled_exprs[qstring(name)] = ce;
+  }
+}
+
+//-------------------------------------------------------------------------
+static bool call_compiled_expr(
+        idc_value_t *result,
+        const char *name,
+        compiled_expr_t *ce,
+        qstring *errbuf)
+{
+  // keep them alive, even if the expression is forgotten meanwhile
+  borref_t py_func(ce->func);
+  borref_t py_args(ce->args);
+  uint64 start = get_nsec_stamp();
+  newref_t py_res(PyObject_Call(py_func.o, py_args.o, NULL));
+  uint64 elapsed = get_nsec_stamp() - start;
+  // the function might have changed the compiled expressions
+  ce = find_compiled_expr(name);
+  if ( ce != NULL && ce->func == py_func.o )
+  {
+    ce->ncalls++;
+    ce->nsecs += elapsed;
+  }
+  return return_python_result(result, py_res, errbuf);
+}
+
+//-------------------------------------------------------------------------
+//lint -esym(714,get_compiled_expr_stats) Symbol not referenced
+idaman PyObject *ida_export get_compiled_expr_stats()
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  newref_t py_list(PyList_New(0));
+  if ( py_list == NULL )
+    return NULL;
+  for ( compiled_exprs_t::const_iterator p = compiled_exprs.begin(); p != compiled_exprs.end(); ++p )
+  {
+    const compiled_expr_t &ce = p->second;
+    newref_t py_stats(Py_BuildValue(
+                              "(s" PY_BV_EA "sKK)",
+                              p->first.c_str(),
+                              bvea_t(ce.ea),
+                              ce.expr.c_str(),
+                              (unsigned PY_LONG_LONG) ce.ncalls,
+                              (unsigned PY_LONG_LONG) ce.nsecs));
+    if ( py_stats == NULL || PyList_Append(py_list.o, py_stats.o) < 0 )
+      return NULL;
+  }
+  py_list.incref();
+  return py_list.o;
+}
+
+//-------------------------------------------------------------------------
+//lint -esym(714,reset_compiled_expr_stats) Symbol not referenced
+idaman void ida_export reset_compiled_expr_stats()
+{
+  for ( compiled_exprs_t::iterator p = compiled_exprs.begin(); p != compiled_exprs.end(); ++p )
+  {
+    p->second.ncalls = 0;
+    p->second.nsecs = 0;
+  }
+}
+
+//-------------------------------------------------------------------------
+// Run callback for Python external language evaluator
+#define CALL_FUNC_MAX_FAST_ARGS 8
+static bool idaapi IDAPython_extlang_call_func(
+        idc_value_t *result,
+        const char *name,
+        const idc_value_t args[],
+        size_t nargs,
+        qstring *errbuf)
+{
+  PYW_GIL_GET;
+  if ( nargs == 0 )
+  {
+    compiled_expr_t *ce = find_compiled_expr(name);
+    if ( ce != NULL )
+      return call_compiled_expr(result, name, ce, errbuf);
+  }
+
+  PyObject *globals = NULL;
+  PyObject *func = resolve_func(&globals, name, errbuf);
+  if ( func == NULL )
+    return false;
+  // keep them alive, even if the cache entry is released meanwhile
+  borref_t py_func(func);
+  borref_t py_globals(globals);
+
+  // Convert arguments to python. Integers, the most common arguments,
+  // are converted directly.
+  bool fast = nargs <= CALL_FUNC_MAX_FAST_ARGS;
+  for ( size_t i = 0; fast && i < nargs; i++ )
+    fast = args[i].vtype == VT_LONG;
+  ref_t fast_args[CALL_FUNC_MAX_FAST_ARGS];
+  PyObject *fast_ptrs[CALL_FUNC_MAX_FAST_ARGS];
+  ref_vec_t pargs;
+  qvector<PyObject*> pargs_ptrs;
+  PyObject **ptrs = fast_ptrs;
+  if ( fast )
+  {
+    for ( size_t i = 0; i < nargs; i++ )
     {
-      errbuf->sprnt("undefined function %s", name);
-      ok = false;
-      break;
+      fast_args[i] = newref_t(cvt_to_pylong(args[i].num));
+      if ( fast_args[i] == NULL )
+      {
+        handle_python_error(errbuf);
+        return false;
+      }
+      fast_ptrs[i] = fast_args[i].o;
     }
-
-    borref_t code(PyFunction_GetCode(func));
-    qvector<PyObject*> pargs_ptrs;
+  }
+  else
+  {
+    if ( !pyw_convert_idc_args(args, nargs, pargs, 0, errbuf) )
+      return false;
     pargs.to_pyobject_pointers(&pargs_ptrs);
-    newref_t py_res(PyEval_EvalCodeEx(
-                            (PyCodeObject*) code.o,
-                            globals, NULL,
-                            pargs_ptrs.begin(),
-                            nargs,
-                            NULL, 0, NULL, 0, NULL));
-    ok = return_python_result(result, py_res, errbuf);
-  } while ( false );
+    ptrs = pargs_ptrs.begin();
+  }
 
-  if ( imported_module )
-    Py_XDECREF(module);
-  return ok;
+  borref_t code(PyFunction_GetCode(func));
+  newref_t py_res(PyEval_EvalCodeEx(
+                          (PyCodeObject*) code.o,
+                          globals, NULL,
+                          ptrs,
+                          nargs,
+                          NULL, 0, NULL, 0, NULL));
+  return return_python_result(result, py_res, errbuf);
 }
 
 //-------------------------------------------------------------------------
@@ -878,15 +1718,22 @@ static void wrap_in_function(qstring *out, const qstring &body, const char *name
 // Compile callback for Python external language evaluator
 static bool idaapi IDAPython_extlang_compile_expr(
         const char *name,
-        ea_t /*current_ea*/,
+        ea_t current_ea,
         const char *expr,
         qstring *errbuf)
 {
   PYW_GIL_GET;
   PyObject *globals = get_module_globals();
+
+  // Already compiled? (e.g., the condition of a breakpoint that is hit again)
+  const compiled_expr_t *ce = find_compiled_expr(name);
+  if ( ce != NULL && ce->globals == globals && ce->expr == expr )
+    return true;
+
   bool isfunc = false;
 
-  PyCodeObject *code = (PyCodeObject *)Py_CompileString(expr, "<string>", Py_eval_input);
+  // the code object is renamed below: it is cached for this name only
+  PyCodeObject *code = (PyCodeObject *)code_cache.compile(expr, "<string>", Py_eval_input, name);
   if ( code == NULL )
   {
     // try compiling as a list of statements
@@ -894,7 +1741,7 @@ static bool idaapi IDAPython_extlang_compile_expr(
     handle_python_error(errbuf);
     qstring func;
     wrap_in_function(&func, expr, name);
-    code = (PyCodeObject *)Py_CompileString(func.c_str(), "<string>", Py_file_input);
+    code = (PyCodeObject *)code_cache.compile(func.c_str(), "<string>", Py_file_input, name);
     if ( code == NULL )
     {
       handle_python_error(errbuf);
@@ -923,12 +1770,16 @@ ERR:
 
   if ( err )
     goto ERR;
+  Py_DECREF(code);
 
   if ( isfunc )
   {
+    // define the function
     idc_value_t result;
-    return IDAPython_extlang_call_func(&result, name, NULL, 0, errbuf);
+    if ( !IDAPython_extlang_call_func(&result, name, NULL, 0, errbuf) )
+      return false;
   }
+  register_compiled_expr(name, current_ea, expr, globals);
   return true;
 }
 
@@ -1218,7 +2069,9 @@ static bool idaapi IDAPython_extlang_eval_expr(
   {
     {
       new_execution_t exec;
-      result = newref_t(PyRun_String(expr, Py_eval_input, globals, globals));
+      newref_t code(code_cache.compile(expr, "<string>", Py_eval_input));
+      if ( code != NULL )
+        result = newref_t(PyEval_EvalCode((PyCodeObject *) code.o, globals, globals));
     }
     ok = return_python_result(rv, result, errbuf);
   }
@@ -1939,8 +2792,10 @@ bool IDAPython_Init(void)
 #endif
 
 
-  // Register a RunPythonStatement() function for IDC
+  // Register the RunPythonStatement() and profiler functions for IDC
   add_idc_func(idc_runpythonstatement_desc);
+  add_idc_func(idc_enablepythonprofiler_desc);
+  add_idc_func(idc_dumppythonprofile_desc);
 
   // A script specified on the command line is run
   if ( g_run_when == RUN_ON_INIT )
@@ -1980,6 +2835,15 @@ void IDAPython_Term(void)
     PyGILState_Ensure();
   }
 
+  // Stop scheduling the script timeout checks and the profiler samples
+  execution.stop_watchdog();
+  profiler.stop();
+
+  // Release the cached code objects, functions and compiled expressions
+  code_cache.clear();
+  clear_resolved_funcs();
+  clear_compiled_exprs();
+
   // Let all modules perform possible de-initialization
   DISPATCH_TO_MODULES(term);
 
@@ -2004,8 +2868,10 @@ void IDAPython_Term(void)
   // De-init pywraps
   deinit_pywraps();
 
-  // Uninstall IDC function
+  // Uninstall IDC functions
   del_idc_func(idc_runpythonstatement_desc.name);
+  del_idc_func(idc_enablepythonprofiler_desc.name);
+  del_idc_func(idc_dumppythonprofile_desc.name);
 
   // Shut the interpreter down
   Py_Finalize();
@@ -14,7 +14,13 @@ from __future__ import print_function
 #
 #---------------------------------------------------------------------
 # pylint: disable=C0103, C0111, C0301, C0326, W0511, R0903
+import array
+import bisect
+import collections
 import ctypes
+import itertools
+import json
+import sys
 import idaapi
 import ida_idaapi
 import ida_bytes
@@ -29,6 +35,7 @@ ushort = uint16
 # __EA64__ is set if IDA is running in 64-bit mode
 __EA64__ = ida_idaapi.BADADDR == 0xFFFFFFFFFFFFFFFF
 ea_t = uint64 if __EA64__ else uint32
+_EA_SIZE = 8 if __EA64__ else 4
 
 # parse a ctypes struct from byte data in str_ at 'off'
 def get_struct(str_, off, struct):
@@ -104,14 +111,89 @@ def unpack_ea(buf, off):
         return unpack_dd(buf, off)
 
 def unpack_eavec(buf, base_ea):
+    return list(unpack_eavec_array(buf, base_ea))
+
+# typecode of the arrays of 64-bit unsigned values, if any
+_EAVEC_TYPECODE = ida_idaapi.array_typecode(8)
+
+# decode a packed eavec blob in one pass over a bytearray. This decodes
+# the same values as unpack_ea() would (one address after the other), but
+# without the per-byte ord() calls and the per-value tuples: unpack_dd() or
+# unpack_dq() are only used for the last values, where a value may be
+# truncated by the end of the blob.
+# returns an array of 64-bit unsigned values (or a list, if the interpreter
+# has no such array type)
+# 'ea64' selects the size of the addresses (default: that of the database)
+def unpack_eavec_array(buf, base_ea, ea64=None):
+    if ea64 is None:
+        ea64 = __EA64__
     (n, off) = unpack_dw(buf, 0)
-    ba = []
+    b = bytearray(buf)
+    # size of the longest packed value: 2 packed dwords for 64-bit addresses
+    safe_end = len(b) - (10 if ea64 else 5)
+    mask = 0xFFFFFFFFFFFFFFFF if ea64 else 0xFFFFFFFF
+    unpack = unpack_dq if ea64 else unpack_dd
+    res = []
+    append = res.append
+    halves = (0, 1) if ea64 else (0,)
     old_ea = base_ea
-    for i in range(0, n):
-        (ea, off) = unpack_ea(buf, off)
+    i = 0
+    while i < n and off <= safe_end:
+        for half in halves:
+            x = b[off]
+            off += 1
+            if (x & 0x80) == 0x80:
+                if (x & 0xC0) == 0xC0:
+                    if (x & 0xE0) == 0xE0:
+                        xh = (b[off] << 8) | b[off+1]
+                        off += 2
+                    else:
+                        xh = ((x & ~0xC0) << 8) | b[off]
+                        off += 1
+                    x = (xh << 16) | (b[off] << 8) | b[off+1]
+                    off += 2
+                else:
+                    x = ((x & ~0x80) << 8) | b[off]
+                    off += 1
+            if half == 0:
+                ea = x
+            else:
+                ea |= long(x) << 32
+                if ea > 0x8000000000000000:
+                    ea -= 0x10000000000000000
+        old_ea += ea
+        append(old_ea & mask)
+        i += 1
+    buf = str(b)
+    while i < n:
+        (ea, off) = unpack(buf, off)
         old_ea += ea
-        ba.append(old_ea)
-    return ba
+        append(old_ea & mask)
+        i += 1
+    if _EAVEC_TYPECODE is None:
+        return res
+    return array.array(_EAVEC_TYPECODE, res)
+
+#---------------------------------------------------------------------------
+# bounded cache: the least recently used entry is dropped when full
+class lru_cache_t(object):
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+
+    # get the value for 'key', calling compute(key) if it is not cached
+    def get(self, key, compute):
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            value = compute(key)
+            if len(self.entries) >= self.maxsize:
+                self.entries.popitem(last=False)
+        self.entries[key] = value
+        return value
+
+    def clear(self):
+        self.entries.clear()
 
 #---------------------------------------------------------------------------
 # This structure is used both for imported methods and locally defined ones
@@ -174,6 +256,65 @@ class longname_director_t(ctypes.LittleEndianStructure):
     ]
 
 
+class DexTables(object):
+    """
+    In-memory copy of the metadata of one dex file: its '$ dex_var'
+    netnode is read once, one table at a time, into arrays and
+    dictionaries (see Dex(preload=True)).
+
+    The contents of the strings are read from the database the first
+    time they are requested, and kept.
+    """
+    def __init__(self, nn_var):
+        ids, eas = nn_var.eavals_table(Dex.DEXVAR_STRING_IDS)
+        self.string_ids = ida_idaapi.unpack_array(ids, _EA_SIZE)   # sorted string_id
+        self.string_eas = ida_idaapi.unpack_array(eas, _EA_SIZE)   # string_id => ea
+        self.strings = {}                                           # string_id => str
+        self.type_strings = DexTables._load_strings(nn_var, Dex.DEXVAR_TYPE_STR)
+        self.method_names = DexTables._load_strings(nn_var, Dex.DEXVAR_METH_STR)
+        self.methods = DexTables._load_values(nn_var, Dex.DEXVAR_METHOD)
+        self.fields = DexTables._load_values(nn_var, Dex.DEXVAR_FIELD)
+
+    @staticmethod
+    def _load_values(nn_var, tag):
+        idxs, values = nn_var.supvals_table(tag)
+        return dict(itertools.izip(ida_idaapi.unpack_array(idxs, _EA_SIZE), values))
+
+    @staticmethod
+    def _load_strings(nn_var, tag):
+        strings = DexTables._load_values(nn_var, tag)
+        for idx, val in strings.iteritems():
+            strings[idx] = Dex.decode_string_supval(val, tag)
+        return strings
+
+    def get_string_ea(self, string_idx):
+        i = bisect.bisect_left(self.string_ids, string_idx)
+        if i == len(self.string_ids) or self.string_ids[i] != string_idx:
+            return ida_idaapi.BADADDR
+        return self.string_eas[i]
+
+    def get_string(self, string_idx):
+        try:
+            return self.strings[string_idx]
+        except KeyError:
+            s = Dex.read_string(self.get_string_ea(string_idx))
+            self.strings[string_idx] = s
+            return s
+
+    def memory_size(self):
+        """
+        Approximate number of bytes used by the tables
+        """
+        size = 0
+        for table in (self.string_ids, self.string_eas):
+            size += sys.getsizeof(table)
+        for table in (self.strings, self.type_strings, self.method_names, self.methods, self.fields):
+            size += sys.getsizeof(table)
+            for val in table.itervalues():
+                size += sys.getsizeof(val)
+        return size
+
+
 class Dex(object):
 
     # meta-data
@@ -205,7 +346,12 @@ class Dex(object):
     DEBINFO_LINEINFO = 1        # Line start EA => dex_lineinfo_t
 
     #---------------------------------------------------------------------------
-    def __init__(self):
+    def __init__(self, preload=False):
+        """
+        @param preload: read the metadata of each dex file into memory
+                        (see DexTables) the first time it is needed,
+                        instead of looking up the netnodes at each call
+        """
         self.nn_meta = idaapi.netnode("$ dex_meta")
         self.nn_cmn = idaapi.netnode("$ dex_cmn")
         packed = self.nn_meta.getblob(0, Dex.META_BASEADDRS)
@@ -215,20 +361,53 @@ class Dex(object):
         for i in range(2, len(self.baseaddrs) + 1):
             nn_var_name = "$ dex_var%d" % i
             self.nn_vars.append(idaapi.netnode(nn_var_name))
+        self.preload = preload
+        self.tables = [None] * len(self.nn_vars)
+        # range [lo, hi) of addresses of the last dex number found
+        self._last_dexnum = (0, 0, 0)
 
     #---------------------------------------------------------------------------
     def get_dexnum(self, from_ea):
-        dexnum = 0
-        for ba in self.baseaddrs:
-            if from_ea < ba:
-                break
-            dexnum += 1
+        lo, hi, dexnum = self._last_dexnum
+        if lo <= from_ea < hi:
+            return dexnum
+        dexnum = bisect.bisect_right(self.baseaddrs, from_ea)
+        lo = self.baseaddrs[dexnum - 1] if dexnum > 0 else 0
+        hi = self.baseaddrs[dexnum] if dexnum < len(self.baseaddrs) else ida_idaapi.BADADDR
+        self._last_dexnum = (lo, hi, dexnum)
         return dexnum
 
     #---------------------------------------------------------------------------
     def get_nn_var(self, from_ea):
         return self.nn_vars[self.get_dexnum(from_ea) - 1]
 
+    #---------------------------------------------------------------------------
+    def _get_tables(self, dexidx):
+        tables = self.tables[dexidx]
+        if tables is None:
+            tables = DexTables(self.nn_vars[dexidx])
+            self.tables[dexidx] = tables
+        return tables
+
+    def get_tables(self, from_ea):
+        """
+        Get the in-memory metadata of the dex file of 'from_ea',
+        reading it if needed
+        """
+        return self._get_tables(self.get_dexnum(from_ea) - 1)
+
+    def memory_size(self):
+        """
+        Approximate number of bytes used by the metadata read so far
+        """
+        return sum(t.memory_size() for t in self.tables if t is not None)
+
+    def unload_tables(self):
+        """
+        Forget the metadata read so far
+        """
+        self.tables = [None] * len(self.nn_vars)
+
     #---------------------------------------------------------------------------
     ACCESS_FLAGS = {
         "public"        : 0x00000001,
@@ -264,36 +443,56 @@ class Dex(object):
         return res[1:] if res else ""
 
     #---------------------------------------------------------------------------
+    def _idx_to_ea(self, dexidx, idx, tag):
+        if self.preload and tag == Dex.DEXVAR_STRING_IDS:
+            return self._get_tables(dexidx).get_string_ea(idx)
+        return self.nn_vars[dexidx].eaget_idx(idx, tag)
+
     def idx_to_ea(self, from_ea, idx, tag):
-        nn_var = self.get_nn_var(from_ea)
-        return nn_var.eaget_idx(idx, tag)
+        return self._idx_to_ea(self.get_dexnum(from_ea) - 1, idx, tag)
 
     #---------------------------------------------------------------------------
-    def get_string(self, from_ea, string_idx):
-        addr = self.idx_to_ea(from_ea, string_idx, Dex.DEXVAR_STRING_IDS)
+    @staticmethod
+    def read_string(addr):
         if addr == ida_idaapi.BADADDR:
             return None
         length = ida_bytes.get_max_strlit_length(addr, idc.STRTYPE_C, ida_bytes.ALOPT_IGNHEADS|ida_bytes.ALOPT_IGNPRINT)
         return ida_bytes.get_strlit_contents(addr, length, idc.STRTYPE_C)
 
+    def _get_string(self, dexidx, string_idx):
+        if self.preload:
+            return self._get_tables(dexidx).get_string(string_idx)
+        return Dex.read_string(self._idx_to_ea(dexidx, string_idx, Dex.DEXVAR_STRING_IDS))
+
+    def get_string(self, from_ea, string_idx):
+        return self._get_string(self.get_dexnum(from_ea) - 1, string_idx)
+
     def get_method_idx(self, ea):
         return self.nn_cmn.altval(ea, Dex.DEXCMN_METHOD_ID)
 
-    def get_method(self, from_ea, method_idx):
-        nn_var = self.get_nn_var(from_ea)
-        val = nn_var.supval(method_idx, Dex.DEXVAR_METHOD)
+    def _get_method(self, dexidx, method_idx):
+        if self.preload:
+            val = self._get_tables(dexidx).methods.get(method_idx, "")
+        else:
+            val = self.nn_vars[dexidx].supval(method_idx, Dex.DEXVAR_METHOD)
         if len(val) != ctypes.sizeof(dex_method):
             print("bad data in DEXVAR_METHOD for index 0x%X" % method_idx)
             return None
         method = get_struct(val,0, dex_method)
         return method
 
+    def get_method(self, from_ea, method_idx):
+        return self._get_method(self.get_dexnum(from_ea) - 1, method_idx)
+
     #---------------------------------------------------------------------------
     @staticmethod
     def get_string_by_index(node, idx, tag):
         if idx is None:
             return None
-        val = node.supval(idx, tag)
+        return Dex.decode_string_supval(node.supval(idx, tag), tag)
+
+    @staticmethod
+    def decode_string_supval(val, tag):
         # check for long line
         if len(val) == ctypes.sizeof(longname_director_t):
             longname_director = get_struct(val, 0, longname_director_t)
@@ -332,8 +531,15 @@ class Dex(object):
     # example, "Ljava/lang/String;" becomes "java.lang.String", and
     # "[I" becomes "int[]".  Also converts '$' to '.', which means this
     # form can't be converted back to a descriptor.
+    # The results are kept in TYPENAME_CACHE.
+    TYPENAME_CACHE = lru_cache_t(8192)
+
     @staticmethod
     def decorate_java_typename(desc):
+        return Dex.TYPENAME_CACHE.get(desc, Dex._decorate_java_typename)
+
+    @staticmethod
+    def _decorate_java_typename(desc):
         target_len = len(desc)
         offset = 0
         # strip leading [s; will be added to end
@@ -352,22 +558,26 @@ class Dex(object):
                 target_len -= 2
                 offset += 1
         # copy class name over
-        res = ""
-        for _i in range(0, target_len):
-            ch = desc[offset + _i]
-            res += '.' if ch == '/' else ch
+        res = desc[offset:offset + target_len].replace('/', '.')
         # add the appropriate number of brackets for arrays
-        res += "[]"*array_depth
-        return res
+        return res + "[]"*array_depth
 
     #---------------------------------------------------------------------------
+    def _get_type_string(self, dexidx, type_idx):
+        if self.preload:
+            return None if type_idx is None else self._get_tables(dexidx).type_strings.get(type_idx, "")
+        return Dex.get_string_by_index(self.nn_vars[dexidx], type_idx, Dex.DEXVAR_TYPE_STR)
+
     def get_type_string(self, from_ea, type_idx):
-        nn_var = self.get_nn_var(from_ea)
-        return Dex.get_string_by_index(nn_var, type_idx, Dex.DEXVAR_TYPE_STR)
+        return self._get_type_string(self.get_dexnum(from_ea) - 1, type_idx)
+
+    def _get_method_name(self, dexidx, method_idx):
+        if self.preload:
+            return None if method_idx is None else self._get_tables(dexidx).method_names.get(method_idx, "")
+        return Dex.get_string_by_index(self.nn_vars[dexidx], method_idx, Dex.DEXVAR_METH_STR)
 
     def get_method_name(self, from_ea, method_idx):
-        nn_var = self.get_nn_var(from_ea)
-        return Dex.get_string_by_index(nn_var, method_idx, Dex.DEXVAR_METH_STR)
+        return self._get_method_name(self.get_dexnum(from_ea) - 1, method_idx)
 
     def get_parameter_name(self, from_ea, idx):
         return self.get_string(from_ea, idx)
@@ -408,6 +618,42 @@ class Dex(object):
         res += self.get_full_type_name(self.get_type_string(method.defaddr, method.cname))
         res += '.'
         res += self.get_method_name(method.defaddr, method.id)
+        return res
+
+    def _get_method_signature(self, dexidx, method):
+        res = Dex.access_string(method.access_flags)
+        if res:
+            res += ' '
+        res += Dex.get_full_type_name(self._get_type_string(dexidx, method.proto_ret))
+        res += ' '
+        res += Dex.get_full_type_name(self._get_type_string(dexidx, method.cname))
+        res += '.'
+        res += self._get_method_name(dexidx, method.id) or ""
+        params = method.proto_params[:min(method.nparams, 32)]
+        res += '('
+        res += ", ".join(Dex.get_full_type_name(self._get_type_string(dexidx, p)) for p in params)
+        res += ')'
+        return res
+
+    # full signature of a method: access flags, return type, class,
+    # name and parameter types
+    def get_method_signature(self, method):
+        return self._get_method_signature(self.get_dexnum(method.defaddr) - 1, method)
+
+    # generate the (method_idx, signature) pairs of all the methods of
+    # a dex file (1 for the first one), reading its methods in one pass
+    def get_method_signatures(self, dexnum):
+        dexidx = dexnum - 1
+        if self.preload:
+            methods = self._get_tables(dexidx).methods
+        else:
+            methods = DexTables._load_values(self.nn_vars[dexidx], Dex.DEXVAR_METHOD)
+        for method_idx in sorted(methods):
+            val = methods[method_idx]
+            if len(val) != ctypes.sizeof(dex_method):
+                continue
+            method = get_struct(val, 0, dex_method)
+            yield (method_idx, self._get_method_signature(dexidx, method))
 
     def get_call_method_name(self, method):
         shorty = self.get_string(method.defaddr, method.proto_shorty)
@@ -427,15 +673,50 @@ class Dex(object):
 
 
     #---------------------------------------------------------------------------
-    def get_field(self, from_ea, field_idx):
-        nn_var = self.get_nn_var(from_ea)
-        val = nn_var.supval(field_idx, Dex.DEXVAR_FIELD)
+    def _get_field(self, dexidx, field_idx):
+        if self.preload:
+            val = self._get_tables(dexidx).fields.get(field_idx, "")
+        else:
+            val = self.nn_vars[dexidx].supval(field_idx, Dex.DEXVAR_FIELD)
         if len(val) != ctypes.sizeof(dex_field):
             print("bad data in DEXVAR_FIELD for index 0x%X" % field_idx)
             return None
         field = get_struct(val,0, dex_field)
         return field
 
+    def get_field(self, from_ea, field_idx):
+        return self._get_field(self.get_dexnum(from_ea) - 1, field_idx)
+
+    #---------------------------------------------------------------------------
+    # Batch versions of the accessors: they take a sequence of
+    # (from_ea, idx) pairs, resolve them grouped by dex file, and
+    # return the results in the order of the pairs.
+    def _resolve_batch(self, getter, pairs):
+        pairs = list(pairs)
+        by_dex = {}
+        for i, (from_ea, _idx) in enumerate(pairs):
+            by_dex.setdefault(self.get_dexnum(from_ea) - 1, []).append(i)
+        res = [None] * len(pairs)
+        for dexidx, positions in by_dex.iteritems():
+            for i in positions:
+                res[i] = getter(dexidx, pairs[i][1])
+        return res
+
+    def get_strings(self, pairs):
+        return self._resolve_batch(self._get_string, pairs)
+
+    def get_type_strings(self, pairs):
+        return self._resolve_batch(self._get_type_string, pairs)
+
+    def get_methods(self, pairs):
+        return self._resolve_batch(self._get_method, pairs)
+
+    def get_method_names(self, pairs):
+        return self._resolve_batch(self._get_method_name, pairs)
+
+    def get_fields(self, pairs):
+        return self._resolve_batch(self._get_field, pairs)
+
 
     def get_field_name(self, from_ea, field_idx):
         field = self.get_field(from_ea, field_idx)
@@ -457,6 +738,138 @@ class Dex(object):
         res += field_name if field_name else self.get_field_name(field.maddr, field_idx)
 
 
+#---------------------------------------------------------------------------
+# Streaming export of the methods, fields and try lists of all the dex
+# files. The '$ dex_var' netnodes are read sequentially, 'chunk' records
+# at a time, so that the memory used does not depend on the size of the
+# dex files.
+#
+# Example:
+#   exporter = DexExporter(Dex())
+#   with open("methods.jsonl", "w") as out:
+#       exporter.write_jsonl(out, "methods")
+#
+class DexExporter(object):
+
+    COLUMNS = {
+        "methods"   : ("dex", "method_idx", "class", "name", "signature",
+                       "access_flags", "start_ea", "end_ea"),
+        "fields"    : ("dex", "field_idx", "class", "name", "type"),
+        "try_lists" : ("dex", "method_idx", "data"),
+    }
+
+    def __init__(self, dex, chunk=4096):
+        self.dex = dex
+        self.chunk = chunk
+
+    #---------------------------------------------------------------------------
+    # generate the (idx, value) pairs of the supvals with the given tag
+    def _walk(self, dexidx, tag):
+        nn_var = self.dex.nn_vars[dexidx]
+        start = 0
+        while True:
+            idxs, values = nn_var.supvals_table(tag, start, self.chunk)
+            idxs = ida_idaapi.unpack_array(idxs, _EA_SIZE)
+            for pair in itertools.izip(idxs, values):
+                yield pair
+            if len(idxs) < self.chunk:
+                break
+            start = idxs[-1] + 1
+
+    def _methods(self, dexidx):
+        dex = self.dex
+        for method_idx, val in self._walk(dexidx, Dex.DEXVAR_METHOD):
+            if len(val) != ctypes.sizeof(dex_method):
+                continue
+            method = get_struct(val, 0, dex_method)
+            yield (dexidx + 1,
+                   method_idx,
+                   Dex.get_full_type_name(dex._get_type_string(dexidx, method.cname)),
+                   dex._get_method_name(dexidx, method.id),
+                   dex._get_method_signature(dexidx, method),
+                   method.access_flags,
+                   method.startAddr,
+                   method.endAddr)
+
+    def _fields(self, dexidx):
+        dex = self.dex
+        for field_idx, val in self._walk(dexidx, Dex.DEXVAR_FIELD):
+            if len(val) != ctypes.sizeof(dex_field):
+                continue
+            field = get_struct(val, 0, dex_field)
+            yield (dexidx + 1,
+                   field_idx,
+                   Dex.get_full_type_name(dex._get_type_string(dexidx, field.ctype)),
+                   dex._get_string(dexidx, field.name),
+                   Dex.get_full_type_name(dex._get_type_string(dexidx, field.type)))
+
+    def _try_lists(self, dexidx):
+        for method_idx, val in self._walk(dexidx, Dex.DEXVAR_TRYLIST):
+            yield (dexidx + 1, method_idx, val.encode("hex"))
+
+    #---------------------------------------------------------------------------
+    # generate the rows (tuples, see COLUMNS) of a table ("methods",
+    # "fields" or "try_lists") for all the dex files
+    def rows(self, table):
+        if table not in DexExporter.COLUMNS:
+            raise ValueError("Unknown table: %s" % table)
+        walk = getattr(self, "_" + table)
+        for dexidx in range(len(self.dex.nn_vars)):
+            for row in walk(dexidx):
+                yield row
+
+    # generate the rows of a table by chunks of up to 'chunk' rows, in
+    # columnar form: a dictionary of column name => list of values
+    def column_chunks(self, table):
+        columns = DexExporter.COLUMNS[table]
+        rows = self.rows(table)
+        while True:
+            block = list(itertools.islice(rows, self.chunk))
+            if not block:
+                break
+            yield dict(itertools.izip(columns, itertools.izip(*block)))
+
+    #---------------------------------------------------------------------------
+    # The dex strings are MUTF-8 encoded: NUL is encoded as "\xC0\x80", and
+    # the characters outside the BMP as surrogate pairs. Malformed strings
+    # are decoded with replacement characters, so that an export never
+    # stops part-way.
+    @staticmethod
+    def decode_mutf8(s):
+        return s.replace("\xC0\x80", "\x00").decode("utf-8", "replace")
+
+    @staticmethod
+    def _decode_row(row):
+        return tuple(DexExporter.decode_mutf8(v) if isinstance(v, str) else v
+                     for v in row)
+
+    # format a CSV field like csv.writer does (minimal quoting), but
+    # UTF-8 encoded, and without truncating the strings at NUL characters
+    @staticmethod
+    def _csv_field(v):
+        if v is None:
+            return ""
+        v = v.encode("utf-8") if isinstance(v, unicode) else str(v)
+        if any(c in v for c in ',"\r\n'):
+            v = '"%s"' % v.replace('"', '""')
+        return v
+
+    def write_jsonl(self, out, table):
+        columns = DexExporter.COLUMNS[table]
+        for row in self.rows(table):
+            row = DexExporter._decode_row(row)
+            out.write(json.dumps(dict(itertools.izip(columns, row))))
+            out.write("\n")
+
+    def write_csv(self, out, table):
+        out.write(",".join(DexExporter.COLUMNS[table]))
+        out.write("\r\n")
+        for row in self.rows(table):
+            row = DexExporter._decode_row(row)
+            out.write(",".join(DexExporter._csv_field(v) for v in row))
+            out.write("\r\n")
+
+
 #---------------------------------------------------------------------------
 if __name__ == '__main__':
     dex = Dex()
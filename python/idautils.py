@@ -20,18 +20,30 @@ import ida_idaapi
 import ida_idd
 import ida_idp
 import ida_kernwin
+import ida_lines
 import ida_loader
 import ida_nalt
 import ida_name
 import ida_netnode
 import ida_segment
 import ida_strlist
+import ida_struct
 import ida_ua
 import ida_xref
 
 import idc
 import types
 import os
+import re
+import struct
+import bisect
+import collections
+import itertools
+import weakref
+
+# Sizes of the items packed by the native bulk getters
+_EA_SIZE    = 8 if ida_idaapi.__EA64__ else 4
+_FLAGS_SIZE = 4
 
 
 def refs(ea, funcfirst, funcnext):
@@ -143,15 +155,16 @@ def XrefTypeName(typecode):
     assert typecode in _ref_types, "unknown reference type %d" % typecode
     return _ref_types[typecode]
 
+class xref_t(collections.namedtuple("xref_t", ["frm", "to", "iscode", "type", "user"])):
+    """
+    Immutable cross-reference record, as returned by XrefsFrom() and XrefsTo()
+    """
+    __slots__ = ()
+
+
 def _copy_xref(xref):
     """ Make a private copy of the xref class to preserve its contents """
-    class _xref(object):
-        pass
-
-    xr = _xref()
-    for attr in [ 'frm', 'to', 'iscode', 'type', 'user' ]:
-        setattr(xr, attr, getattr(xref, attr))
-    return xr
+    return xref_t(xref.frm, xref.to, xref.iscode, xref.type, xref.user)
 
 
 def XrefsFrom(ea, flags=0):
@@ -166,11 +179,8 @@ def XrefsFrom(ea, flags=0):
                print xref.type, XrefTypeName(xref.type), \
                          'from', hex(xref.frm), 'to', hex(xref.to)
     """
-    xref = ida_xref.xrefblk_t()
-    if xref.first_from(ea, flags):
-        yield _copy_xref(xref)
-        while xref.next_from():
-            yield _copy_xref(xref)
+    for xref in ida_xref.collect_xrefs(ea, flags, False):
+        yield xref_t._make(xref)
 
 
 def XrefsTo(ea, flags=0):
@@ -185,11 +195,247 @@ def XrefsTo(ea, flags=0):
                print xref.type, XrefTypeName(xref.type), \
                          'from', hex(xref.frm), 'to', hex(xref.to)
     """
-    xref = ida_xref.xrefblk_t()
-    if xref.first_to(ea, flags):
-        yield _copy_xref(xref)
-        while xref.next_to():
-            yield _copy_xref(xref)
+    for xref in ida_xref.collect_xrefs(ea, flags, True):
+        yield xref_t._make(xref)
+
+
+# -----------------------------------------------------------------------
+class _idb_invalidator_t(ida_idp.IDB_Hooks):
+    """
+    INTERNAL
+    Reports the ranges where items were created or destroyed to the
+    owner's _invalidate(start, end), and the changes affecting the whole
+    database to its _invalidate_all().
+    The owner is only weakly referenced, and must unhook() on deletion.
+    """
+    def __init__(self, owner):
+        ida_idp.IDB_Hooks.__init__(self)
+        self._owner = weakref.ref(owner)
+
+    def _notify(self, start=None, end=None):
+        owner = self._owner()
+        if owner is not None:
+            if start is None:
+                owner._invalidate_all()
+            else:
+                owner._invalidate(start, end)
+        return 0
+
+    def make_code(self, insn):
+        return self._notify(insn.ea, insn.ea + insn.size)
+
+    def make_data(self, ea, flags, tid, len):
+        return self._notify(ea, ea + len)
+
+    def destroyed_items(self, ea1, ea2, will_disable_range):
+        return self._notify(ea1, ea2)
+
+    def segm_deleted(self, start_ea, end_ea):
+        return self._notify(start_ea, end_ea)
+
+    def segm_moved(self, _from, to, size, changed_netmap):
+        return self._notify()
+
+    def allsegs_moved(self, info):
+        return self._notify()
+
+    def closebase(self):
+        return self._notify()
+
+
+def _merge_range(ranges, start, end):
+    """
+    Add [start, end) to a sorted list of disjoint (start, end) ranges - INTERNAL USE ONLY
+    """
+    i = bisect.bisect_left(ranges, (start, start))
+    if i > 0 and ranges[i-1][1] >= start:
+        i -= 1
+    j = i
+    while j < len(ranges) and ranges[j][0] <= end:
+        start = min(start, ranges[j][0])
+        end = max(end, ranges[j][1])
+        j += 1
+    ranges[i:j] = [(start, end)]
+
+
+def _in_ranges(ranges, ea):
+    """
+    Check if 'ea' belongs to a sorted list of disjoint (start, end) ranges - INTERNAL USE ONLY
+    """
+    i = bisect.bisect_right(ranges, (ea, ida_idaapi.BADADDR))
+    return i > 0 and ea < ranges[i-1][1]
+
+
+class XrefIndex(object):
+    """
+    Snapshot of the cross-references of (a range of) the database.
+
+    The references are read in one pass and kept as two adjacency tables in
+    the 'compressed sparse row' layout (sorted addresses, offsets, peers and
+    types), one grouped by source and one grouped by target. Queries
+    are then a bisect and a slice, instead of one SWIG call per reference.
+
+    The index follows the creation and deletion of items reported by the
+    IDB events: the references of the affected ranges are re-read at the
+    next query. References added or deleted directly (add_cref(), del_dref()...)
+    without any item change are not reported; call invalidate() after those.
+
+    Example::
+
+        xi = XrefIndex()
+        for f in Functions():
+            callers = xi.sources_to(f)
+    """
+    def __init__(self, start=None, end=None, flags=ida_xref.XREF_ALL):
+        """
+        @param start: start address (default: inf.min_ea)
+        @param end:   end address (default: inf.max_ea)
+        @param flags: any of ida_xref.XREF_* flags
+        """
+        if not start: start = ida_ida.cvar.inf.min_ea
+        if not end:   end = ida_ida.cvar.inf.max_ea
+        self.start_ea = start
+        self.end_ea = end
+        self.flags = flags
+        self._build()
+        self.__hooks = _idb_invalidator_t(self)
+        self.__hooks.hook()
+
+    def __del__(self):
+        hooks = getattr(self, "_XrefIndex__hooks", None)
+        if hooks is not None:
+            hooks.unhook()
+
+    def _build(self):
+        self._from = self._load_csr(False)
+        self._to = self._load_csr(True)
+        # ranges whose outgoing references were re-read since the build,
+        # and the references re-read there, by source and by target
+        self._patched = []
+        self._from_delta = {}
+        self._to_delta = {}
+        self._pending = []
+        self._stale = False
+
+    def _load_csr(self, by_target):
+        keys, offsets, peers, types = ida_xref.get_xrefs_csr(
+            self.start_ea, self.end_ea, self.flags, by_target)
+        return (ida_idaapi.unpack_array(keys, _EA_SIZE),
+                ida_idaapi.unpack_array(offsets, 4),
+                ida_idaapi.unpack_array(peers, _EA_SIZE),
+                ida_idaapi.unpack_array(types, 1))
+
+    def _invalidate(self, start, end):
+        self._pending.append((start, end))
+
+    def _invalidate_all(self):
+        self._stale = True
+
+    def invalidate(self, start=None, end=None):
+        """
+        Forget the references from the given range, or rebuild the whole
+        index at the next query if no range is given.
+
+        @param start: start address of the range; None for the whole index
+        @param end: end address of the range (excluded); None to forget
+                    only the references from 'start'
+        """
+        if start is None:
+            self._invalidate_all()
+        else:
+            if end is None:
+                end = start + 1
+            self._invalidate(start, end)
+
+    def _sync(self):
+        if self._stale:
+            self._build()
+        while self._pending:
+            start, end = self._pending.pop()
+            start = max(start, self.start_ea)
+            end = min(end, self.end_ea)
+            if start >= end:
+                continue
+            _merge_range(self._patched, start, end)
+            for frm in [frm for frm in self._from_delta if start <= frm < end]:
+                for to, t in self._from_delta.pop(frm):
+                    self._to_delta[to] = [(f, tt) for f, tt in self._to_delta[to] if f != frm]
+            keys, offsets, peers, types = ida_xref.get_xrefs_csr(start, end, self.flags, False)
+            keys = ida_idaapi.unpack_array(keys, _EA_SIZE)
+            offsets = ida_idaapi.unpack_array(offsets, 4)
+            peers = ida_idaapi.unpack_array(peers, _EA_SIZE)
+            types = ida_idaapi.unpack_array(types, 1)
+            for i, frm in enumerate(keys):
+                row = zip(peers[offsets[i]:offsets[i+1]], types[offsets[i]:offsets[i+1]])
+                self._from_delta[frm] = row
+                for to, t in row:
+                    self._to_delta.setdefault(to, []).append((frm, t))
+
+    @staticmethod
+    def _row(csr, ea):
+        keys, offsets, peers, types = csr
+        i = bisect.bisect_left(keys, ea)
+        if i == len(keys) or keys[i] != ea:
+            return ([], [])
+        return (peers[offsets[i]:offsets[i+1]], types[offsets[i]:offsets[i+1]])
+
+    def _covers(self, ea):
+        return self.start_ea <= ea < self.end_ea
+
+    def _refs_from(self, ea):
+        self._sync()
+        if _in_ranges(self._patched, ea):
+            return self._from_delta.get(ea, [])
+        return zip(*self._row(self._from, ea))
+
+    def _refs_to(self, ea):
+        self._sync()
+        row = zip(*self._row(self._to, ea))
+        if self._patched:
+            row = [(frm, t) for frm, t in row if not _in_ranges(self._patched, frm)]
+            row.extend(self._to_delta.get(ea, []))
+        return row
+
+    @staticmethod
+    def _make_xref(frm, to, t):
+        return xref_t(
+            frm,
+            to,
+            int((t & ida_xref.XREFCSR_ISCODE) != 0),
+            t & ~(ida_xref.XREFCSR_ISCODE | ida_xref.XREFCSR_USER),
+            int((t & ida_xref.XREFCSR_USER) != 0))
+
+    def XrefsFrom(self, ea):
+        """
+        Return all references from address 'ea' (see idautils.XrefsFrom())
+        """
+        if not self._covers(ea):
+            return XrefsFrom(ea, self.flags)
+        return [XrefIndex._make_xref(ea, to, t) for to, t in self._refs_from(ea)]
+
+    def XrefsTo(self, ea):
+        """
+        Return all references to address 'ea' (see idautils.XrefsTo())
+        """
+        if not self._covers(ea):
+            return XrefsTo(ea, self.flags)
+        return [XrefIndex._make_xref(frm, ea, t) for frm, t in self._refs_to(ea)]
+
+    def targets_from(self, ea):
+        """
+        Return the addresses referenced from 'ea'
+        """
+        if not self._covers(ea):
+            return [x.to for x in XrefsFrom(ea, self.flags)]
+        return [to for to, t in self._refs_from(ea)]
+
+    def sources_to(self, ea):
+        """
+        Return the addresses referencing 'ea'
+        """
+        if not self._covers(ea):
+            return [x.frm for x in XrefsTo(ea, self.flags)]
+        return [frm for frm, t in self._refs_to(ea)]
 
 
 def Threads():
@@ -218,6 +464,85 @@ def Heads(start=None, end=None):
         ea = ida_bytes.next_head(ea, end)
 
 
+def HeadsChunks(start=None, end=None, chunk=0x10000):
+    """
+    Get the heads (instructions or data) in chunks. The heads are collected
+    natively, so sweeping the whole database costs one call per chunk
+    instead of one call per head.
+
+    @param start: start address (default: inf.min_ea)
+    @param end:   end address (default: inf.max_ea)
+    @param chunk: maximum number of heads per chunk
+
+    @return: list of tuples (heads, flags), where 'heads' holds the addresses
+             of up to 'chunk' heads and 'flags' their flags. Both are
+             array.array instances (see ida_idaapi.unpack_array())
+
+    Example::
+
+        for heads, flags in HeadsChunks():
+            for ea, F in zip(heads, flags):
+                if ida_bytes.is_code(F):
+                    print "%x" % ea
+    """
+    if not start: start = ida_ida.cvar.inf.min_ea
+    if not end:   end = ida_ida.cvar.inf.max_ea
+
+    assert chunk > 0, "Invalid chunk size %d" % chunk
+
+    ea = start
+    while ea != ida_idaapi.BADADDR:
+        heads, flags, ea = ida_bytes.get_heads_chunk(ea, end, chunk)
+        if heads:
+            yield (ida_idaapi.unpack_array(heads, _EA_SIZE),
+                   ida_idaapi.unpack_array(flags, _FLAGS_SIZE))
+
+
+class disasm_line_t(collections.namedtuple("disasm_line_t", ["ea", "mnem", "operands", "line"])):
+    """
+    Disassembly text of a head, as returned by DisasmLines()
+    """
+    __slots__ = ()
+
+
+def DisasmLines(start=None, end=None, tagged=False, split=True, chunk=0x1000):
+    """
+    Get the disassembly text of the heads (instructions or data).
+    The text is generated natively, one chunk of heads at a time, and
+    each head is rendered only once: exporting a whole database costs
+    time linear in its size, and memory bounded by the chunk size.
+
+    @param start:  start address (default: inf.min_ea)
+    @param end:    end address (default: inf.max_ea)
+    @param tagged: keep the color tags in the lines (implies split=False)
+    @param split:  extract the mnemonic and operands of the instructions,
+                   as idc.print_insn_mnem() and idc.print_operand() would
+    @param chunk:  maximum number of heads rendered per native call
+
+    @return: list of disasm_line_t(ea, mnem, operands, line) records.
+             For data heads 'mnem' is "" and 'operands' is (); both are
+             None if the lines are not split.
+    """
+    if not start: start = ida_ida.cvar.inf.min_ea
+    if not end:   end = ida_ida.cvar.inf.max_ea
+
+    assert chunk > 0, "Invalid chunk size %d" % chunk
+
+    flags = 0
+    if tagged:
+        flags |= ida_lines.DISASMCHUNK_TAGGED
+    if not split:
+        flags |= ida_lines.DISASMCHUNK_NOSPLIT
+    ea = start
+    while ea != ida_idaapi.BADADDR:
+        eas, lines, mnems, operands, ea = ida_lines.get_disasm_chunk(ea, end, chunk, flags)
+        eas = ida_idaapi.unpack_array(eas, _EA_SIZE)
+        if mnems is None:
+            mnems = operands = itertools.repeat(None)
+        for row in itertools.izip(eas, mnems, operands, lines):
+            yield disasm_line_t._make(row)
+
+
 def Functions(start=None, end=None):
     """
     Get a list of functions
@@ -249,6 +574,84 @@ def Functions(start=None, end=None):
         func = ida_funcs.get_next_func(startea)
 
 
+class FunctionTable(object):
+    """
+    Table of functions, with their attributes stored in columns.
+
+    The table is collected in one native pass; its columns are attributes
+    of the table (array.array instances, except for 'name' which is a list):
+
+        start_ea: start address of the function
+        end_ea:   end address of the entry chunk
+        flags:    function flags (FUNC_...)
+        frsize:   size of local variables
+        name:     function name
+        chunks:   number of chunks (including the entry chunk)
+
+    Iterating over the table yields one row (a namedtuple) per function.
+
+    Example::
+
+        t = FunctionTable(fields=["name", "chunks"])
+        for row in t:
+            print "%x: %s (%d chunks)" % (row.start_ea, row.name, row.chunks)
+    """
+    FIELDS = ("start_ea", "end_ea", "flags", "frsize", "name", "chunks")
+
+    _field_bits = {
+        "start_ea" : 0,
+        "end_ea"   : ida_funcs.FUNCTBL_END_EA,
+        "flags"    : ida_funcs.FUNCTBL_FLAGS,
+        "frsize"   : ida_funcs.FUNCTBL_FRSIZE,
+        "name"     : ida_funcs.FUNCTBL_NAME,
+        "chunks"   : ida_funcs.FUNCTBL_CHUNKS,
+    }
+
+    def __init__(self, start=None, end=None, fields=FIELDS):
+        """
+        @param start: start address (default: inf.min_ea)
+        @param end:   end address (default: inf.max_ea)
+        @param fields: names of the columns to collect (see FIELDS).
+                       'start_ea' is always collected.
+
+        @note: functions are enumerated like Functions() does
+        """
+        if not start: start = ida_ida.cvar.inf.min_ea
+        if not end:   end = ida_ida.cvar.inf.max_ea
+
+        bits = 0
+        for field in fields:
+            if field not in FunctionTable._field_bits:
+                raise ValueError("Unknown field: %s" % field)
+            bits |= FunctionTable._field_bits[field]
+        start_eas, end_eas, flags, frsizes, names, chunks = ida_funcs.get_func_table(start, end, bits)
+
+        self.fields = ("start_ea",) + tuple(f for f in FunctionTable.FIELDS if f != "start_ea" and f in fields)
+        self.start_ea = ida_idaapi.unpack_array(start_eas, _EA_SIZE)
+        if end_eas is not None:
+            self.end_ea = ida_idaapi.unpack_array(end_eas, _EA_SIZE)
+        if flags is not None:
+            self.flags = ida_idaapi.unpack_array(flags, 8)
+        if frsizes is not None:
+            self.frsize = ida_idaapi.unpack_array(frsizes, _EA_SIZE)
+        if names is not None:
+            self.name = names
+        if chunks is not None:
+            self.chunks = ida_idaapi.unpack_array(chunks, 4)
+        self._row_t = collections.namedtuple("function_row_t", self.fields)
+
+    def __len__(self):
+        return len(self.start_ea)
+
+    def __getitem__(self, index):
+        """Returns the row of the function at 'index'"""
+        return self._row_t._make(getattr(self, f)[index] for f in self.fields)
+
+    def __iter__(self):
+        make = self._row_t._make
+        return (make(row) for row in itertools.izip(*[getattr(self, f) for f in self.fields]))
+
+
 def Chunks(start):
     """
     Get a list of function chunks
@@ -283,11 +686,177 @@ def Names():
 
     @return: List of tuples (ea, name)
     """
-    for i in xrange(ida_name.get_nlist_size()):
-        ea   = ida_name.get_nlist_ea(i)
-        name = ida_name.get_nlist_name(i)
+    eas, names = ida_name.get_nlist_table(0, ida_idaapi.BADADDR)
+    for ea, name in itertools.izip(ida_idaapi.unpack_array(eas, _EA_SIZE), names):
         yield (ea, name)
 
+class _names_invalidator_t(_idb_invalidator_t):
+    """
+    INTERNAL
+    Also reports the renamed addresses to the owner's _renamed(ea, name).
+    """
+    def renamed(self, ea, new_name, local_name):
+        owner = self._owner()
+        if owner is not None:
+            owner._renamed(ea, new_name)
+        return 0
+
+
+class NameIndex(object):
+    """
+    Snapshot of the list of names (see Names()), indexed both ways.
+
+    The names are read in one pass and kept as a sorted array of addresses
+    (with the parallel list of names) and a dictionary from names to
+    addresses.
+
+    The index follows the renamings reported by the IDB events, and re-reads
+    the names of the ranges where items were created or destroyed at the
+    next query, instead of being rebuilt.
+
+    Example::
+
+        ni = NameIndex()
+        for ea, name in ni.startswith("sub_"):
+            print "%x: %s" % (ea, name)
+    """
+    def __init__(self):
+        self._build()
+        self.__hooks = _names_invalidator_t(self)
+        self.__hooks.hook()
+
+    def __del__(self):
+        hooks = getattr(self, "_NameIndex__hooks", None)
+        if hooks is not None:
+            hooks.unhook()
+
+    def _build(self):
+        self._eas, self._names = NameIndex._load_table(0, ida_idaapi.BADADDR)
+        self._by_name = dict(itertools.izip(self._names, self._eas))
+        self._sorted_names = None
+        self._pending = []
+        self._stale = False
+
+    @staticmethod
+    def _load_table(start, end):
+        eas, names = ida_name.get_nlist_table(start, end)
+        return (ida_idaapi.unpack_array(eas, _EA_SIZE), names)
+
+    def _invalidate(self, start, end):
+        _merge_range(self._pending, start, end)
+
+    def _invalidate_all(self):
+        self._stale = True
+
+    def _renamed(self, ea, name):
+        if self._stale:
+            return
+        i = bisect.bisect_left(self._eas, ea)
+        found = i < len(self._eas) and self._eas[i] == ea
+        if found:
+            self._by_name.pop(self._names[i], None)
+        if name and ida_name.is_in_nlist(ea):
+            if found:
+                self._names[i] = name
+            else:
+                self._eas.insert(i, ea)
+                self._names.insert(i, name)
+            self._by_name[name] = ea
+        elif found:
+            del self._eas[i]
+            del self._names[i]
+        self._sorted_names = None
+
+    def _sync(self):
+        if self._stale:
+            self._build()
+        while self._pending:
+            start, end = self._pending.pop()
+            eas, names = NameIndex._load_table(start, end)
+            i = bisect.bisect_left(self._eas, start)
+            j = bisect.bisect_left(self._eas, end)
+            for name in self._names[i:j]:
+                self._by_name.pop(name, None)
+            self._eas[i:j] = eas
+            self._names[i:j] = names
+            self._by_name.update(itertools.izip(names, eas))
+            self._sorted_names = None
+
+    def __len__(self):
+        self._sync()
+        return len(self._eas)
+
+    def __iter__(self):
+        """
+        Iterate over the (ea, name) tuples, in address order
+        """
+        self._sync()
+        return itertools.izip(list(self._eas), list(self._names))
+
+    def get_name(self, ea):
+        """
+        Get the name at 'ea'
+
+        @return: the name, or None
+        """
+        self._sync()
+        i = bisect.bisect_left(self._eas, ea)
+        if i < len(self._eas) and self._eas[i] == ea:
+            return self._names[i]
+        return None
+
+    def get_ea(self, name):
+        """
+        Get the address of a name
+
+        @return: the address, or BADADDR
+        """
+        self._sync()
+        return self._by_name.get(name, ida_idaapi.BADADDR)
+
+    def nearest(self, ea):
+        """
+        Get the closest name at or below 'ea'
+
+        @return: a tuple (ea, name), or None
+        """
+        self._sync()
+        i = bisect.bisect_right(self._eas, ea)
+        if i == 0:
+            return None
+        return (self._eas[i-1], self._names[i-1])
+
+    def startswith(self, prefix):
+        """
+        Get the names starting with 'prefix'
+
+        @return: a list of (ea, name) tuples, sorted by name
+        """
+        self._sync()
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self._by_name)
+        names = self._sorted_names
+        i = bisect.bisect_left(names, prefix)
+        result = []
+        while i < len(names) and names[i].startswith(prefix):
+            result.append((self._by_name[names[i]], names[i]))
+            i += 1
+        return result
+
+    def search(self, pattern, flags=0):
+        """
+        Get the names matching a regular expression (see re.search())
+
+        @param pattern: the regular expression, as a string or compiled
+        @param flags:   the re.* flags, if 'pattern' is a string
+        @return: a list of (ea, name) tuples, in address order
+        """
+        self._sync()
+        if isinstance(pattern, basestring):
+            pattern = re.compile(pattern, flags)
+        match = pattern.search
+        return [(ea, name) for ea, name in itertools.izip(self._eas, self._names) if match(name)]
+
 
 def Segments():
     """
@@ -300,6 +869,138 @@ def Segments():
         if seg:
             yield seg.start_ea
 
+class _segm_invalidator_t(_idb_invalidator_t):
+    """
+    INTERNAL
+    Reports any change to the segments to the owner's _invalidate_all(),
+    and ignores the creation and destruction of items.
+    """
+    def _notify_segm(self, *args):
+        return self._notify()
+
+    def make_code(self, insn):
+        return 0
+
+    def make_data(self, ea, flags, tid, len):
+        return 0
+
+    def destroyed_items(self, ea1, ea2, will_disable_range):
+        return 0
+
+    segm_added = _notify_segm
+    segm_deleted = _notify_segm
+    segm_start_changed = _notify_segm
+    segm_end_changed = _notify_segm
+    segm_name_changed = _notify_segm
+    segm_class_changed = _notify_segm
+    segm_attrs_updated = _notify_segm
+
+
+class SegmentTable(object):
+    """
+    Table of segments, with their attributes stored in columns.
+
+    The table is collected in one native pass; its columns are attributes
+    of the table (array.array instances, except for 'name' and 'sclass'
+    which are lists):
+
+        start_ea: start address of the segment
+        end_ea:   end address of the segment
+        perm:     permissions (SEGPERM_...)
+        bitness:  0: 16 bits, 1: 32 bits, 2: 64 bits
+        type:     segment type (SEG_...)
+        sel:      segment selector
+        name:     segment name
+        sclass:   segment class
+
+    The table is collected again, at the next access, after the IDB events
+    report that segments were added, deleted, moved, resized or modified.
+
+    Iterating over the table yields one row (a namedtuple) per segment.
+
+    Example::
+
+        st = SegmentTable()
+        for ea in Heads():
+            seg = st.segment_at(ea)
+    """
+    FIELDS = ("start_ea", "end_ea", "perm", "bitness", "type", "sel", "name", "sclass")
+
+    _row_t = collections.namedtuple("segment_row_t", FIELDS)
+
+    def __init__(self):
+        self._build()
+        self.__hooks = _segm_invalidator_t(self)
+        self.__hooks.hook()
+
+    def __del__(self):
+        hooks = getattr(self, "_SegmentTable__hooks", None)
+        if hooks is not None:
+            hooks.unhook()
+
+    def _build(self):
+        start_eas, end_eas, perms, bitnesses, types, sels, names, classes = \
+            ida_segment.get_segm_table()
+        self._start_ea = ida_idaapi.unpack_array(start_eas, _EA_SIZE)
+        self._end_ea = ida_idaapi.unpack_array(end_eas, _EA_SIZE)
+        self._perm = ida_idaapi.unpack_array(perms, 1)
+        self._bitness = ida_idaapi.unpack_array(bitnesses, 1)
+        self._type = ida_idaapi.unpack_array(types, 1)
+        self._sel = ida_idaapi.unpack_array(sels, _EA_SIZE)
+        self._name = names
+        self._sclass = classes
+        self._stale = False
+
+    def _invalidate_all(self):
+        self._stale = True
+
+    def _column(self, field):
+        if self._stale:
+            self._build()
+        return getattr(self, "_" + field)
+
+    start_ea = property(lambda self: self._column("start_ea"))
+    end_ea   = property(lambda self: self._column("end_ea"))
+    perm     = property(lambda self: self._column("perm"))
+    bitness  = property(lambda self: self._column("bitness"))
+    type     = property(lambda self: self._column("type"))
+    sel      = property(lambda self: self._column("sel"))
+    name     = property(lambda self: self._column("name"))
+    sclass   = property(lambda self: self._column("sclass"))
+
+    def __len__(self):
+        return len(self.start_ea)
+
+    def __getitem__(self, index):
+        """Returns the row of the segment at 'index'"""
+        return self._row_t._make(self._column(f)[index] for f in self.FIELDS)
+
+    def __iter__(self):
+        make = self._row_t._make
+        return (make(row) for row in itertools.izip(*[self._column(f) for f in self.FIELDS]))
+
+    def index_at(self, ea):
+        """
+        Get the index of the segment containing 'ea'
+
+        @return: the index, or -1
+        """
+        i = bisect.bisect_right(self.start_ea, ea) - 1
+        if i >= 0 and ea < self._end_ea[i]:
+            return i
+        return -1
+
+    def segment_at(self, ea):
+        """
+        Get the segment containing 'ea' (like getseg(), without calling
+        into the kernel)
+
+        @return: the row of the segment, or None
+        """
+        i = self.index_at(ea)
+        return self[i] if i >= 0 else None
+
+
 
 def Entries():
     """
@@ -359,14 +1060,72 @@ def StructMembers(sid):
     @note: This will not return 'holes' in structures/stack frames;
            it only returns defined structure members.
     """
-    m = idc.get_first_member(sid)
-    if m == -1:
+    members = ida_struct.get_struc_members(sid, False)
+    if members is None:
         raise Exception("No structure with ID: 0x%x" % sid)
-    while (m != ida_idaapi.BADADDR):
-        name = idc.get_member_name(sid, m)
+    offsets, sizes, flags, names, types = members
+    offsets = ida_idaapi.unpack_array(offsets, _EA_SIZE)
+    sizes = ida_idaapi.unpack_array(sizes, _EA_SIZE)
+    for m, name, size in itertools.izip(offsets, names, sizes):
         if name:
-            yield (m, name, idc.get_member_size(sid, m))
-        m = idc.get_next_offset(sid, m)
+            yield (m, name, size)
+
+
+class struc_dump_t(collections.namedtuple(
+        "struc_dump_t",
+        ["sid", "name", "size",
+         "member_offsets", "member_sizes", "member_flags",
+         "member_names", "member_types"])):
+    """
+    A structure and its members, as returned by StructsDump().
+    The member_* items hold one item per member: member_offsets,
+    member_sizes and member_flags are arrays, member_names and
+    member_types are lists of str (member_types is None unless
+    the types were requested).
+    """
+    __slots__ = ()
+
+
+def StructsDump(with_types=True, chunk=1024):
+    """
+    Get all the structures with their members, collected natively
+    'chunk' structures at a time
+
+    @param with_types: also get the types of the members, as text
+    @param chunk:      number of structures collected per call
+
+    @return: a generator of struc_dump_t
+
+    Example::
+
+        for s in StructsDump():
+            for off, name, type in zip(s.member_offsets, s.member_names, s.member_types):
+                print "%s.%s @ 0x%x: %s" % (s.name, name, off, type)
+    """
+    idx = 0
+    while idx != ida_idaapi.BADADDR:
+        sids, names, sizes, memqties, members, idx = \
+            ida_struct.get_struc_table(idx, chunk, with_types)
+        offsets, msizes, mflags, mnames, mtypes = members
+        sids = ida_idaapi.unpack_array(sids, _EA_SIZE)
+        sizes = ida_idaapi.unpack_array(sizes, _EA_SIZE)
+        memqties = ida_idaapi.unpack_array(memqties, 4)
+        offsets = ida_idaapi.unpack_array(offsets, _EA_SIZE)
+        msizes = ida_idaapi.unpack_array(msizes, _EA_SIZE)
+        mflags = ida_idaapi.unpack_array(mflags, _FLAGS_SIZE)
+        lo = 0
+        for sid, name, size, qty in itertools.izip(sids, names, sizes, memqties):
+            hi = lo + qty
+            yield struc_dump_t(
+                sid,
+                name,
+                size,
+                offsets[lo:hi],
+                msizes[lo:hi],
+                mflags[lo:hi],
+                mnames[lo:hi],
+                mtypes[lo:hi] if mtypes is not None else None)
+            lo = hi
 
 
 def DecodePrecedingInstruction(ea):
@@ -405,22 +1164,188 @@ def DecodeInstruction(ea):
     inslen = ida_ua.decode_insn(insn, ea)
     return insn if inslen > 0 else None
 
+class function_insns_t(collections.namedtuple(
+        "function_insns_t",
+        ["start_ea", "ea", "size", "itype", "optype", "reg", "value", "addr"])):
+    """
+    The decoded instructions of a function, as returned by
+    FunctionInstructions().
+
+    'ea', 'size' and 'itype' hold one item per instruction. 'optype',
+    'reg', 'value' and 'addr' hold the operands, ida_ua.UA_MAXOP items
+    per instruction: the operands of the i-th instruction are at
+    [i * UA_MAXOP:(i + 1) * UA_MAXOP].
+    """
+    __slots__ = ()
+
+
+class _insns_invalidator_t(_idb_invalidator_t):
+    """
+    INTERNAL
+    Also reports the patched bytes and the changes to the functions.
+    """
+    def byte_patched(self, ea, old_value):
+        return self._notify(ea, ea + 1)
+
+    def func_updated(self, pfn):
+        return self._notify(pfn.start_ea, pfn.end_ea)
+
+    def deleting_func(self, pfn):
+        return self._notify(pfn.start_ea, pfn.end_ea)
+
+    def set_func_start(self, pfn, new_start):
+        return self._notify(min(pfn.start_ea, new_start), pfn.end_ea)
+
+    def set_func_end(self, pfn, new_end):
+        return self._notify(pfn.start_ea, max(pfn.end_ea, new_end))
+
+    def func_tail_appended(self, pfn, tail):
+        return self._notify(pfn.start_ea, pfn.end_ea)
+
+    def func_tail_deleted(self, pfn, tail_ea):
+        return self._notify(pfn.start_ea, pfn.end_ea)
+
+
+class _insns_cache_t(object):
+    """
+    INTERNAL
+    LRU cache of the FunctionInstructions() results, by function start.
+    An entry is dropped when a change is reported in the range spanned
+    by its instructions, or in its entry chunk.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self.__hooks = _insns_invalidator_t(self)
+        self.__hooks.hook()
+
+    def __del__(self):
+        hooks = getattr(self, "_insns_cache_t__hooks", None)
+        if hooks is not None:
+            hooks.unhook()
+
+    def get(self, start_ea):
+        entry = self._entries.pop(start_ea, None)
+        if entry is None:
+            return None
+        self._entries[start_ea] = entry
+        return entry[0]
+
+    def put(self, insns):
+        lo = insns.start_ea
+        hi = lo + 1
+        if len(insns.ea):
+            lo = min(lo, min(insns.ea))
+            hi = max(hi, max(ea + size for ea, size in itertools.izip(insns.ea, insns.size)))
+        self._entries[insns.start_ea] = (insns, lo, hi)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _invalidate(self, start, end):
+        for start_ea, (insns, lo, hi) in self._entries.items():
+            if lo < end and start < hi:
+                del self._entries[start_ea]
+
+    def _invalidate_all(self):
+        self._entries.clear()
+
+_insns_cache = None
+
+def FunctionInstructions(ea, cached=False):
+    """
+    Decode all the instructions of a function (of all its chunks) in
+    one pass, reusing a single decoder buffer
+
+    @param ea:     any address belonging to the function
+    @param cached: keep the result in, and reuse it from, a process-wide
+                   cache of the 256 most recently decoded functions. The
+                   cached functions are decoded again after they are
+                   modified (as reported by the IDB events).
+
+    @return: None if there is no function at 'ea', or a function_insns_t
+             holding arrays of addresses, sizes, instruction codes and
+             operands
+
+    Example::
+
+        insns = FunctionInstructions(here())
+        histogram = collections.Counter(insns.itype)
+    """
+    global _insns_cache
+    if cached:
+        pfn = ida_funcs.get_func(ea)
+        if not pfn:
+            return None
+        if _insns_cache is None:
+            _insns_cache = _insns_cache_t(256)
+        insns = _insns_cache.get(pfn.start_ea)
+        if insns is not None:
+            return insns
+
+    res = ida_ua.decode_func_insns(ea)
+    if res is None:
+        return None
+    start_ea, eas, sizes, itypes, optypes, regs, values, addrs = res
+    insns = function_insns_t(
+        start_ea,
+        ida_idaapi.unpack_array(eas, _EA_SIZE),
+        ida_idaapi.unpack_array(sizes, 2),
+        ida_idaapi.unpack_array(itypes, 2),
+        ida_idaapi.unpack_array(optypes, 1),
+        ida_idaapi.unpack_array(regs, 2),
+        ida_idaapi.unpack_array(values, _EA_SIZE),
+        ida_idaapi.unpack_array(addrs, _EA_SIZE))
+    if cached:
+        _insns_cache.put(insns)
+    return insns
+
+
+def _data_format(count, itemsize):
+    """
+    Get the struct format of 'count' items of 'itemsize' bytes,
+    in the byte order of the database
+    """
+    code = ida_idaapi.struct_format(itemsize)
+    if code is None:
+        raise ValueError("Invalid data size! Must be 1, 2, 4 or 8")
+    return "%s%d%s" % (">" if ida_ida.cvar.inf.is_be() else "<", count, code)
+
+
+def _get_data_bytes(ea, count, itemsize):
+    """
+    Read the bytes of 'count' items of 'itemsize' bytes in one go.
+    Returns None if the items cannot be read as a plain byte buffer
+    (e.g., on processors with bytes wider than 8 bits)
+    """
+    if count <= 0 or ida_idp.ph_get_cnbits() != 8:
+        return None
+    return ida_bytes.get_bytes(ea, count * itemsize)
+
 
 def GetDataList(ea, count, itemsize=1):
     """
     Get data list - INTERNAL USE ONLY
     """
+    fmt = _data_format(count, itemsize)
+    buf = _get_data_bytes(ea, count, itemsize)
+    if buf is not None:
+        return iter(struct.unpack(fmt, buf))
+
     if itemsize == 1:
         getdata = ida_bytes.get_byte
     elif itemsize == 2:
         getdata = ida_bytes.get_word
     elif itemsize == 4:
         getdata = ida_bytes.get_dword
-    elif itemsize == 8:
-        getdata = ida_bytes.get_qword
     else:
-        raise ValueError("Invalid data size! Must be 1, 2, 4 or 8")
+        getdata = ida_bytes.get_qword
+    return _get_data_items(getdata, ea, count, itemsize)
+
 
+def _get_data_items(getdata, ea, count, itemsize):
+    """
+    Get the items one by one - INTERNAL USE ONLY
+    """
     endea = ea + itemsize * count
     curea = ea
     while curea < endea:
@@ -428,21 +1353,47 @@ def GetDataList(ea, count, itemsize=1):
         curea += itemsize
 
 
+def GetDataBuffer(ea, count, itemsize=1):
+    """
+    Get a read-only view over the raw bytes of a data list
+
+    The bytes are read in one go, and the returned view shares them
+    without copying. The items are in the byte order of the database;
+    e.g., numpy.frombuffer(buf, dtype=">u4") decodes big-endian dwords.
+
+    @param ea:       start address
+    @param count:    number of items
+    @param itemsize: size of the items [default: 1 byte]
+
+    @return: a memoryview, or None if the bytes cannot be read
+    """
+    _data_format(count, itemsize)
+    buf = _get_data_bytes(ea, count, itemsize)
+    return None if buf is None else memoryview(buf)
+
+
 def PutDataList(ea, datalist, itemsize=1):
     """
     Put data list - INTERNAL USE ONLY
     """
-    putdata = None
+    mask = (1 << (itemsize * 8)) - 1
+    datalist = [val & mask for val in datalist]
+    fmt = _data_format(len(datalist), itemsize)
+    if not datalist:
+        return
+
+    if ida_idp.ph_get_cnbits() == 8:
+        ida_bytes.patch_bytes(ea, struct.pack(fmt, *datalist))
+        return
 
     if itemsize == 1:
         putdata = ida_bytes.patch_byte
-    if itemsize == 2:
+    elif itemsize == 2:
         putdata = ida_bytes.patch_word
-    if itemsize == 4:
+    elif itemsize == 4:
         putdata = ida_bytes.patch_dword
-
-    assert putdata, "Invalid data size! Must be 1, 2 or 4"
-
+    else:
+        putdata = ida_bytes.patch_qword
     for val in datalist:
         putdata(ea, val)
         ea = ea + itemsize
@@ -471,6 +1422,96 @@ def GetInputFileMD5():
     return idc.retrieve_input_file_md5()
 
 
+class _strings_invalidator_t(_idb_invalidator_t):
+    """
+    INTERNAL
+    Also reports the patched bytes and the changed types.
+    """
+    def byte_patched(self, ea, old_value):
+        return self._notify(ea, ea + 1)
+
+    def ti_changed(self, ea, type, fnames):
+        return self._notify(ea, ea + 1)
+
+
+def _strlist_options_key():
+    """
+    Get the current string list options, as a comparable tuple - INTERNAL USE ONLY
+    """
+    t = ida_strlist.get_strlist_options()
+    return (tuple(t.strtypes), t.minlen, t.only_7bit, t.ignore_heads, t.display_only_existing_strings)
+
+
+class _strings_table_t(object):
+    """
+    INTERNAL
+    Columnar snapshot of the string list (addresses, lengths, types and
+    contents), shared by the cached Strings instances. It is built for
+    the current string list options, and built again when they change.
+    """
+    def __init__(self):
+        self.options = None
+        self.eas = []
+        self.lengths = []
+        self.types = []
+        self.contents = []
+        self._pending = []
+        self._stale = True
+        self.__hooks = _strings_invalidator_t(self)
+        self.__hooks.hook()
+
+    def __del__(self):
+        hooks = getattr(self, "_strings_table_t__hooks", None)
+        if hooks is not None:
+            hooks.unhook()
+
+    @staticmethod
+    def _load(start, end):
+        eas, lengths, types, contents = ida_strlist.get_strlist_table(start, end)
+        return (ida_idaapi.unpack_array(eas, _EA_SIZE),
+                ida_idaapi.unpack_array(lengths, 4),
+                ida_idaapi.unpack_array(types, 4),
+                contents)
+
+    def _invalidate(self, start, end):
+        _merge_range(self._pending, start, end)
+
+    def _invalidate_all(self):
+        self._stale = True
+
+    def sync(self):
+        options = _strlist_options_key()
+        if self._stale or options != self.options:
+            ida_strlist.build_strlist()
+            self.eas, self.lengths, self.types, self.contents = \
+                _strings_table_t._load(0, ida_idaapi.BADADDR)
+            self.options = options
+            self._pending = []
+            self._stale = False
+            return
+        if not self._pending:
+            return
+        # the kernel can only rebuild the whole list, but only the strings
+        # overlapping the modified ranges are re-read from it
+        ida_strlist.build_strlist()
+        for start, end in self._pending:
+            eas, lengths, types, contents = _strings_table_t._load(start, end)
+            if len(eas):
+                start = min(start, eas[0])
+                end = max(end, eas[-1] + lengths[-1])
+            i = bisect.bisect_left(self.eas, start)
+            if i > 0 and self.eas[i-1] + self.lengths[i-1] > start:
+                i -= 1
+            j = bisect.bisect_left(self.eas, end)
+            self.eas[i:j] = eas
+            self.lengths[i:j] = lengths
+            self.types[i:j] = types
+            self.contents[i:j] = contents
+        self._pending = []
+
+_strings_table = None
+
+
 class Strings(object):
     """
     Allows iterating over the string list. The set of strings will not be
@@ -478,6 +1519,13 @@ class Strings(object):
     is used by the "String window" so it may be changed when this window is
     updated.
 
+    In cached mode, the addresses, lengths, types and contents of the
+    strings are read once, in one pass, and kept in memory, shared by all
+    the cached instances. The strings of the ranges where the IDB events
+    report created or destroyed items, patched bytes or changed types are
+    re-read at the next access, the others are reused as is. The whole
+    list is read again if the string list options change.
+
     Example:
         s = Strings()
 
@@ -496,12 +1544,28 @@ class Strings(object):
             """string type (STRTYPE_xxxxx)"""
             self.length = si.length
             """string length"""
+            self._cached = False
+            self._contents = None
+
+        @classmethod
+        def _from_row(cls, ea, strtype, length, contents):
+            # 'contents' is None if they couldn't be retrieved
+            self = cls.__new__(cls)
+            self.ea = ea
+            self.strtype = strtype
+            self.length = length
+            self._cached = True
+            self._contents = contents
+            return self
 
         def is_1_byte_encoding(self):
             return ida_nalt.get_strtype_bpu(self.strtype) == 1
 
         def _toseq(self, as_unicode):
-            strbytes = ida_bytes.get_strlit_contents(self.ea, self.length, self.strtype)
+            if self._cached:
+                strbytes = self._contents
+            else:
+                strbytes = ida_bytes.get_strlit_contents(self.ea, self.length, self.strtype)
             return unicode(strbytes, "UTF-8", 'replace') if as_unicode else strbytes
 
         def __str__(self):
@@ -513,28 +1577,43 @@ class Strings(object):
     def clear_cache(self):
         """Clears the strings list cache"""
         ida_strlist.clear_strlist()
+        if self._cached:
+            self._table._invalidate_all()
 
-    def __init__(self, default_setup = False):
+    def __init__(self, default_setup = False, cached = False):
         """
         Initializes the Strings enumeration helper class
 
         @param default_setup: Set to True to use default setup (C strings, min len 5, ...)
+        @param cached: Set to True to keep the strings in memory, and only
+                       re-read the ones of the modified ranges
         """
+        global _strings_table
         self.size = 0
+        self._cached = cached
+        self._si = ida_strlist.string_info_t()
+        if cached:
+            if _strings_table is None:
+                _strings_table = _strings_table_t()
+            self._table = _strings_table
         if default_setup:
             self.setup()
         else:
             # restore saved options
             ida_strlist.get_strlist_options()
-        self.refresh()
-
-        self._si = ida_strlist.string_info_t()
+            if not cached:
+                self.refresh()
+        self._sync()
 
 
     def refresh(self):
         """Refreshes the strings list"""
-        ida_strlist.build_strlist()
-        self.size = ida_strlist.get_strlist_qty()
+        if self._cached:
+            self._table._invalidate_all()
+            self._sync()
+        else:
+            ida_strlist.build_strlist()
+            self.size = ida_strlist.get_strlist_qty()
 
 
     def setup(self,
@@ -549,21 +1628,41 @@ class Strings(object):
         t.minlen = minlen
         t.only_7bit = only_7bit
         t.display_only_existing_strings = display_only_existing_strings
-        self.refresh()
+        if self._cached:
+            # the shared snapshot is read again only if the options changed
+            self._sync()
+        else:
+            self.refresh()
+
+
+    def _sync(self):
+        if not self._cached:
+            return
+        self._table.sync()
+        self.size = len(self._table.eas)
 
 
     def _get_item(self, index):
+        if self._cached:
+            table = self._table
+            return Strings.StringItem._from_row(
+                table.eas[index],
+                table.types[index],
+                table.lengths[index],
+                table.contents[index])
         if not ida_strlist.get_strlist_item(self._si, index):
             return None
         return Strings.StringItem(self._si)
 
 
     def __iter__(self):
+        self._sync()
         return (self._get_item(index) for index in xrange(0, self.size))
 
 
     def __getitem__(self, index):
         """Returns a string item or None"""
+        self._sync()
         if index >= self.size:
             raise KeyError
         else:
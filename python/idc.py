@@ -62,6 +62,9 @@ import ida_xref
 
 import _ida_idaapi
 
+import collections
+import mmap
+import operator
 import os
 import re
 import struct
@@ -86,16 +89,81 @@ def __warn_once_deprecated_proto_confusion(what, alternative):
             alternative))
         __warned_deprecated_proto_confusion[what] = True
 
+__compiled_attrmaps = {}
+def _IDC_CompileAttrMap(attrmap):
+    """
+    Internal function to compile an attribute map into accessors
+    Do not use unless you know what you are doing
+
+    @return: a tuple (attrmap, getters, setters, bulk_getters): 'getters'
+             maps attribute offsets to operator.attrgetter() instances,
+             'setters' maps the offsets of writable attributes to their
+             names, and 'bulk_getters' caches the getters built by
+             _IDC_GetAttrs()
+    """
+    compiled = __compiled_attrmaps.get(id(attrmap))
+    if compiled is None or compiled[0] is not attrmap:
+        getters = {}
+        setters = {}
+        for attroffs, (readonly, name) in attrmap.items():
+            # some entries (e.g., segment default registers) are not
+            # object attributes, and are handled by the callers
+            if not isinstance(name, str):
+                continue
+            getters[attroffs] = operator.attrgetter(name)
+            if not readonly:
+                setters[attroffs] = name
+        compiled = (attrmap, getters, setters, {})
+        __compiled_attrmaps[id(attrmap)] = compiled
+    return compiled
+
+
 def _IDC_GetAttr(obj, attrmap, attroffs):
     """
     Internal function to generically get object attributes
     Do not use unless you know what you are doing
     """
-    if attroffs in attrmap and hasattr(obj, attrmap[attroffs][1]):
-        return getattr(obj, attrmap[attroffs][1])
-    else:
-        errormsg = "attribute with offset %d not found, check the offset and report the problem" % attroffs
-        raise KeyError(errormsg)
+    getter = _IDC_CompileAttrMap(attrmap)[1].get(attroffs)
+    if getter is not None:
+        try:
+            return getter(obj)
+        except AttributeError:
+            pass
+    errormsg = "attribute with offset %d not found, check the offset and report the problem" % attroffs
+    raise KeyError(errormsg)
+
+
+def _IDC_GetAttrs(obj, attrmap, attroffs_list):
+    """
+    Internal function to generically get several object attributes at once
+    Do not use unless you know what you are doing
+
+    @return: a tuple with the values of the attributes, in the order of
+             'attroffs_list'
+    """
+    attroffs_list = tuple(attroffs_list)
+    _, getters, _, bulk_getters = _IDC_CompileAttrMap(attrmap)
+    getter = bulk_getters.get(attroffs_list)
+    if getter is None:
+        names = []
+        for attroffs in attroffs_list:
+            if attroffs not in getters:
+                errormsg = "attribute with offset %d not found, check the offset and report the problem" % attroffs
+                raise KeyError(errormsg)
+            names.append(attrmap[attroffs][1])
+        if len(names) == 1:
+            # a single-name attrgetter does not return a tuple
+            single = operator.attrgetter(names[0])
+            getter = lambda obj: (single(obj),)
+        elif names:
+            getter = operator.attrgetter(*names)
+        else:
+            getter = lambda obj: ()
+        bulk_getters[attroffs_list] = getter
+    try:
+        return getter(obj)
+    except AttributeError as e:
+        raise KeyError("attribute not found (%s), check the offsets and report the problem" % e)
 
 
 def _IDC_SetAttr(obj, attrmap, attroffs, value):
@@ -103,12 +171,13 @@ def _IDC_SetAttr(obj, attrmap, attroffs, value):
     Internal function to generically set object attributes
     Do not use unless you know what you are doing
     """
+    name = _IDC_CompileAttrMap(attrmap)[2].get(attroffs)
+    if name is not None:
+        if hasattr(obj, name):
+            return setattr(obj, name, value)
     # check for read-only atributes
-    if attroffs in attrmap:
-        if attrmap[attroffs][0]:
-            raise KeyError("attribute with offset %d is read-only" % attroffs)
-        elif hasattr(obj, attrmap[attroffs][1]):
-            return setattr(obj, attrmap[attroffs][1], value)
+    elif attroffs in attrmap and attrmap[attroffs][0]:
+        raise KeyError("attribute with offset %d is read-only" % attroffs)
     errormsg = "attribute with offset %d not found, check the offset and report the problem" % attroffs
     raise KeyError(errormsg)
 
@@ -1033,7 +1102,21 @@ update_extra_cmt = ida_lines.update_extra_cmt
 del_extra_cmt = ida_lines.del_extra_cmt
 set_manual_insn = ida_bytes.set_manual_insn
 get_manual_insn = ida_bytes.get_manual_insn
-patch_dbg_byte = ida_dbg.put_dbg_byte
+
+
+def patch_dbg_byte(ea, x):
+    """
+    Change a byte in the debugged process memory only
+
+    @param ea: linear address
+    @param x: new byte value
+
+    @return: success
+    """
+    invalidate_dbg_memory_cache(ea, ea + 1)
+    return ida_dbg.put_dbg_byte(ea, x)
+
+
 patch_byte = ida_bytes.patch_byte
 patch_word = ida_bytes.patch_word
 patch_dword = ida_bytes.patch_dword
@@ -1216,10 +1299,278 @@ get_wide_byte = ida_bytes.get_wide_byte
 
 
 def __DbgValue(ea, len):
-    if len not in ida_idaapi.__struct_unpack_table:
+    st = _dbg_value_structs().get(len)
+    if st is None:
         return None
-    r = ida_idd.dbg_read_memory(ea, len)
-    return None if r is None else struct.unpack((">" if ida_ida.cvar.inf.is_be() else "<") + ida_idaapi.__struct_unpack_table[len][1], r)[0]
+    if _dbgmem_cache is not None:
+        r = _dbgmem_cache.read(ea, len)
+    else:
+        r = ida_idd.dbg_read_memory(ea, len)
+    return None if r is None else st.unpack(r)[0]
+
+
+_dbg_structs = None
+
+def _dbg_value_structs():
+    """
+    Get the struct.Struct instances used to decode debugger values,
+    by size. They depend on the endianness of the database, and are
+    built again after it is closed - INTERNAL USE ONLY
+    """
+    global _dbg_structs
+    if _dbg_structs is None:
+        prefix = ">" if ida_ida.cvar.inf.is_be() else "<"
+        _dbg_structs = dict((size, struct.Struct(prefix + ida_idaapi.struct_format(size)))
+                            for size in (1, 2, 4, 8))
+    return _dbg_structs
+
+
+def _forget_dbg_value_structs(nw_code):
+    global _dbg_structs
+    _dbg_structs = None
+
+ida_idaapi.notify_when(ida_idaapi.NW_CLOSEIDB, _forget_dbg_value_structs)
+
+
+class _dbgmem_cache_t(ida_dbg.DBG_Hooks):
+    """
+    Page-granular read-through cache of the debugger memory - INTERNAL USE ONLY
+    The pages are only used while the process is suspended, and are all
+    dropped as soon as the debugger reports a new stop (or a process
+    start, exit, library load...), since the process may have modified
+    its memory in the meantime.
+    """
+    def __init__(self, page_size, max_pages):
+        ida_dbg.DBG_Hooks.__init__(self)
+        if page_size <= 0 or (page_size & (page_size - 1)) != 0:
+            raise ValueError("page size must be a power of 2")
+        self.page_size = page_size
+        self.max_pages = max_pages
+        # page address -> page contents; '' for pages that can't be read at once
+        self.pages = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, start=None, end=None):
+        if start is None:
+            self.pages.clear()
+            return
+        if end is None:
+            end = start + 1
+        page_size = self.page_size
+        page_ea = start & ~(page_size - 1)
+        if (end - page_ea) // page_size > len(self.pages):
+            for ea in [ea for ea in self.pages if ea < end and ea + page_size > start]:
+                del self.pages[ea]
+        else:
+            while page_ea < end:
+                self.pages.pop(page_ea, None)
+                page_ea += page_size
+
+    def _load(self, page_ea):
+        self.misses += 1
+        data = ida_idd.dbg_read_memory(page_ea, self.page_size) or ""
+        self._store(page_ea, data)
+        return data
+
+    def _store(self, page_ea, data):
+        pages = self.pages
+        pages.pop(page_ea, None)
+        pages[page_ea] = data
+        while len(pages) > self.max_pages:
+            pages.popitem(last=False)
+
+    def read(self, ea, size):
+        if ida_dbg.get_process_state() != ida_dbg.DSTATE_SUSP:
+            self.pages.clear()
+            return ida_idd.dbg_read_memory(ea, size)
+        page_size = self.page_size
+        off = ea & (page_size - 1)
+        page_ea = ea - off
+        if off + size <= page_size:
+            data = self.pages.get(page_ea)
+            if data is None:
+                data = self._load(page_ea)
+            else:
+                self.hits += 1
+            if not data:
+                # the page is only partially readable
+                return ida_idd.dbg_read_memory(ea, size)
+            return data[off:off+size]
+        chunks = []
+        end = ea + size
+        while page_ea < end:
+            data = self.pages.get(page_ea)
+            if data is None:
+                data = self._load(page_ea)
+            else:
+                self.hits += 1
+            if not data:
+                return ida_idd.dbg_read_memory(ea, size)
+            chunks.append(data)
+            page_ea += page_size
+        return "".join(chunks)[off:off+size]
+
+    def prefetch(self, start, end):
+        if ida_dbg.get_process_state() != ida_dbg.DSTATE_SUSP:
+            return 0
+        page_size = self.page_size
+        start &= ~(page_size - 1)
+        end = (end + page_size - 1) & ~(page_size - 1)
+        # try to read the whole range in one request first
+        data = ida_idd.dbg_read_memory(start, end - start)
+        count = 0
+        page_ea = start
+        while page_ea < end:
+            if data is not None:
+                off = page_ea - start
+                self._store(page_ea, data[off:off+page_size])
+                count += 1
+            elif self._load(page_ea) != "":
+                count += 1
+            page_ea += page_size
+        return count
+
+    # The process may have run, or its memory map may have changed
+    def _stopped(self):
+        self.invalidate()
+        return 0
+
+    def dbg_process_start(self, pid, tid, ea, name, base, size):
+        return self._stopped()
+
+    def dbg_process_exit(self, pid, tid, ea, code):
+        return self._stopped()
+
+    def dbg_process_attach(self, pid, tid, ea, name, base, size):
+        return self._stopped()
+
+    def dbg_process_detach(self, pid, tid, ea):
+        return self._stopped()
+
+    def dbg_library_load(self, pid, tid, ea, name, base, size):
+        return self._stopped()
+
+    def dbg_library_unload(self, pid, tid, ea, info):
+        return self._stopped()
+
+    def dbg_suspend_process(self):
+        return self._stopped()
+
+    def dbg_bpt(self, tid, ea):
+        # 0 is also the value used when the event isn't handled
+        return self._stopped()
+
+    def dbg_exception(self, pid, tid, ea, exc_code, exc_can_cont, exc_ea, exc_info):
+        return self._stopped()
+
+    def dbg_trace(self, tid, ea):
+        return self._stopped()
+
+    def dbg_step_into(self):
+        return self._stopped()
+
+    def dbg_step_over(self):
+        return self._stopped()
+
+    def dbg_step_until_ret(self):
+        return self._stopped()
+
+    def dbg_run_to(self, pid, tid, ea):
+        return self._stopped()
+
+
+_dbgmem_cache = None
+
+def enable_dbg_memory_cache(page_size=0x1000, max_pages=4096):
+    """
+    Cache the debugger memory read by read_dbg_byte(), read_dbg_word(),
+    read_dbg_dword(), read_dbg_qword() and read_dbg_cached_memory()
+
+    The memory is read by pages, which are kept while the process stays
+    suspended: they are dropped whenever the debugger reports that the
+    process stopped again.
+    Writes performed with write_dbg_memory() and patch_dbg_byte() drop the
+    affected pages. Other writes made while the process is suspended, such
+    as ida_bytes.patch_byte() & co, or direct ida_dbg/ida_idd calls, are
+    not seen by the cache: call invalidate_dbg_memory_cache() after them.
+
+    @param page_size: size of the cached pages (a power of 2)
+    @param max_pages: maximal number of cached pages; the oldest pages
+                      are dropped first
+
+    @return: success
+    """
+    global _dbgmem_cache
+    disable_dbg_memory_cache()
+    cache = _dbgmem_cache_t(page_size, max_pages)
+    if not cache.hook():
+        return False
+    _dbgmem_cache = cache
+    return True
+
+
+def disable_dbg_memory_cache():
+    """
+    Stop caching the debugger memory
+    """
+    global _dbgmem_cache
+    if _dbgmem_cache is not None:
+        _dbgmem_cache.unhook()
+        _dbgmem_cache = None
+
+
+def invalidate_dbg_memory_cache(start=None, end=None):
+    """
+    Drop cached debugger memory
+
+    @param start: start address of the range to drop; None to drop everything
+    @param end: end address of the range to drop (excluded); None to drop
+                only the page containing 'start'
+    """
+    if _dbgmem_cache is not None:
+        _dbgmem_cache.invalidate(start, end)
+
+
+def prefetch_dbg_memory(start, end):
+    """
+    Read a range of the debugger memory into the cache, in as few
+    debugger requests as possible
+
+    @param start: start address
+    @param end: end address (excluded)
+
+    @return: number of pages read (0 if the cache is disabled or
+             the process is not suspended)
+    """
+    if _dbgmem_cache is None:
+        return 0
+    return _dbgmem_cache.prefetch(start, end)
+
+
+def read_dbg_cached_memory(ea, size):
+    """
+    Read the debugger memory, through the cache if it is enabled
+
+    @param ea: linear address
+    @param size: size of buffer in normal 8-bit bytes
+    @return: The read bytes, or None on failure.
+    """
+    if _dbgmem_cache is None:
+        return ida_idd.dbg_read_memory(ea, size)
+    return _dbgmem_cache.read(ea, size)
+
+
+def get_dbg_memory_cache_stats():
+    """
+    Get the counters of the debugger memory cache
+
+    @return: None if the cache is disabled, otherwise
+             a tuple (hits, misses, number of cached pages)
+    """
+    if _dbgmem_cache is None:
+        return None
+    return (_dbgmem_cache.hits, _dbgmem_cache.misses, len(_dbgmem_cache.pages))
 
 
 def read_dbg_byte(ea):
@@ -1279,6 +1630,7 @@ def write_dbg_memory(ea, data):
     if not ida_dbg.dbg_can_query():
         return -1
     elif len(data) > 0:
+        invalidate_dbg_memory_cache(ea, ea + len(data))
         return ida_idd.dbg_write_memory(ea, data)
 
 
@@ -1763,6 +2115,28 @@ def find_binary(ea, flag, searchstr, radix=16, from_bc695=False):
     return ida_search.find_binary(ea, endea, searchstr, radix, flag)
 
 
+def find_binary_multi(start_ea, end_ea, patterns, radix=16):
+    """
+    Search for several binary patterns in one pass over the database
+
+    @param start_ea: start address
+    @param end_ea: end address (excluded)
+    @param patterns: a list of search strings (e.g., "E8 ? ? ? ? 85 C0"),
+                     or of (image, mask) tuples (see ida_bytes.bin_search())
+    @param radix: radix of the numbers in the search strings
+
+    @return: None if a pattern is invalid, otherwise a list of tuples
+             (ea, pattern index), sorted by address.
+             The search stops early if the user cancels it.
+    """
+    r = ida_bytes.bin_search_multi(start_ea, end_ea, patterns, radix, 0)
+    if r is None:
+        return None
+    eas, indexes, _ = r
+    ea_size = 8 if __EA64__ else 4
+    return list(zip(ida_idaapi.unpack_array(eas, ea_size), ida_idaapi.unpack_array(indexes, 4)))
+
+
 #----------------------------------------------------------------------------
 #       G L O B A L   S E T T I N G S   M A N I P U L A T I O N
 #----------------------------------------------------------------------------
@@ -1783,12 +2157,30 @@ def process_config_line(directive):
 def get_inf_attr(offset):
     """
     """
-    val = _IDC_GetAttr(ida_ida.cvar.inf, _INFMAP, offset)
+    getter = _INFMAP_GETTERS.get(offset)
+    if getter is None:
+        return _IDC_GetAttr(ida_ida.cvar.inf, _INFMAP, offset)
+    val = getter(ida_ida.cvar.inf)
     if offset == INF_PROCNAME:
         # procName is a character array
         val = ida_idaapi.as_cstr(val)
     return val
 
+def get_inf_attrs(offsets):
+    """
+    Get several database parameters at once
+
+    @param offsets: a sequence of INF_... constants
+
+    @return: a tuple with the values of the parameters, in the order of 'offsets'
+    """
+    offsets = tuple(offsets)
+    vals = _IDC_GetAttrs(ida_ida.cvar.inf, _INFMAP, offsets)
+    if INF_PROCNAME in offsets:
+        # procName is a character array
+        vals = tuple(ida_idaapi.as_cstr(v) if o == INF_PROCNAME else v for o, v in zip(offsets, vals))
+    return vals
+
 def set_inf_attr(offset, value):
     if offset == INF_PROCNAME:
         raise NotImplementedError("Please use ida_idp.set_processor_type() to change processor")
@@ -2227,6 +2619,8 @@ INF_REFCMTS         : (False, 'refcmtnum'),
 #INF_END_PRIVRANGE   : (False, 'privrange.end_ea')
 }
 
+_INFMAP_GETTERS = _IDC_CompileAttrMap(_INFMAP)[1]
+
 
 set_processor_type  = ida_idp.set_processor_type
 
@@ -2680,12 +3074,35 @@ def get_segm_attr(segea, attr):
     """
     seg = ida_segment.getseg(segea)
     assert seg, "could not find segment at 0x%x" % segea
-    if attr in [ SEGATTR_ES, SEGATTR_CS, SEGATTR_SS, SEGATTR_DS, SEGATTR_FS, SEGATTR_GS ]:
+    getter = _SEGATTRMAP_GETTERS.get(attr)
+    if getter is not None:
+        return getter(seg)
+    elif attr in _SEGATTR_DEFSR:
         return ida_segment.get_defsr(seg, _SEGATTRMAP[attr][1])
     else:
         return _IDC_GetAttr(seg, _SEGATTRMAP, attr)
 
 
+def get_segm_attrs(segea, attrs):
+    """
+    Get several segment attributes at once
+
+    @param segea: any address within segment
+    @param attrs: a sequence of SEGATTR_... constants
+
+    @return: a tuple with the values of the attributes, in the order of 'attrs'
+    """
+    seg = ida_segment.getseg(segea)
+    assert seg, "could not find segment at 0x%x" % segea
+    attrs = tuple(attrs)
+    if _SEGATTR_DEFSR.isdisjoint(attrs):
+        return _IDC_GetAttrs(seg, _SEGATTRMAP, attrs)
+    return tuple(ida_segment.get_defsr(seg, _SEGATTRMAP[attr][1])
+                 if attr in _SEGATTR_DEFSR
+                 else _IDC_GetAttr(seg, _SEGATTRMAP, attr)
+                 for attr in attrs)
+
+
 def set_segm_attr(segea, attr, value):
     """
     Set segment attribute
@@ -2699,13 +3116,32 @@ def set_segm_attr(segea, attr, value):
     """
     seg = ida_segment.getseg(segea)
     assert seg, "could not find segment at 0x%x" % segea
-    if attr in [ SEGATTR_ES, SEGATTR_CS, SEGATTR_SS, SEGATTR_DS, SEGATTR_FS, SEGATTR_GS ]:
+    if attr in _SEGATTR_DEFSR:
         ida_segment.set_defsr(seg, _SEGATTRMAP[attr][1], value)
     else:
         _IDC_SetAttr(seg, _SEGATTRMAP, attr, value)
     return seg.update()
 
 
+def set_segm_attrs(segea, values):
+    """
+    Set several segment attributes at once, updating the segment only once
+
+    @param segea: any address within segment
+    @param values: a dictionary mapping SEGATTR_... constants to new values
+
+    @note: see set_segm_attr()
+    """
+    seg = ida_segment.getseg(segea)
+    assert seg, "could not find segment at 0x%x" % segea
+    for attr, value in values.items():
+        if attr in _SEGATTR_DEFSR:
+            ida_segment.set_defsr(seg, _SEGATTRMAP[attr][1], value)
+        else:
+            _IDC_SetAttr(seg, _SEGATTRMAP, attr, value)
+    return seg.update()
+
+
 SEGATTR_START   =  0      # starting address
 SEGATTR_END     =  4      # ending address
 SEGATTR_ORGBASE = 16
@@ -2747,6 +3183,9 @@ if __EA64__:
     SEGATTR_TYPE    = 184
     SEGATTR_COLOR   = 188
 
+# default segment register values, accessed with get_defsr()/set_defsr()
+_SEGATTR_DEFSR = frozenset([ SEGATTR_ES, SEGATTR_CS, SEGATTR_SS, SEGATTR_DS, SEGATTR_FS, SEGATTR_GS ])
+
 _SEGATTRMAP = {
     SEGATTR_START   : (True, 'start_ea'),
     SEGATTR_END     : (True, 'end_ea'),
@@ -2766,6 +3205,7 @@ _SEGATTRMAP = {
     SEGATTR_TYPE    : (False, 'type'),
     SEGATTR_COLOR   : (False, 'color'),
 }
+_SEGATTRMAP_GETTERS = _IDC_CompileAttrMap(_SEGATTRMAP)[1]
 
 # Valid segment flags
 SFL_COMORG   = 0x01       # IDP dependent field (IBM PC: if set, ORG directive is not commented out)
@@ -2945,6 +3385,220 @@ def SaveFile(filepath, pos, ea, size):
 def savefile(filepath, pos, ea, size): return SaveFile(filepath, pos, ea, size)
 
 
+FILE_CHUNK_SIZE = 0x100000 # default block size of the chunked file functions
+
+
+# runs of fully loaded bytes of a get_bytes_and_mask() bitmap, and
+# partially loaded bytes
+_MASK_BYTES_RE = re.compile("\xFF+|[^\x00\xFF]")
+
+def _loaded_runs(mask, size):
+    """
+    Yield the (start, end) offsets of the runs of set bits of a
+    get_bytes_and_mask() bitmap - INTERNAL USE ONLY
+
+    Only the partially set bytes of the bitmap are examined bit by bit.
+    """
+    start = end = None
+    for m in _MASK_BYTES_RE.finditer(mask, 0, (size + 7) >> 3):
+        b0, b1 = m.span()
+        if mask[b0] == "\xFF":
+            runs = ((b0 << 3, b1 << 3),)
+        else:
+            bits = ord(mask[b0])
+            runs = []
+            for i in xrange(8):
+                if (bits >> i) & 1:
+                    ea = (b0 << 3) + i
+                    if runs and runs[-1][1] == ea:
+                        runs[-1][1] = ea + 1
+                    else:
+                        runs.append([ea, ea + 1])
+        for s, e in runs:
+            e = min(e, size)
+            if s >= e:
+                continue
+            if start is not None and s == end:
+                end = e
+                continue
+            if start is not None:
+                yield start, end
+            start, end = s, e
+    if start is not None:
+        yield start, end
+
+
+class _chunked_progress_t(object):
+    """
+    Progress reporting and cancellation of the chunked file functions - INTERNAL USE ONLY
+    """
+    def __init__(self, total, progress):
+        self.total = total
+        self.done = 0
+        self.progress = progress
+
+    def advance(self, count):
+        """
+        @return: True if the operation must be cancelled
+        """
+        self.done += count
+        if self.progress is not None and self.progress(self.done, self.total):
+            return True
+        return ida_kernwin.user_cancelled()
+
+
+def _save_ranges(filepath, ranges, chunk_size, progress, use_mmap):
+    """
+    Write (pos, ea, size) ranges of the database to a file - INTERNAL USE ONLY
+    """
+    file_end = max(pos + size for pos, ea, size in ranges) if ranges else 0
+    mode = "r+b" if os.path.isfile(filepath) else "w+b"
+    try:
+        f = open(filepath, mode)
+    except IOError:
+        return 0
+    mm = None
+    try:
+        f.seek(0, os.SEEK_END)
+        if f.tell() < file_end:
+            # unloaded bytes are left as holes
+            f.truncate(file_end)
+        if use_mmap and file_end > 0:
+            mm = mmap.mmap(f.fileno(), file_end)
+        reporter = _chunked_progress_t(sum(size for pos, ea, size in ranges), progress)
+        for pos, ea, size in ranges:
+            end = ea + size
+            while ea < end:
+                n = min(chunk_size, end - ea)
+                r = ida_bytes.get_bytes_and_mask(ea, n)
+                if r is None:
+                    return 0
+                data, mask = r
+                if mask.count("\xFF") * 8 >= n:
+                    runs = [(0, n)]
+                elif mask.count("\x00") == len(mask):
+                    runs = []
+                else:
+                    runs = _loaded_runs(mask, n)
+                for s, e in runs:
+                    if mm is not None:
+                        mm[pos+s:pos+e] = data[s:e]
+                    else:
+                        f.seek(pos + s)
+                        f.write(data[s:e])
+                ea += n
+                pos += n
+                if reporter.advance(n):
+                    return 0
+        if mm is not None:
+            mm.flush()
+        return 1
+    except EnvironmentError:
+        return 0
+    finally:
+        if mm is not None:
+            mm.close()
+        f.close()
+
+
+def save_file_chunked(filepath, pos, ea, size, chunk_size=FILE_CHUNK_SIZE, progress=None, use_mmap=False):
+    """
+    Save from IDA database to file, block by block
+
+    Unlike SaveFile(), the range is written in blocks of 'chunk_size'
+    bytes, and the operation can be cancelled. Unloaded bytes are
+    not written: they are left as holes in the file (which read as
+    zeroes if the file was extended, and keep their previous contents
+    otherwise).
+
+    @param filepath: path to output file
+    @param pos: position in the file
+    @param ea: linear address to save from
+    @param size: number of bytes to save
+    @param chunk_size: size of the blocks
+    @param progress: None, or a callable progress(done, total), invoked
+                     after each block. If it returns True, the operation
+                     is cancelled. The operation is also cancelled when
+                     the user cancels the wait box, if any.
+    @param use_mmap: write through a memory mapping of the file
+
+    @return: 0 - error or cancelled, 1 - ok
+    """
+    return _save_ranges(filepath, [(pos, ea, size)], chunk_size, progress, use_mmap)
+
+
+def save_segments_chunked(filepath, eas=None, base=None, chunk_size=FILE_CHUNK_SIZE, progress=None, use_mmap=False):
+    """
+    Save several segments to a file, at their relative positions
+
+    Each segment is written at the file offset 'segment start - base',
+    block by block; the gaps between segments and the unloaded bytes
+    are left as holes in the file (see save_file_chunked()).
+    The segments are written in increasing address order, so that the
+    file is written sequentially.
+
+    @param filepath: path to output file
+    @param eas: addresses belonging to the segments to save, or None
+                to save all segments
+    @param base: address corresponding to the start of the file;
+                 None means the start of the first saved segment
+    @param chunk_size: size of the blocks
+    @param progress: see save_file_chunked()
+    @param use_mmap: write through a memory mapping of the file
+
+    @return: 0 - error or cancelled, 1 - ok
+    """
+    if eas is None:
+        segs = [ida_segment.getnseg(n) for n in xrange(ida_segment.get_segm_qty())]
+    else:
+        segs = [ida_segment.getseg(ea) for ea in eas]
+    if None in segs:
+        return 0
+    bounds = sorted(set((seg.start_ea, seg.end_ea) for seg in segs))
+    if base is None:
+        base = bounds[0][0] if bounds else 0
+    if bounds and bounds[0][0] < base:
+        return 0
+    ranges = [(start - base, start, end - start) for start, end in bounds]
+    return _save_ranges(filepath, ranges, chunk_size, progress, use_mmap)
+
+
+def load_file_chunked(filepath, pos, ea, size, chunk_size=FILE_CHUNK_SIZE, progress=None):
+    """
+    Load file into IDA database, block by block
+
+    Unlike LoadFile(), the range is loaded in blocks of 'chunk_size'
+    bytes, and the operation can be cancelled. The blocks loaded
+    before a cancellation are kept.
+
+    @param filepath: path to input file
+    @param pos: position in the file
+    @param ea: linear address to load
+    @param size: number of bytes to load
+    @param chunk_size: size of the blocks
+    @param progress: see save_file_chunked()
+
+    @return: 0 - error or cancelled, 1 - ok
+    """
+    li = ida_diskio.open_linput(filepath, False)
+    if not li:
+        return 0
+    try:
+        reporter = _chunked_progress_t(size, progress)
+        end = ea + size
+        while ea < end:
+            n = min(chunk_size, end - ea)
+            if not ida_loader.file2base(li, pos, ea, ea+n, False):
+                return 0
+            ea += n
+            pos += n
+            if reporter.advance(n):
+                return 0
+        return 1
+    finally:
+        ida_diskio.close_linput(li)
+
+
 def fgetc(handle):
     raise DeprecatedIDCError("fgetc() deprecated. Use Python file objects instead.")
 
@@ -3043,8 +3697,28 @@ def get_func_attr(ea, attr):
     @return: BADADDR - error otherwise returns the attribute value
     """
     func = ida_funcs.get_func(ea)
+    if not func:
+        return BADADDR
+    getter = _FUNCATTRMAP_GETTERS.get(attr)
+    if getter is None:
+        return _IDC_GetAttr(func, _FUNCATTRMAP, attr)
+    return getter(func)
 
-    return _IDC_GetAttr(func, _FUNCATTRMAP, attr) if func else BADADDR
+
+def get_func_attrs(ea, attrs):
+    """
+    Get several function attributes at once
+
+    @param ea: any address belonging to the function
+    @param attrs: a sequence of FUNCATTR_... constants
+
+    @return: a tuple with the values of the attributes, in the order of
+             'attrs'; all of them are BADADDR if there is no function at 'ea'
+    """
+    func = ida_funcs.get_func(ea)
+    if not func:
+        return (BADADDR,) * len(attrs)
+    return _IDC_GetAttrs(func, _FUNCATTRMAP, attrs)
 
 
 def set_func_attr(ea, attr, value):
@@ -3065,6 +3739,24 @@ def set_func_attr(ea, attr, value):
     return 0
 
 
+def set_func_attrs(ea, values):
+    """
+    Set several function attributes at once, updating the function only once
+
+    @param ea: any address belonging to the function
+    @param values: a dictionary mapping FUNCATTR_... constants to new values
+
+    @return: 1-ok, 0-failed
+    """
+    func = ida_funcs.get_func(ea)
+
+    if func:
+        for attr, value in values.items():
+            _IDC_SetAttr(func, _FUNCATTRMAP, attr, value)
+        return ida_funcs.update_func(func)
+    return 0
+
+
 FUNCATTR_START   =  0     # readonly: function start address
 FUNCATTR_END     =  4     # readonly: function end address
 FUNCATTR_FLAGS   =  8     # function flags
@@ -3104,6 +3796,7 @@ _FUNCATTRMAP = {
     FUNCATTR_OWNER   : (True, 'owner'),
     FUNCATTR_REFQTY  : (True, 'refqty')
 }
+_FUNCATTRMAP_GETTERS = _IDC_CompileAttrMap(_FUNCATTRMAP)[1]
 
 
 def get_func_flags(ea):
@@ -4211,7 +4904,12 @@ def get_fchunk_attr(ea, attr):
     @return: desired attribute or -1
     """
     func = ida_funcs.get_fchunk(ea)
-    return _IDC_GetAttr(func, _FUNCATTRMAP, attr) if func else BADADDR
+    if not func:
+        return BADADDR
+    getter = _FUNCATTRMAP_GETTERS.get(attr)
+    if getter is None:
+        return _IDC_GetAttr(func, _FUNCATTRMAP, attr)
+    return getter(func)
 
 
 def set_fchunk_attr(ea, attr, value):
@@ -5947,6 +6645,35 @@ def set_bpt_cond(ea, cnd, is_lowcnd=0):
     return ida_dbg.update_bpt(bpt)
 
 
+def get_bpt_cond_stats(ea):
+    """
+    Get the statistics of a Python breakpoint condition
+
+    The statistics are collected from the time the condition was compiled.
+
+    @param ea: any address in the breakpoint range
+
+    @return: None if the breakpoint has no compiled Python condition,
+             otherwise a tuple (number of evaluations, total evaluation
+             time in seconds)
+    """
+    bpt = ida_dbg.bpt_t()
+
+    if not ida_dbg.get_bpt(ea, bpt) or not bpt.condition:
+        return None
+
+    stats = None
+    for _, cea, expr, ncalls, nsecs in ida_idaapi.get_compiled_expr_stats():
+        if cea == bpt.ea and expr == bpt.condition:
+            if stats is None:
+                stats = [0, 0]
+            stats[0] += ncalls
+            stats[1] += nsecs
+    if stats is None:
+        return None
+    return stats[0], stats[1] / 1e9
+
+
 def add_bpt(ea, size=0, bpttype=BPT_DEFAULT):
     """
     Add a new breakpoint
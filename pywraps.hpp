@@ -429,6 +429,32 @@ idaman Py_ssize_t ida_export pyvar_walk_list(
 idaman ref_t ida_export PyW_SizeVecToPyList(const sizevec_t &vec);
 idaman ref_t ida_export PyW_UvalVecToPyList(const uvalvec_t &vec);
 
+// Packs a vector of plain values into a Python string, in native byte order
+// (used by the bulk getters, that return columns of values)
+template <class T>
+inline ref_t PyW_VecToPyString(const qvector<T> &vec)
+{
+  return newref_t(PyString_FromStringAndSize(
+                          (const char *) vec.begin(),
+                          Py_ssize_t(vec.size() * sizeof(T))));
+}
+
+// Converts a vector of strings to a Python list of 'str'
+inline ref_t PyW_StrVecToPyList(const qstrvec_t &vec)
+{
+  newref_t py_list(PyList_New(vec.size()));
+  if ( py_list == NULL )
+    return ref_t();
+  for ( size_t i = 0; i < vec.size(); ++i )
+  {
+    PyObject *py_str = PyString_FromStringAndSize(vec[i].c_str(), vec[i].length());
+    if ( py_str == NULL )
+      return ref_t();
+    PyList_SET_ITEM(py_list.o, i, py_str);
+  }
+  return py_list;
+}
+
 // Converts a Python list, to a vector of the given type.
 // An exception will be raised in case:
 //  - py_list is not a sequence
@@ -43,6 +43,235 @@ static int idaapi py_visit_patched_bytes_cb(
   return (py_result != NULL && PyInt_Check(py_result.o)) ? PyInt_AsLong(py_result.o) : 0;
 }
 
+//-------------------------------------------------------------------------
+// Multi-pattern search: an Aho-Corasick automaton is built over the
+// longest run of defined bytes ("anchor") of each pattern, and each
+// anchor hit is then verified against the whole pattern and its mask.
+struct py_binpat_t
+{
+  bytevec_t bytes;
+  bytevec_t mask;       // empty: all bytes are defined; otherwise 0: any byte
+  uint32 idx;           // index of the pattern in the caller's list
+  size_t anchor_off;
+  size_t anchor_len;
+};
+DECLARE_TYPE_AS_MOVABLE(py_binpat_t);
+typedef qvector<py_binpat_t> py_binpat_vec_t;
+
+struct py_binpat_node_t
+{
+  qvector<uint32> children;     // (byte << 24) | node
+  qvector<uint32> outs;         // patterns whose anchor ends here
+  uint32 fail;
+  uint32 dict;                  // next node with outputs, on the failure chain
+  py_binpat_node_t() : fail(0), dict(0) {}
+
+  uint32 find(uchar c) const
+  {
+    for ( size_t i = 0; i < children.size(); ++i )
+      if ( (children[i] >> 24) == c )
+        return children[i] & 0xFFFFFF;
+    return 0;
+  }
+};
+DECLARE_TYPE_AS_MOVABLE(py_binpat_node_t);
+
+struct py_binpat_matcher_t
+{
+  py_binpat_vec_t pats;
+  qvector<py_binpat_node_t> nodes;
+  uint32 root_next[256];
+  size_t maxlen;
+
+  py_binpat_matcher_t() : maxlen(0) {}
+
+  bool is_defined(const py_binpat_t &p, size_t i) const
+  {
+    return p.mask.empty() || p.mask[i] != 0;
+  }
+
+  // the patterns must have at least one defined byte
+  bool build()
+  {
+    nodes.resize(1);
+    for ( size_t i = 0; i < pats.size(); ++i )
+    {
+      py_binpat_t &p = pats[i];
+      maxlen = qmax(maxlen, p.bytes.size());
+      p.anchor_len = 0;
+      for ( size_t j = 0; j < p.bytes.size(); )
+      {
+        size_t k = j;
+        while ( k < p.bytes.size() && is_defined(p, k) )
+          ++k;
+        if ( k - j > p.anchor_len )
+        {
+          p.anchor_off = j;
+          p.anchor_len = k - j;
+        }
+        j = k + 1;
+      }
+      if ( p.anchor_len == 0 )
+        return false;
+      uint32 n = 0;
+      for ( size_t j = 0; j < p.anchor_len; ++j )
+      {
+        uchar c = p.bytes[p.anchor_off + j];
+        uint32 next = nodes[n].find(c);
+        if ( next == 0 )
+        {
+          next = uint32(nodes.size());
+          if ( next > 0xFFFFFF )
+            return false;
+          nodes[n].children.push_back((uint32(c) << 24) | next);
+          nodes.push_back();
+        }
+        n = next;
+      }
+      nodes[n].outs.push_back(uint32(i));
+    }
+    // breadth-first computation of the failure links
+    qvector<uint32> queue;
+    for ( int c = 0; c < 256; ++c )
+    {
+      root_next[c] = nodes[0].find(uchar(c));
+      if ( root_next[c] != 0 )
+        queue.push_back(root_next[c]);
+    }
+    for ( size_t qi = 0; qi < queue.size(); ++qi )
+    {
+      uint32 r = queue[qi];
+      for ( size_t i = 0; i < nodes[r].children.size(); ++i )
+      {
+        uchar c = uchar(nodes[r].children[i] >> 24);
+        uint32 u = nodes[r].children[i] & 0xFFFFFF;
+        queue.push_back(u);
+        uint32 f = nodes[r].fail;
+        while ( f != 0 && nodes[f].find(c) == 0 )
+          f = nodes[f].fail;
+        uint32 v = f == 0 ? root_next[c] : nodes[f].find(c);
+        py_binpat_node_t &un = nodes[u];
+        un.fail = v;
+        un.dict = nodes[v].outs.empty() ? nodes[v].dict : v;
+      }
+    }
+    return true;
+  }
+
+  // report the matches starting in buf[0..limit)
+  // 'loaded' is a get_bytes() bitmap of the initialized bytes
+  void scan(
+        eavec_t *eas,
+        qvector<uint32> *idxs,
+        ea_t buf_ea,
+        const uchar *buf,
+        const uchar *loaded,
+        size_t size,
+        size_t limit) const
+  {
+    uint32 state = 0;
+    for ( size_t i = 0; i < size; ++i )
+    {
+      uchar c = buf[i];
+      while ( true )
+      {
+        if ( state == 0 )
+        {
+          state = root_next[c];
+          break;
+        }
+        uint32 next = nodes[state].find(c);
+        if ( next != 0 )
+        {
+          state = next;
+          break;
+        }
+        state = nodes[state].fail;
+      }
+      uint32 s = nodes[state].outs.empty() ? nodes[state].dict : state;
+      for ( ; s != 0; s = nodes[s].dict )
+      {
+        const qvector<uint32> &outs = nodes[s].outs;
+        for ( size_t k = 0; k < outs.size(); ++k )
+        {
+          const py_binpat_t &p = pats[outs[k]];
+          size_t back = p.anchor_off + p.anchor_len - 1;
+          if ( i < back )
+            continue;
+          size_t start = i - back;
+          if ( start >= limit || start + p.bytes.size() > size )
+            continue;
+          if ( verify(p, buf + start, loaded, start) )
+          {
+            eas->push_back(buf_ea + start);
+            idxs->push_back(p.idx);
+          }
+        }
+      }
+    }
+  }
+
+  bool verify(const py_binpat_t &p, const uchar *ptr, const uchar *loaded, size_t off) const
+  {
+    for ( size_t j = 0; j < p.bytes.size(); ++j )
+    {
+      size_t b = off + j;
+      if ( (loaded[b >> 3] & (1 << (b & 7))) == 0 )
+        return false;
+      if ( is_defined(p, j) && ptr[j] != p.bytes[j] )
+        return false;
+    }
+    return true;
+  }
+};
+
+//-------------------------------------------------------------------------
+// 'mask' has the semantics of bin_search2(): a non-zero byte means the
+// byte is defined. A NULL mask means all bytes are defined.
+static void py_add_binpat(
+        py_binpat_vec_t *pats,
+        uint32 idx,
+        const uchar *image,
+        size_t len,
+        const uchar *mask)
+{
+  py_binpat_t &p = pats->push_back();
+  p.idx = idx;
+  p.bytes.append(image, len);
+  if ( mask != NULL )
+  {
+    for ( size_t i = 0; i < len; ++i )
+    {
+      if ( mask[i] == 0 )
+      {
+        p.mask.append(mask, len);
+        break;
+      }
+    }
+  }
+}
+
+//-------------------------------------------------------------------------
+// sorts (ea, idx) matches, removing duplicates
+static void py_sort_binpat_matches(eavec_t *eas, qvector<uint32> *idxs)
+{
+  size_t n = eas->size();
+  qvector<std::pair<ea_t, uint32> > pairs;
+  pairs.resize(n);
+  for ( size_t i = 0; i < n; ++i )
+    pairs[i] = std::make_pair((*eas)[i], (*idxs)[i]);
+  std::sort(pairs.begin(), pairs.end());
+  eas->qclear();
+  idxs->qclear();
+  for ( size_t i = 0; i < n; ++i )
+  {
+    if ( i > 0 && pairs[i] == pairs[i-1] )
+      continue;
+    eas->push_back(pairs[i].first);
+    idxs->push_back(pairs[i].second);
+  }
+}
+
 //-------------------------------------------------------------------------
 static void ida_bytes_term(void) {}
 
@@ -323,6 +552,191 @@ static PyObject *py_get_8bit(ea_t ea, uint32 v, int nbit)
   uchar octet = get_8bit(&ea, &v, &nbit);
   return Py_BuildValue("(i" PY_BV_EA "ki)", int(uint32(octet)), bvea_t(ea), v, nbit);
 }
+
+//-------------------------------------------------------------------------
+/*
+#<pydoc>
+def get_heads_chunk(start_ea, end_ea, maxcount):
+    """
+    Collect up to 'maxcount' heads (instructions or data) in one pass.
+    If 'start_ea' is not a head, collection starts at the next head.
+
+    @param start_ea: start address
+    @param end_ea: end address (excluded)
+    @param maxcount: maximum number of heads to collect
+    @return: a tuple (heads, flags, next_ea). 'heads' and 'flags' are
+             'str' instances holding the packed ea_t addresses and the
+             packed flags_t of the heads, in native byte order.
+             'next_ea' is the head to resume from, or BADADDR if the
+             range is exhausted.
+    """
+    pass
+#</pydoc>
+*/
+static PyObject *py_get_heads_chunk(ea_t start_ea, ea_t end_ea, size_t maxcount)
+{
+  eavec_t heads;
+  qvector<flags_t> flags;
+  ea_t ea = start_ea;
+  Py_BEGIN_ALLOW_THREADS;
+  if ( !is_head(get_flags(ea)) )
+    ea = next_head(ea, end_ea);
+  heads.reserve(qmin(maxcount, size_t(0x10000)));
+  flags.reserve(qmin(maxcount, size_t(0x10000)));
+  while ( ea != BADADDR && ea < end_ea && heads.size() < maxcount )
+  {
+    heads.push_back(ea);
+    flags.push_back(get_flags(ea));
+    ea = next_head(ea, end_ea);
+  }
+  if ( ea != BADADDR && ea >= end_ea )
+    ea = BADADDR;
+  Py_END_ALLOW_THREADS;
+
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  ref_t py_heads = PyW_VecToPyString(heads);
+  ref_t py_flags = PyW_VecToPyString(flags);
+  if ( py_heads == NULL || py_flags == NULL )
+    return NULL;
+  return Py_BuildValue("(OO" PY_BV_EA ")", py_heads.o, py_flags.o, bvea_t(ea));
+}
+//-------------------------------------------------------------------------
+/*
+#<pydoc>
+def bin_search_multi(start_ea, end_ea, patterns, radix, flags):
+    """
+    Search for several binary patterns at once.
+    The range is read block by block, and each block is scanned only
+    once for all the patterns.
+
+    @param start_ea: start address
+    @param end_ea: end address (excluded)
+    @param patterns: a sequence of patterns. Each pattern is either a
+                     search string, as accepted by find_binary() (e.g.,
+                     "E8 ? ? ? ? 85 C0"), or a tuple (image, mask) with
+                     the semantics of bin_search(): a 'mask' of None, or
+                     whose first byte is 0xFF, means all bytes are
+                     defined, otherwise the bytes whose mask is 0 match
+                     any value.
+    @param radix: radix of the numbers in the search strings
+    @param flags: BIN_SEARCH_NOBREAK to ignore the user's cancellation
+    @return: a tuple (eas, indexes, next_ea), or None if a pattern is
+             invalid or has no defined bytes. 'eas' holds the packed ea_t
+             addresses of the matches and 'indexes' the packed uint32
+             indexes of the matching patterns, in native byte order,
+             sorted by address then index. 'next_ea' is the address to
+             resume from if the search was cancelled, BADADDR otherwise.
+    """
+    pass
+#</pydoc>
+*/
+#define BINSEARCHMULTI_BLOCK 0x100000
+static PyObject *py_bin_search_multi(
+        ea_t start_ea,
+        ea_t end_ea,
+        PyObject *py_patterns,
+        int radix,
+        int flags)
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  py_binpat_matcher_t matcher;
+  newref_t py_seq(PySequence_Fast(py_patterns, "expected a sequence of patterns"));
+  if ( py_seq == NULL )
+    return NULL;
+  Py_ssize_t npats = PySequence_Fast_GET_SIZE(py_seq.o);
+  for ( Py_ssize_t i = 0; i < npats; ++i )
+  {
+    PyObject *py_pat = PySequence_Fast_GET_ITEM(py_seq.o, i);
+    if ( PyString_Check(py_pat) )
+    {
+      compiled_binpat_vec_t binpat;
+      if ( !parse_binpat_str(&binpat, start_ea, PyString_AsString(py_pat), radix) )
+        Py_RETURN_NONE;
+      for ( size_t j = 0; j < binpat.size(); ++j )
+      {
+        const compiled_binpat_t &bp = binpat[j];
+        py_add_binpat(&matcher.pats, uint32(i), bp.bytes.begin(), bp.bytes.size(),
+                      bp.mask.empty() ? NULL : bp.mask.begin());
+      }
+    }
+    else
+    {
+      if ( !PyTuple_Check(py_pat)
+        || PyTuple_GET_SIZE(py_pat) != 2
+        || !PyString_Check(PyTuple_GET_ITEM(py_pat, 0)) )
+      {
+        PyErr_SetString(PyExc_TypeError, "expected a search string or an (image, mask) tuple");
+        return NULL;
+      }
+      PyObject *py_image = PyTuple_GET_ITEM(py_pat, 0);
+      PyObject *py_mask = PyTuple_GET_ITEM(py_pat, 1);
+      const char *image = PyString_AS_STRING(py_image);
+      Py_ssize_t len = PyString_GET_SIZE(py_image);
+      const uchar *mask = NULL;
+      if ( py_mask != Py_None )
+      {
+        if ( !PyString_Check(py_mask) || PyString_GET_SIZE(py_mask) < len )
+        {
+          PyErr_SetString(PyExc_ValueError, "the mask must be None, or as long as the image");
+          return NULL;
+        }
+        mask = (const uchar *) PyString_AS_STRING(py_mask);
+        // same as py_bin_search(): a value of '0xFF' in the first byte
+        // meant "all bytes defined"
+        if ( len > 0 && *mask == 0xFF )
+          mask = NULL;
+      }
+      py_add_binpat(&matcher.pats, uint32(i), (const uchar *) image, len, mask);
+    }
+  }
+
+  eavec_t eas;
+  qvector<uint32> idxs;
+  ea_t next_ea = BADADDR;
+  bool ok;
+  Py_BEGIN_ALLOW_THREADS;
+  ok = matcher.build();
+  if ( ok && !matcher.pats.empty() )
+  {
+    bytevec_t buf;
+    bytevec_t loaded;
+    ea_t ea = start_ea;
+    while ( ea < end_ea )
+    {
+      if ( !is_loaded(ea) )
+      {
+        ea = next_inited(ea, end_ea);
+        if ( ea == BADADDR )
+          break;
+      }
+      ea_t block_end = end_ea - ea > BINSEARCHMULTI_BLOCK ? ea + BINSEARCHMULTI_BLOCK : end_ea;
+      // the blocks overlap, so that matches can span two blocks
+      ea_t read_end = end_ea - block_end > matcher.maxlen - 1 ? block_end + matcher.maxlen - 1 : end_ea;
+      size_t size = size_t(read_end - ea);
+      buf.resize(size);
+      loaded.resize((size + 7) / 8);
+      memset(loaded.begin(), 0, loaded.size());
+      if ( get_bytes(buf.begin(), size, ea, GMB_READALL, loaded.begin()) >= 0 )
+        matcher.scan(&eas, &idxs, ea, buf.begin(), loaded.begin(), size, size_t(block_end - ea));
+      ea = block_end;
+      if ( ea < end_ea && (flags & BIN_SEARCH_NOBREAK) == 0 && user_cancelled() )
+      {
+        next_ea = ea;
+        break;
+      }
+    }
+    py_sort_binpat_matches(&eas, &idxs);
+  }
+  Py_END_ALLOW_THREADS;
+  if ( !ok )
+    Py_RETURN_NONE;
+
+  ref_t py_eas = PyW_VecToPyString(eas);
+  ref_t py_idxs = PyW_VecToPyString(idxs);
+  if ( py_eas == NULL || py_idxs == NULL )
+    return NULL;
+  return Py_BuildValue("(OO" PY_BV_EA ")", py_eas.o, py_idxs.o, bvea_t(next_ea));
+}
 //</inline(py_bytes)>
 
 #endif
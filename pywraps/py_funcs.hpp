@@ -82,4 +82,101 @@ static func_t *func_t__from_ptrval__(size_t ptrval)
 {
   return (func_t *) ptrval;
 }
+
+//-------------------------------------------------------------------------
+/*
+#<pydoc>
+def get_func_table(start_ea, end_ea, fields):
+    """
+    Collect, in one pass, the attributes of the functions in a range.
+    The functions are enumerated like idautils.Functions() does.
+
+    @param start_ea: start address
+    @param end_ea: end address (excluded)
+    @param fields: combination of FUNCTBL_... constants, selecting the
+                   columns to collect
+    @return: a tuple (start_eas, end_eas, flags, frsizes, names, chunks).
+             'names' is a list of str; the other columns are 'str'
+             instances holding packed values in native byte order:
+             ea_t for 'start_eas' and 'end_eas', uint64 for 'flags',
+             asize_t for 'frsizes' and uint32 for 'chunks' (the number
+             of chunks, including the entry chunk).
+             Columns not selected in 'fields' are None.
+    """
+    pass
+#</pydoc>
+*/
+#define FUNCTBL_END_EA 0x01
+#define FUNCTBL_FLAGS  0x02
+#define FUNCTBL_FRSIZE 0x04
+#define FUNCTBL_NAME   0x08
+#define FUNCTBL_CHUNKS 0x10
+static PyObject *py_get_func_table(ea_t start_ea, ea_t end_ea, int fields)
+{
+  eavec_t start_eas;
+  eavec_t end_eas;
+  qvector<uint64> flags;
+  qvector<asize_t> frsizes;
+  qstrvec_t names;
+  qvector<uint32> chunks;
+  Py_BEGIN_ALLOW_THREADS;
+  // find first function head chunk in the range
+  func_t *pfn = get_fchunk(start_ea);
+  if ( pfn == NULL )
+    pfn = get_next_fchunk(start_ea);
+  while ( pfn != NULL && pfn->start_ea < end_ea && (pfn->flags & FUNC_TAIL) != 0 )
+    pfn = get_next_fchunk(pfn->start_ea);
+  for ( ; pfn != NULL && pfn->start_ea < end_ea; pfn = get_next_func(pfn->start_ea) )
+  {
+    start_eas.push_back(pfn->start_ea);
+    if ( (fields & FUNCTBL_END_EA) != 0 )
+      end_eas.push_back(pfn->end_ea);
+    if ( (fields & FUNCTBL_FLAGS) != 0 )
+      flags.push_back(pfn->flags);
+    if ( (fields & FUNCTBL_FRSIZE) != 0 )
+      frsizes.push_back(pfn->frsize);
+    if ( (fields & FUNCTBL_NAME) != 0 )
+      get_func_name(&names.push_back(), pfn->start_ea);
+    if ( (fields & FUNCTBL_CHUNKS) != 0 )
+      chunks.push_back(uint32(pfn->tailqty + 1));
+  }
+  Py_END_ALLOW_THREADS;
+
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  ref_t py_start_eas = PyW_VecToPyString(start_eas);
+  ref_t py_end_eas = borref_t(Py_None);
+  ref_t py_flags = borref_t(Py_None);
+  ref_t py_frsizes = borref_t(Py_None);
+  ref_t py_chunks = borref_t(Py_None);
+  if ( (fields & FUNCTBL_END_EA) != 0 )
+    py_end_eas = PyW_VecToPyString(end_eas);
+  if ( (fields & FUNCTBL_FLAGS) != 0 )
+    py_flags = PyW_VecToPyString(flags);
+  if ( (fields & FUNCTBL_FRSIZE) != 0 )
+    py_frsizes = PyW_VecToPyString(frsizes);
+  if ( (fields & FUNCTBL_CHUNKS) != 0 )
+    py_chunks = PyW_VecToPyString(chunks);
+  if ( py_start_eas == NULL
+    || py_end_eas == NULL
+    || py_flags == NULL
+    || py_frsizes == NULL
+    || py_chunks == NULL )
+  {
+    return NULL;
+  }
+  ref_t py_names = borref_t(Py_None);
+  if ( (fields & FUNCTBL_NAME) != 0 )
+  {
+    py_names = PyW_StrVecToPyList(names);
+    if ( py_names == NULL )
+      return NULL;
+  }
+  return Py_BuildValue("(OOOOOO)",
+                       py_start_eas.o,
+                       py_end_eas.o,
+                       py_flags.o,
+                       py_frsizes.o,
+                       py_names.o,
+                       py_chunks.o);
+}
 //</inline(py_funcs)>
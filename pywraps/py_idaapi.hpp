@@ -190,6 +190,121 @@ def disable_script_timeout():
 */
 idaman void ida_export disable_script_timeout();
 
+/*
+#<pydoc>
+def set_compiled_code_cache_size(size):
+    """
+    Changes the number of compiled snippets (conditional breakpoints,
+    RunPythonStatement(), CLI lines, ...) kept in memory, so evaluating
+    them again doesn't require to compile them again.
+
+    @param size: the number of entries. Zero disables the cache and
+                 releases its contents.
+    @return: Returns the old size
+    """
+    pass
+#</pydoc>
+*/
+idaman int ida_export set_compiled_code_cache_size(int size);
+
+/*
+#<pydoc>
+def get_compiled_code_cache_stats():
+    """
+    Get the statistics of the compiled code cache.
+
+    @return: a tuple (hits, misses, number of entries)
+    """
+    pass
+#</pydoc>
+*/
+idaman PyObject *ida_export get_compiled_code_cache_stats();
+
+/*
+#<pydoc>
+def get_compiled_expr_stats():
+    """
+    Get the statistics of the expressions compiled by the kernel into
+    Python functions (e.g., the breakpoint conditions).
+    See also L{reset_compiled_expr_stats}.
+
+    @return: a list of tuples (function name, address, expression,
+             number of calls, time spent in the calls in nanoseconds)
+    """
+    pass
+#</pydoc>
+*/
+idaman PyObject *ida_export get_compiled_expr_stats();
+
+/*
+#<pydoc>
+def reset_compiled_expr_stats():
+    """
+    Resets the statistics of the compiled expressions.
+
+    @return: None
+    """
+    pass
+#</pydoc>
+*/
+idaman void ida_export reset_compiled_expr_stats();
+
+/*
+#<pydoc>
+def enable_python_profiler(enable, interval_ms):
+    """
+    Starts or stops the sampling profiler.
+    While it runs, the Python stack of the main thread is sampled every
+    'interval_ms' milliseconds. The samples taken while a C function
+    (e.g., a function of an ida_* module) is being called are attributed
+    to that function as well.
+    Starting the profiler again only changes the interval: the samples
+    are kept until L{dump_python_profile} resets them.
+    The IDC function EnablePythonProfiler(enable, interval_ms=10) does the same.
+
+    @param enable: True to start the profiler, False to stop it
+    @param interval_ms: the sampling interval, in milliseconds
+    @return: success
+    """
+    pass
+#</pydoc>
+*/
+idaman bool ida_export enable_python_profiler(bool enable, int interval_ms=10);
+
+/*
+#<pydoc>
+def is_python_profiler_enabled():
+    """
+    Is the sampling profiler running?
+
+    @return: Boolean
+    """
+    pass
+#</pydoc>
+*/
+idaman bool ida_export is_python_profiler_enabled();
+
+/*
+#<pydoc>
+def dump_python_profile(path, reset):
+    """
+    Writes the samples collected by the sampling profiler to a file, in
+    the "collapsed stack" format understood by the flame graph tools:
+    one line per distinct stack, the frames separated by ';', the
+    outermost frame first, followed by the number of samples.
+    Python frames are formatted as "function (file:line)", C functions
+    as "[native] function".
+    The IDC function DumpPythonProfile(path, reset=1) does the same.
+
+    @param path: the output file. If empty, nothing is written
+    @param reset: discard the samples once they are written
+    @return: success
+    """
+    pass
+#</pydoc>
+*/
+idaman bool ida_export dump_python_profile(const char *path, bool reset=true);
+
 /*
 #<pydoc>
 def enable_extlang_python(enable):
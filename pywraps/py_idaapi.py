@@ -16,6 +16,7 @@ import datetime
 __EA64__ = BADADDR == 0xFFFFFFFFFFFFFFFF
 
 import struct
+import array
 import traceback
 import os
 import sys
@@ -368,6 +369,54 @@ def struct_unpack(buffer, signed = False, offs = 0):
     # Unpack
     return struct.unpack_from(__struct_unpack_table[n][signed], buffer, offs)[0]
 
+# ----------------------------------------------------------------------
+def struct_format(itemsize, signed = False):
+    """
+    Return the struct module format character of the integers of
+    'itemsize' bytes (1, 2, 4 or 8), or None for other sizes.
+    """
+    codes = __struct_unpack_table.get(itemsize)
+    if codes is None:
+        return None
+    return codes[0 if signed else 1]
+
+# ----------------------------------------------------------------------
+def __find_array_typecode(itemsize):
+    for code in ('B', 'H', 'I', 'L', 'Q'):
+        try:
+            if array.array(code).itemsize == itemsize:
+                return code
+        except ValueError: # 'Q' is not available on older Pythons
+            pass
+    return None
+
+__array_typecodes = dict((n, __find_array_typecode(n)) for n in __struct_unpack_table)
+
+# ----------------------------------------------------------------------
+def array_typecode(itemsize):
+    """
+    Return the array.array typecode of the unsigned integers of 'itemsize'
+    bytes, or None if the interpreter has no array type of that size
+    (e.g., 8-byte items on Windows).
+    """
+    return __array_typecodes.get(itemsize)
+
+# ----------------------------------------------------------------------
+def unpack_array(buffer, itemsize):
+    """
+    Unpack a buffer of native-endian unsigned integers of 'itemsize' bytes
+    (as returned by the bulk getters, such as ida_bytes.get_heads_chunk())
+    into an array.array.
+    If the interpreter has no array type of that size (e.g., 8-byte items
+    on Windows), a list is returned instead.
+    """
+    code = array_typecode(itemsize)
+    if code is not None:
+        return array.array(code, buffer)
+    if itemsize not in __struct_unpack_table:
+        raise ValueError("Invalid item size! Must be 1, 2, 4 or 8")
+    return list(struct.unpack("=%d%s" % (len(buffer) // itemsize, __struct_unpack_table[itemsize][1]), buffer))
+
 # ------------------------------------------------------------
 try:
     "".decode("UTF-8").encode("mbcs")
@@ -31,6 +31,44 @@ static void idaapi s_py_get_user_defined_prefix(
     }
   }
 }
+//-------------------------------------------------------------------------
+// Extract the mnemonic (COLOR_INSN) and the operands (COLOR_OPND1..8)
+// of a color-tagged disassembly line
+static void py_split_disasm_line(qstring *mnem, qstrvec_t *ops, const char *line)
+{
+  const char *p = line;
+  while ( *p != '\0' )
+  {
+    if ( *p == COLOR_ESC && p[1] != '\0' )
+    {
+      p += 2;
+      continue;
+    }
+    char code = p[1];
+    if ( *p != COLOR_ON
+      || (code != COLOR_INSN && (code < COLOR_OPND1 || code > COLOR_OPND8)) )
+    {
+      ++p;
+      continue;
+    }
+    const char *start = p + 2;
+    const char *q = start;
+    while ( *q != '\0' && (q[0] != COLOR_OFF || q[1] != code) )
+      q += *q == COLOR_ESC && q[1] != '\0' ? 2 : 1;
+    qstring *dst = mnem;
+    if ( code != COLOR_INSN )
+    {
+      size_t n = code - COLOR_OPND1;
+      if ( ops->size() <= n )
+        ops->resize(n + 1);
+      dst = &ops->at(n);
+    }
+    tag_remove(dst, qstring(start, q - start));
+    while ( !dst->empty() && dst->last() == ' ' )
+      dst->remove_last();
+    p = *q == '\0' ? q : q + 2;
+  }
+}
 //</code(py_lines)>
 
 //------------------------------------------------------------------------
@@ -187,5 +225,113 @@ PyObject *py_generate_disassembly(
   }
   return Py_BuildValue("(iO)", lnnum, py_tuple.o);
 }
+//-------------------------------------------------------------------------
+/*
+#<pydoc>
+def get_disasm_chunk(start_ea, end_ea, maxcount, flags):
+    """
+    Generate, in one pass, the disassembly text of up to 'maxcount'
+    heads (instructions or data). Each head is rendered only once: the
+    mnemonic and the operands of instructions are extracted from the
+    color tags of the generated line.
+    If 'start_ea' is not a head, the text starts at the next head.
+
+    @param start_ea: start address
+    @param end_ea: end address (excluded)
+    @param maxcount: maximum number of heads
+    @param flags: combination of DISASMCHUNK_... constants:
+                  DISASMCHUNK_TAGGED: keep the color tags in the lines
+                  (and don't split them into mnemonics and operands)
+                  DISASMCHUNK_NOSPLIT: don't split the lines into
+                  mnemonics and operands
+    @return: a tuple (eas, lines, mnems, operands, next_ea). 'eas' is a
+             'str' instance holding the packed ea_t addresses of the heads,
+             in native byte order. 'lines' is a list of str. 'mnems' and
+             'operands' are lists holding, for each head, the mnemonic
+             and a tuple of operand texts of instructions ("" and () for
+             data), or None if the lines were not split.
+             'next_ea' is the head to resume from, or BADADDR if the range
+             is exhausted.
+    """
+    pass
+#</pydoc>
+*/
+#define DISASMCHUNK_TAGGED  0x01
+#define DISASMCHUNK_NOSPLIT 0x02
+static PyObject *py_get_disasm_chunk(ea_t start_ea, ea_t end_ea, size_t maxcount, int flags)
+{
+  bool split = (flags & (DISASMCHUNK_TAGGED|DISASMCHUNK_NOSPLIT)) == 0;
+  eavec_t eas;
+  qstrvec_t lines;
+  qstrvec_t mnems;
+  qvector<qstrvec_t> ops;
+  ea_t ea = start_ea;
+  Py_BEGIN_ALLOW_THREADS;
+  if ( !is_head(get_flags(ea)) )
+    ea = next_head(ea, end_ea);
+  qstring line;
+  while ( ea != BADADDR && ea < end_ea && eas.size() < maxcount )
+  {
+    eas.push_back(ea);
+    qstring &out = lines.push_back();
+    generate_disasm_line(&line, ea);
+    if ( (flags & DISASMCHUNK_TAGGED) != 0 )
+    {
+      out.swap(line);
+    }
+    else
+    {
+      tag_remove(&out, line);
+      if ( split )
+      {
+        qstring &mnem = mnems.push_back();
+        qstrvec_t &insn_ops = ops.push_back();
+        if ( is_code(get_flags(ea)) )
+          py_split_disasm_line(&mnem, &insn_ops, line.c_str());
+      }
+    }
+    ea = next_head(ea, end_ea);
+  }
+  if ( ea != BADADDR && ea >= end_ea )
+    ea = BADADDR;
+  Py_END_ALLOW_THREADS;
+
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  ref_t py_eas = PyW_VecToPyString(eas);
+  ref_t py_lines = PyW_StrVecToPyList(lines);
+  if ( py_eas == NULL || py_lines == NULL )
+    return NULL;
+  ref_t py_mnems = borref_t(Py_None);
+  ref_t py_ops = borref_t(Py_None);
+  if ( split )
+  {
+    py_mnems = PyW_StrVecToPyList(mnems);
+    py_ops = newref_t(PyList_New(ops.size()));
+    if ( py_mnems == NULL || py_ops == NULL )
+      return NULL;
+    for ( size_t i = 0; i < ops.size(); ++i )
+    {
+      const qstrvec_t &insn_ops = ops[i];
+      PyObject *py_insn_ops = PyTuple_New(insn_ops.size());
+      if ( py_insn_ops == NULL )
+        return NULL;
+      // PyList_SET_ITEM steals the reference
+      PyList_SET_ITEM(py_ops.o, i, py_insn_ops);
+      for ( size_t j = 0; j < insn_ops.size(); ++j )
+      {
+        PyObject *py_op = PyString_FromStringAndSize(insn_ops[j].c_str(), insn_ops[j].length());
+        if ( py_op == NULL )
+          return NULL;
+        PyTuple_SET_ITEM(py_insn_ops, j, py_op);
+      }
+    }
+  }
+  return Py_BuildValue("(OOOO" PY_BV_EA ")",
+                       py_eas.o,
+                       py_lines.o,
+                       py_mnems.o,
+                       py_ops.o,
+                       bvea_t(ea));
+}
 //</inline(py_lines)>
 #endif
@@ -43,4 +43,47 @@ PyObject *py_validate_name(const char *name, nametype_t type, int flags=0)
   else
     Py_RETURN_NONE;
 }
+//-------------------------------------------------------------------------
+/*
+#<pydoc>
+def get_nlist_table(start_ea, end_ea):
+    """
+    Collect, in one pass, the entries of the list of names (see
+    get_nlist_ea() and get_nlist_name()) in a range.
+
+    @param start_ea: start address
+    @param end_ea: end address (excluded)
+    @return: a tuple (eas, names), where 'eas' is a 'str' instance
+             holding the packed ea_t addresses, in native byte order,
+             and 'names' is the list of the names, in the same order.
+    """
+    pass
+#</pydoc>
+*/
+static PyObject *py_get_nlist_table(ea_t start_ea, ea_t end_ea)
+{
+  eavec_t eas;
+  qstrvec_t names;
+  Py_BEGIN_ALLOW_THREADS;
+  for ( size_t i = get_nlist_idx(start_ea), n = get_nlist_size(); i < n; ++i )
+  {
+    ea_t ea = get_nlist_ea(i);
+    if ( ea < start_ea )
+      continue;
+    if ( ea >= end_ea )
+      break;
+    eas.push_back(ea);
+    names.push_back(get_nlist_name(i));
+  }
+  Py_END_ALLOW_THREADS;
+
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  ref_t py_eas = PyW_VecToPyString(eas);
+  if ( py_eas == NULL )
+    return NULL;
+  ref_t py_names = PyW_StrVecToPyList(names);
+  if ( py_names == NULL )
+    return NULL;
+  return Py_BuildValue("(OO)", py_eas.o, py_names.o);
+}
 //</inline(py_name)>
@@ -55,4 +55,78 @@ int py_rebase_program(PyObject *delta, int flags)
     PyErr_SetString(PyExc_TypeError, "Expected a delta in bytes");
   return rc;
 }
+//-------------------------------------------------------------------------
+/*
+#<pydoc>
+def get_segm_table():
+    """
+    Collect, in one pass, the attributes of all the segments,
+    in address order.
+
+    @return: a tuple (start_eas, end_eas, perms, bitnesses, types, sels,
+             names, classes). 'names' and 'classes' are lists of str;
+             the other items are 'str' instances holding packed values
+             in native byte order: ea_t for 'start_eas' and 'end_eas',
+             sel_t for 'sels' and uchar for the others.
+    """
+    pass
+#</pydoc>
+*/
+static PyObject *py_get_segm_table()
+{
+  eavec_t start_eas;
+  eavec_t end_eas;
+  bytevec_t perms;
+  bytevec_t bitnesses;
+  bytevec_t types;
+  qvector<sel_t> sels;
+  qstrvec_t names;
+  qstrvec_t classes;
+  Py_BEGIN_ALLOW_THREADS;
+  for ( int n = 0, qty = get_segm_qty(); n < qty; ++n )
+  {
+    segment_t *s = getnseg(n);
+    if ( s == NULL )
+      continue;
+    start_eas.push_back(s->start_ea);
+    end_eas.push_back(s->end_ea);
+    perms.push_back(s->perm);
+    bitnesses.push_back(s->bitness);
+    types.push_back(s->type);
+    sels.push_back(s->sel);
+    get_segm_name(&names.push_back(), s);
+    get_segm_class(&classes.push_back(), s);
+  }
+  Py_END_ALLOW_THREADS;
+
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  ref_t py_start_eas = PyW_VecToPyString(start_eas);
+  ref_t py_end_eas = PyW_VecToPyString(end_eas);
+  ref_t py_perms = PyW_VecToPyString(perms);
+  ref_t py_bitnesses = PyW_VecToPyString(bitnesses);
+  ref_t py_types = PyW_VecToPyString(types);
+  ref_t py_sels = PyW_VecToPyString(sels);
+  if ( py_start_eas == NULL
+    || py_end_eas == NULL
+    || py_perms == NULL
+    || py_bitnesses == NULL
+    || py_types == NULL
+    || py_sels == NULL )
+  {
+    return NULL;
+  }
+  ref_t py_names = PyW_StrVecToPyList(names);
+  ref_t py_classes = PyW_StrVecToPyList(classes);
+  if ( py_names == NULL || py_classes == NULL )
+    return NULL;
+  return Py_BuildValue("(OOOOOOOO)",
+                       py_start_eas.o,
+                       py_end_eas.o,
+                       py_perms.o,
+                       py_bitnesses.o,
+                       py_types.o,
+                       py_sels.o,
+                       py_names.o,
+                       py_classes.o);
+}
 //</inline(py_segment)>
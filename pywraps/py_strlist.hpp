@@ -0,0 +1,84 @@
+#ifndef __PY_STRLIST__
+#define __PY_STRLIST__
+
+//<inline(py_strlist)>
+
+//-------------------------------------------------------------------------
+/*
+#<pydoc>
+def get_strlist_table(start_ea, end_ea):
+    """
+    Collect, in one pass, the items of the string list that overlap
+    a range, along with their contents.
+
+    @param start_ea: start address
+    @param end_ea: end address (excluded)
+    @return: a tuple (eas, lengths, types, contents). 'eas' is a 'str'
+             instance holding the packed ea_t addresses of the strings,
+             'lengths' and 'types' hold packed int32 values, all in
+             native byte order. 'contents' is a list holding the bytes
+             of each string, as get_strlit_contents() returns them:
+             a str, or None if the contents could not be retrieved.
+    """
+    pass
+#</pydoc>
+*/
+static PyObject *py_get_strlist_table(ea_t start_ea, ea_t end_ea)
+{
+  eavec_t eas;
+  qvector<int32> lengths;
+  qvector<int32> types;
+  qstrvec_t contents;
+  qvector<size_t> failed; // indexes of the contents that couldn't be retrieved
+  Py_BEGIN_ALLOW_THREADS;
+  // the string list is sorted by address: binary search for the
+  // first string that ends after 'start_ea'
+  size_t lo = 0;
+  size_t hi = get_strlist_qty();
+  string_info_t si;
+  while ( lo < hi )
+  {
+    size_t mid = lo + (hi - lo) / 2;
+    if ( get_strlist_item(&si, mid) && si.ea + si.length <= start_ea )
+      lo = mid + 1;
+    else
+      hi = mid;
+  }
+  for ( size_t i = lo, n = get_strlist_qty(); i < n; ++i )
+  {
+    if ( !get_strlist_item(&si, i) )
+      continue;
+    if ( si.ea >= end_ea )
+      break;
+    eas.push_back(si.ea);
+    lengths.push_back(si.length);
+    types.push_back(si.type);
+    qstring &buf = contents.push_back();
+    if ( get_strlit_contents(&buf, si.ea, si.length, si.type) < 0 )
+      failed.push_back(contents.size() - 1);
+    else if ( si.type == STRTYPE_C && buf.length() > 0 && buf.last() == '\0' )
+      buf.remove_last();
+  }
+  Py_END_ALLOW_THREADS;
+
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  ref_t py_eas = PyW_VecToPyString(eas);
+  ref_t py_lengths = PyW_VecToPyString(lengths);
+  ref_t py_types = PyW_VecToPyString(types);
+  if ( py_eas == NULL || py_lengths == NULL || py_types == NULL )
+    return NULL;
+  ref_t py_contents = PyW_StrVecToPyList(contents);
+  if ( py_contents == NULL )
+    return NULL;
+  for ( size_t i = 0; i < failed.size(); ++i )
+  {
+    // PyList_SetItem() steals the reference
+    Py_INCREF(Py_None);
+    if ( PyList_SetItem(py_contents.o, Py_ssize_t(failed[i]), Py_None) < 0 )
+      return NULL;
+  }
+  return Py_BuildValue("(OOOO)", py_eas.o, py_lengths.o, py_types.o, py_contents.o);
+}
+//</inline(py_strlist)>
+
+#endif
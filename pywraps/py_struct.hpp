@@ -1,8 +1,177 @@
-
 #ifndef __PY_STRUCT__
 #define __PY_STRUCT__
 
+//<code(py_struct)>
+//-------------------------------------------------------------------------
+// Columns of the members of one or more structures
+struct py_struc_members_t
+{
+  eavec_t offsets;
+  qvector<asize_t> sizes;
+  qvector<flags_t> flags;
+  qstrvec_t names;
+  qstrvec_t types;
+};
+
+//-------------------------------------------------------------------------
+static void py_collect_struc_members(
+        py_struc_members_t *out,
+        const struc_t *sptr,
+        bool with_types)
+{
+  for ( size_t i = 0; i < sptr->memqty; ++i )
+  {
+    const member_t *mptr = &sptr->members[i];
+    out->offsets.push_back(mptr->soff);
+    out->sizes.push_back(get_member_size(mptr));
+    out->flags.push_back(mptr->flag);
+    get_member_name(&out->names.push_back(), mptr->id);
+    if ( with_types )
+    {
+      qstring &type = out->types.push_back();
+      tinfo_t tif;
+      if ( get_member_tinfo(&tif, mptr) )
+        tif.print(&type);
+    }
+  }
+}
+
+//-------------------------------------------------------------------------
+// Returns the (offsets, sizes, flags, names, types) tuple, or NULL
+static PyObject *py_struc_members_to_tuple(
+        const py_struc_members_t &members,
+        bool with_types)
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  ref_t py_offsets = PyW_VecToPyString(members.offsets);
+  ref_t py_sizes = PyW_VecToPyString(members.sizes);
+  ref_t py_flags = PyW_VecToPyString(members.flags);
+  if ( py_offsets == NULL || py_sizes == NULL || py_flags == NULL )
+    return NULL;
+  ref_t py_names = PyW_StrVecToPyList(members.names);
+  if ( py_names == NULL )
+    return NULL;
+  ref_t py_types = borref_t(Py_None);
+  if ( with_types )
+  {
+    py_types = PyW_StrVecToPyList(members.types);
+    if ( py_types == NULL )
+      return NULL;
+  }
+  return Py_BuildValue("(OOOOO)",
+                       py_offsets.o,
+                       py_sizes.o,
+                       py_flags.o,
+                       py_names.o,
+                       py_types.o);
+}
+//</code(py_struct)>
+
 //<inline(py_struct)>
+//-------------------------------------------------------------------------
+/*
+#<pydoc>
+def get_struc_members(sid, with_types):
+    """
+    Collect, in one pass, the members of a structure (or of a frame).
+
+    @param sid: structure type ID
+    @param with_types: also collect the types of the members (as text)
+    @return: None if 'sid' is not a structure, or a tuple
+             (offsets, sizes, flags, names, types). 'offsets' and 'sizes'
+             are 'str' instances holding packed ea_t and asize_t values,
+             'flags' holds packed flags_t values, all in native byte order.
+             'names' and 'types' are lists of str ('types' is None
+             if 'with_types' is not set).
+    """
+    pass
+#</pydoc>
+*/
+static PyObject *py_get_struc_members(tid_t sid, bool with_types)
+{
+  py_struc_members_t members;
+  bool ok;
+  Py_BEGIN_ALLOW_THREADS;
+  const struc_t *sptr = get_struc(sid);
+  ok = sptr != NULL;
+  if ( ok )
+    py_collect_struc_members(&members, sptr, with_types);
+  Py_END_ALLOW_THREADS;
+  if ( !ok )
+    Py_RETURN_NONE;
+  return py_struc_members_to_tuple(members, with_types);
+}
+
+//-------------------------------------------------------------------------
+/*
+#<pydoc>
+def get_struc_table(start_idx, maxcount, with_types):
+    """
+    Collect, in one pass, up to 'maxcount' structures of the list
+    of structures, starting at index 'start_idx', with their members.
+
+    @param start_idx: index of the first structure
+    @param maxcount: maximum number of structures to collect
+    @param with_types: also collect the types of the members (as text)
+    @return: a tuple (sids, names, sizes, memqties, members, next_idx).
+             'sids' and 'sizes' are 'str' instances holding packed tid_t
+             and asize_t values, 'memqties' holds the packed uint32 numbers
+             of members of each structure, all in native byte order.
+             'names' is a list of str.
+             'members' holds the members of all the structures, one
+             after the other, as returned by get_struc_members().
+             'next_idx' is the index to resume from, or BADADDR if all
+             the structures were collected.
+    """
+    pass
+#</pydoc>
+*/
+static PyObject *py_get_struc_table(uval_t start_idx, size_t maxcount, bool with_types)
+{
+  qvector<tid_t> sids;
+  qstrvec_t names;
+  qvector<asize_t> sizes;
+  qvector<uint32> memqties;
+  py_struc_members_t members;
+  uval_t idx = start_idx;
+  Py_BEGIN_ALLOW_THREADS;
+  uval_t qty = get_struc_qty();
+  for ( ; idx < qty && sids.size() < maxcount; ++idx )
+  {
+    tid_t sid = get_struc_by_idx(idx);
+    const struc_t *sptr = get_struc(sid);
+    if ( sptr == NULL )
+      continue;
+    sids.push_back(sid);
+    get_struc_name(&names.push_back(), sid);
+    sizes.push_back(get_struc_size(sptr));
+    memqties.push_back(uint32(sptr->memqty));
+    py_collect_struc_members(&members, sptr, with_types);
+  }
+  if ( idx >= qty )
+    idx = BADADDR;
+  Py_END_ALLOW_THREADS;
+
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  ref_t py_sids = PyW_VecToPyString(sids);
+  ref_t py_sizes = PyW_VecToPyString(sizes);
+  ref_t py_memqties = PyW_VecToPyString(memqties);
+  if ( py_sids == NULL || py_sizes == NULL || py_memqties == NULL )
+    return NULL;
+  ref_t py_names = PyW_StrVecToPyList(names);
+  if ( py_names == NULL )
+    return NULL;
+  newref_t py_members(py_struc_members_to_tuple(members, with_types));
+  if ( py_members == NULL )
+    return NULL;
+  return Py_BuildValue("(OOOOO" PY_BV_EA ")",
+                       py_sids.o,
+                       py_names.o,
+                       py_sizes.o,
+                       py_memqties.o,
+                       py_members.o,
+                       bvea_t(idx));
+}
 //</inline(py_struct)>
 
 #endif // __PY_STRUCT__
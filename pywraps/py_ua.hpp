@@ -110,6 +110,90 @@ PyObject *py_get_printable_immvals(ea_t ea, int n, flags_t F=0)
   return result.o;
 }
 
+//-------------------------------------------------------------------------
+/*
+#<pydoc>
+def decode_func_insns(ea):
+    """
+    Decode, in one pass, all the instructions of a function (of all
+    its chunks), in the order of idautils.FuncItems().
+
+    @param ea: any address belonging to the function
+    @return: None if there is no function at 'ea', or a tuple
+             (start_ea, eas, sizes, itypes, optypes, regs, values, addrs).
+             'start_ea' is the function start. The other items are 'str'
+             instances holding packed values in native byte order: one
+             ea_t (for 'eas') or uint16 (for 'sizes' and 'itypes') per
+             instruction, and UA_MAXOP values per instruction for the
+             operands: uchar for 'optypes' (o_void, o_reg...), uint16
+             for 'regs', uval_t for 'values' and ea_t for 'addrs'.
+    """
+    pass
+#</pydoc>
+*/
+PyObject *py_decode_func_insns(ea_t ea)
+{
+  func_t *pfn = get_func(ea);
+  if ( pfn == NULL )
+    Py_RETURN_NONE;
+  ea_t start_ea = pfn->start_ea;
+  eavec_t eas;
+  qvector<uint16> sizes;
+  qvector<uint16> itypes;
+  bytevec_t optypes;
+  qvector<uint16> regs;
+  uvalvec_t values;
+  eavec_t addrs;
+  Py_BEGIN_ALLOW_THREADS;
+  insn_t insn;
+  func_item_iterator_t fii;
+  for ( bool ok = fii.set(pfn); ok; ok = fii.next_code() )
+  {
+    if ( decode_insn(&insn, fii.current()) <= 0 )
+      continue;
+    eas.push_back(insn.ea);
+    sizes.push_back(insn.size);
+    itypes.push_back(insn.itype);
+    for ( int i = 0; i < UA_MAXOP; ++i )
+    {
+      const op_t &op = insn.ops[i];
+      optypes.push_back(op.type);
+      regs.push_back(op.reg);
+      values.push_back(op.value);
+      addrs.push_back(op.addr);
+    }
+  }
+  Py_END_ALLOW_THREADS;
+
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  ref_t py_eas = PyW_VecToPyString(eas);
+  ref_t py_sizes = PyW_VecToPyString(sizes);
+  ref_t py_itypes = PyW_VecToPyString(itypes);
+  ref_t py_optypes = PyW_VecToPyString(optypes);
+  ref_t py_regs = PyW_VecToPyString(regs);
+  ref_t py_values = PyW_VecToPyString(values);
+  ref_t py_addrs = PyW_VecToPyString(addrs);
+  if ( py_eas == NULL
+    || py_sizes == NULL
+    || py_itypes == NULL
+    || py_optypes == NULL
+    || py_regs == NULL
+    || py_values == NULL
+    || py_addrs == NULL )
+  {
+    return NULL;
+  }
+  return Py_BuildValue("(" PY_BV_EA "OOOOOOO)",
+                       bvea_t(start_ea),
+                       py_eas.o,
+                       py_sizes.o,
+                       py_itypes.o,
+                       py_optypes.o,
+                       py_regs.o,
+                       py_values.o,
+                       py_addrs.o);
+}
+
 //-------------------------------------------------------------------------
 #define DEFINE_WRAP_TYPE_FROM_PTRVAL(Type)              \
   static Type *Type##__from_ptrval__(size_t ptrval)     \
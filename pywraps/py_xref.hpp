@@ -1,4 +1,14 @@
 
+//<code(py_xref)>
+//-------------------------------------------------------------------------
+// Can 'F' be the target of a reference? Ordinary flows are marked by
+// FF_FLOW, not FF_REF.
+static bool idaapi f_has_xref_or_flow(flags_t F, void *)
+{
+  return has_xref(F) || is_flow(F);
+}
+//</code(py_xref)>
+
 //-------------------------------------------------------------------------
 //<inline(py_xref)>
 
@@ -96,4 +106,126 @@ bool py_create_switch_table(ea_t ea, const switch_info_t &si)
   create_switch_table(ea, si);
   return true;
 }
+
+//-------------------------------------------------------------------------
+/*
+#<pydoc>
+def collect_xrefs(ea, flags, to):
+    """
+    Collect the cross-references from (or to) an address.
+
+    @param ea: linear address
+    @param flags: any of XREF_* flags
+    @param to: collect the references to 'ea' instead of the ones from 'ea'
+    @return: a list of tuples (frm, to, iscode, type, user)
+    """
+    pass
+#</pydoc>
+*/
+static PyObject *py_collect_xrefs(ea_t ea, int flags, bool to)
+{
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  newref_t py_list(PyList_New(0));
+  if ( py_list == NULL )
+    return NULL;
+  xrefblk_t xb;
+  for ( bool ok = to ? xb.first_to(ea, flags) : xb.first_from(ea, flags);
+        ok;
+        ok = to ? xb.next_to() : xb.next_from() )
+  {
+    newref_t py_xref(Py_BuildValue(
+                             "(" PY_BV_EA PY_BV_EA "iii)",
+                             bvea_t(xb.from),
+                             bvea_t(xb.to),
+                             int(xb.iscode),
+                             int(xb.type),
+                             int(xb.user)));
+    if ( py_xref == NULL || PyList_Append(py_list.o, py_xref.o) < 0 )
+      return NULL;
+  }
+  py_list.incref();
+  return py_list.o;
+}
+
+//-------------------------------------------------------------------------
+/*
+#<pydoc>
+def get_xrefs_csr(start_ea, end_ea, flags, by_target):
+    """
+    Collect, in one pass, the cross-references from (or to) all the
+    addresses in a range, in the 'compressed sparse row' layout.
+
+    The references are grouped by source address (or by target address,
+    if 'by_target' is set), and the groups are sorted by address:
+    the references of keys[i] are peers[offsets[i]:offsets[i+1]].
+
+    @param start_ea: start address
+    @param end_ea: end address (excluded)
+    @param flags: any of XREF_* flags
+    @param by_target: group by target address instead of source address
+    @return: a tuple (keys, offsets, peers, types), where 'keys' and
+             'peers' are 'str' instances holding packed ea_t addresses,
+             'offsets' holds packed uint32 values (one more than keys),
+             and 'types' holds one byte per reference: the xref type,
+             or'ed with XREFCSR_ISCODE and XREFCSR_USER.
+             All values are in native byte order.
+    """
+    pass
+#</pydoc>
+*/
+#define XREFCSR_ISCODE 0x40
+#define XREFCSR_USER   0x80
+static PyObject *py_get_xrefs_csr(ea_t start_ea, ea_t end_ea, int flags, bool by_target)
+{
+  eavec_t keys;
+  qvector<uint32> offsets;
+  eavec_t peers;
+  bytevec_t types;
+  Py_BEGIN_ALLOW_THREADS;
+  ea_t ea = start_ea;
+  if ( by_target )
+  {
+    if ( !f_has_xref_or_flow(get_flags(ea), NULL) )
+      ea = next_that(ea, end_ea, f_has_xref_or_flow);
+  }
+  else
+  {
+    if ( !is_head(get_flags(ea)) )
+      ea = next_head(ea, end_ea);
+  }
+  while ( ea != BADADDR && ea < end_ea )
+  {
+    xrefblk_t xb;
+    bool ok = by_target ? xb.first_to(ea, flags) : xb.first_from(ea, flags);
+    if ( ok )
+    {
+      keys.push_back(ea);
+      offsets.push_back(uint32(peers.size()));
+      for ( ; ok; ok = by_target ? xb.next_to() : xb.next_from() )
+      {
+        peers.push_back(by_target ? xb.from : xb.to);
+        uchar t = xb.type;
+        if ( xb.iscode )
+          t |= XREFCSR_ISCODE;
+        if ( xb.user )
+          t |= XREFCSR_USER;
+        types.push_back(t);
+      }
+    }
+    ea = by_target
+       ? next_that(ea, end_ea, f_has_xref_or_flow)
+       : next_head(ea, end_ea);
+  }
+  offsets.push_back(uint32(peers.size()));
+  Py_END_ALLOW_THREADS;
+
+  PYW_GIL_CHECK_LOCKED_SCOPE();
+  ref_t py_keys = PyW_VecToPyString(keys);
+  ref_t py_offsets = PyW_VecToPyString(offsets);
+  ref_t py_peers = PyW_VecToPyString(peers);
+  ref_t py_types = PyW_VecToPyString(types);
+  if ( py_keys == NULL || py_offsets == NULL || py_peers == NULL || py_types == NULL )
+    return NULL;
+  return Py_BuildValue("(OOOO)", py_keys.o, py_offsets.o, py_peers.o, py_types.o);
+}
 //</inline(py_xref)>
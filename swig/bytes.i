@@ -202,6 +202,8 @@
 %rename (get_bytes) py_get_bytes;
 %rename (get_bytes_and_mask) py_get_bytes_and_mask;
 %rename (get_strlit_contents) py_get_strlit_contents;
+%rename (get_heads_chunk) py_get_heads_chunk;
+%rename (bin_search_multi) py_bin_search_multi;
 
 %inline %{
 //<inline(py_bytes)>
@@ -17,6 +17,7 @@
 %ignore get_idasgn_desc;
 %rename (get_idasgn_desc) py_get_idasgn_desc;
 %rename (get_idasgn_desc_with_matches) py_get_idasgn_desc_with_matches;
+%rename (get_func_table) py_get_func_table;
 
 %ignore func_md_t::cbsize;
 %ignore func_pat_t::cbsize;
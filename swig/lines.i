@@ -34,6 +34,8 @@
 %ignore tag_advance;
 %rename (tag_advance) py_tag_advance;
 
+%rename (get_disasm_chunk) py_get_disasm_chunk;
+
 %typemap(argout) (qstring *buf, ea_t ea, int what)
 {
   // typemap(argout) (qstring *buf, ea_t ea, int what)
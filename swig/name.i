@@ -54,6 +54,7 @@ inline qstring py_## FNAME(ea_t ea) { return FNAME(ea); }
 
 %ignore validate_name;
 %rename (validate_name) py_validate_name;
+%rename (get_nlist_table) py_get_nlist_table;
 
 %{
 //<code(py_name)>
@@ -165,4 +165,62 @@
         return false;
       return self->hashset(idx, buf, sz, uchar(tag));
     }
+
+    // Returns (idxs, values): the packed nodeidx_t indexes, in native
+    // byte order, and the list of the supvals with the given tag, for up
+    // to 'maxcount' indexes starting at 'start'
+    PyObject *supvals_table(char tag, nodeidx_t start=0, size_t maxcount=size_t(-1))
+    {
+      qvector<nodeidx_t> idxs;
+      qstrvec_t values;
+      Py_BEGIN_ALLOW_THREADS;
+      for ( nodeidx_t idx = start == 0 ? self->supfirst(uchar(tag)) : self->supnext(start - 1, uchar(tag));
+            idx != BADNODE && idxs.size() < maxcount;
+            idx = self->supnext(idx, uchar(tag)) )
+      {
+        qstring &value = values.push_back();
+        ssize_t sz = self->supval(idx, NULL, 0, uchar(tag));
+        if ( sz > 0 )
+        {
+          value.resize(sz);
+          self->supval(idx, value.begin(), sz, uchar(tag));
+        }
+        idxs.push_back(idx);
+      }
+      Py_END_ALLOW_THREADS;
+
+      PYW_GIL_CHECK_LOCKED_SCOPE();
+      ref_t py_idxs = PyW_VecToPyString(idxs);
+      if ( py_idxs == NULL )
+        return NULL;
+      ref_t py_values = PyW_StrVecToPyList(values);
+      if ( py_values == NULL )
+        return NULL;
+      return Py_BuildValue("(OO)", py_idxs.o, py_values.o);
+    }
+
+    // Returns (idxs, eas): the packed nodeidx_t indexes and ea_t values
+    // (as eaget_idx() returns them), in native byte order, of the
+    // addresses stored with the given tag
+    PyObject *eavals_table(char tag)
+    {
+      qvector<nodeidx_t> idxs;
+      eavec_t eas;
+      Py_BEGIN_ALLOW_THREADS;
+      for ( nodeidx_t idx = self->supfirst(uchar(tag));
+            idx != BADNODE;
+            idx = self->supnext(idx, uchar(tag)) )
+      {
+        idxs.push_back(idx);
+        eas.push_back(self->eaget_idx(idx, uchar(tag)));
+      }
+      Py_END_ALLOW_THREADS;
+
+      PYW_GIL_CHECK_LOCKED_SCOPE();
+      ref_t py_idxs = PyW_VecToPyString(idxs);
+      ref_t py_eas = PyW_VecToPyString(eas);
+      if ( py_idxs == NULL || py_eas == NULL )
+        return NULL;
+      return Py_BuildValue("(OO)", py_idxs.o, py_eas.o);
+    }
 }
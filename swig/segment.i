@@ -16,6 +16,7 @@
 %ignore correct_address;
 %ignore rebase_program;
 %rename (rebase_program) py_rebase_program;
+%rename (get_segm_table) py_get_segm_table;
 
 %{
 //<code(py_segment)>
@@ -60,4 +60,11 @@
 }
 %ignore strwinsetup_t::strtypes;
 
+%rename (get_strlist_table) py_get_strlist_table;
+
+%inline %{
+//<inline(py_strlist)>
+//</inline(py_strlist)>
+%}
+
 %include "strlist.hpp"
@@ -59,6 +59,14 @@
   member_t *get_member(int index) { return &(self->members[index]); }
 }
 
+%{
+//<code(py_struct)>
+//</code(py_struct)>
+%}
+
+%rename (get_struc_members) py_get_struc_members;
+%rename (get_struc_table) py_get_struc_table;
+
 %inline %{
 //<inline(py_struct)>
 //</inline(py_struct)>
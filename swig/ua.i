@@ -145,6 +145,7 @@
 %include "ua.hpp"
 
 %rename (decode_preceding_insn) py_decode_preceding_insn;
+%rename (decode_func_insns) py_decode_func_insns;
 
 %{
 //<code(py_ua)>
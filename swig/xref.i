@@ -9,6 +9,8 @@
 %rename (create_switch_table) py_create_switch_table;
 %ignore calc_switch_cases;
 %rename (calc_switch_cases)   py_calc_switch_cases;
+%rename (collect_xrefs)       py_collect_xrefs;
+%rename (get_xrefs_csr)       py_get_xrefs_csr;
 
 // These functions should not be called directly (according to docs)
 %ignore xrefblk_t_first_from;
@@ -19,6 +21,11 @@
 // 'from' is a reserved Python keyword
 %rename (frm) from;
 
+%{
+//<code(py_xref)>
+//</code(py_xref)>
+%}
+
 %inline %{
 //<inline(py_xref)>
 //</inline(py_xref)>